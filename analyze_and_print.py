@@ -40,6 +40,8 @@ loss_functions_list = [
 optimization_techniques = ["random", "hyperopt", "genetic"]
 max_evals = 50
 pop_size = 10
+seed = None  # Unseeded by default; set an int (e.g. 42) so a rerun asks for the same trials and finds them in the memo
+trial_memo = optimize.TrialMemo(path=os.path.join('output', 'trial_memo.sqlite'))
 
 data_frames = [fetch_historical_data(ticker, '1d', training_data['start'], training_data['end']) for ticker in tickers]
 test_data_frames = [fetch_historical_data(ticker, '1d', testing_data['start'], testing_data['end']) for ticker in tickers]
@@ -60,11 +62,18 @@ report_title = (
 pdf.chapter_title("Report Overview")
 pdf.chapter_body(report_title)
 
+def format_all_losses(combined_results):
+    # Every registered loss and the drawdown/exposure stats of one set of results
+    lines = []
+    for name, value in loss_functions.compute_all_losses(combined_results).items():
+        lines.append(f"- {name}: {round(value, 4) if isinstance(value, float) else value}\n")
+    return "".join(lines)
+
 def run_loss_function(opt_tech, loss_function,pdf):
     pdf.chapter_title(f"Loss Function: {loss_function.__name__}, Optimization Technique: {opt_tech}")
     
     # Optimization and Backtesting
-    results = optimize.optimize(strategies, data_frames, loss_function, opt_tech, max_evals=max_evals, population_size=pop_size)
+    results = optimize.optimize(strategies, data_frames, loss_function, opt_tech, max_evals=max_evals, population_size=pop_size, seed=seed, memo=trial_memo)
     combined_results_training = optimize.compile_backtest_results_sequential([
         backtest.run_backtest(results['best_strategy'](df['ohlc'], results['best_params']))[0] for df in data_frames
     ], data_frames)
@@ -82,7 +91,8 @@ def run_loss_function(opt_tech, loss_function,pdf):
         f"- Number of Trades: {combined_results_training['total_trades']}\n"
         f"- Average Hold Time: {combined_results_training['average_time_holding_position']}\n"
         f"- Average Return per Year: {round(combined_results_training['average_return_per_year'] * 100, 2)}%\n"
-        f"- Average Trades per Year: {combined_results_training['average_trades_per_year']}\n\n"
+        f"- Average Trades per Year: {combined_results_training['average_trades_per_year']}\n"
+        f"{format_all_losses(combined_results_training)}\n"
         f"Validation Data Results:\n"
         f"- Total Money Made: ${round(combined_results_testing['total_amount_of_money_made'], 2)}\n"
         f"- Total Return: {round(combined_results_testing['total_percentage_gain'] * 100, 2)}%\n"
@@ -91,6 +101,7 @@ def run_loss_function(opt_tech, loss_function,pdf):
         f"- Average Hold Time: {combined_results_testing['average_time_holding_position']}\n"
         f"- Average Return per Year: {round(combined_results_testing['average_return_per_year'] * 100, 2)}%\n"
         f"- Average Trades per Year: {combined_results_testing['average_trades_per_year']}\n"
+        f"{format_all_losses(combined_results_testing)}"
     )
     pdf.chapter_body(body)
 
@@ -132,7 +143,7 @@ def run_loss_function(opt_tech, loss_function,pdf):
     for phase, data_frames_set in [('Training', data_frames), ('Testing', test_data_frames)]:
         plt.figure(figsize=(10, 6))
         for loss_function in loss_functions_list:
-            results = optimize.optimize(strategies, data_frames_set, loss_function, opt_tech, max_evals=max_evals, population_size=pop_size)
+            results = optimize.optimize(strategies, data_frames_set, loss_function, opt_tech, max_evals=max_evals, population_size=pop_size, seed=seed, memo=trial_memo)
             combined_results = optimize.compile_backtest_results_sequential([
                 backtest.run_backtest(results['best_strategy'](df['ohlc'], results['best_params']))[0] for df in data_frames_set
             ], data_frames_set)
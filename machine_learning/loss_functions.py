@@ -1,84 +1,485 @@
 import numpy as np
 import pandas as pd
-from sklearn.linear_model import Ridge
-from sklearn.preprocessing import StandardScaler
-from sklearn.linear_model import ElasticNet
-from scipy.stats import linregress
 import math
+import functools
+from collections.abc import Mapping
+from modules.portfolio_values import PortfolioValues
 
+
+class NotEnoughDataError(ValueError):
+    """
+    Raised by a loss function when the backtest results are too short for it, e.g. fewer
+    returns than lags for the regressions. compute_all_losses reports these losses as NaN.
+    """
+
+
+def requires(*keys):
+    """
+    Declare which keys of the backtest results a loss function reads.
+
+    The optimizer then compiles only those keys from the per-ticker results (see
+    compile_backtest_results_sequential), instead of the full combined results. Loss
+    functions without a declaration get everything.
+    """
+    def declare(loss_function):
+        loss_function.required_results = frozenset(keys)
+        return loss_function
+    return declare
+
+
+def required_results(loss_function):
+    """
+    Return the keys a loss function declared with requires, or None when it reads everything.
+    Looks through functools.partial, e.g. partial(gt_function, stabilize=True).
+    """
+    while isinstance(loss_function, functools.partial):
+        loss_function = loss_function.func
+    return getattr(loss_function, 'required_results', None)
+
+
+def portfolio_frame(portfolio_values):
+    """
+    Return portfolio_values_over_time as a DataFrame with a datetime 'date_time' column.
+    """
+    if isinstance(portfolio_values, PortfolioValues):
+        return portfolio_values.to_frame()
+    df = pd.DataFrame(portfolio_values)
+    df['date_time'] = pd.to_datetime(df['date_time'])
+    return df
+
+class LossInputs(Mapping):
+    """
+    Backtest results plus the quantities the loss functions derive from them.
+
+    Reads like the results dict it wraps, so every loss function accepts it. Each derived
+    quantity (returns, the lag matrix, trade returns, the day index and period splits) is
+    computed on first use and then shared, so compute_all_losses derives them once for
+    all losses.
+
+    Parameters:
+    - backtest_results (dict): Results of run_backtest or compile_backtest_results_sequential.
+    """
+
+    def __init__(self, backtest_results):
+        self.results = backtest_results
+        self.period_splits = {}
+
+    def __getitem__(self, key):
+        return self.results[key]
+
+    def __iter__(self):
+        return iter(self.results)
+
+    def __len__(self):
+        return len(self.results)
+
+    @functools.cached_property
+    def curve(self):
+        return PortfolioValues.from_records(self.results['portfolio_values_over_time'])
+
+    @property
+    def values(self):
+        return self.curve.value
+
+    @property
+    def stock_values(self):
+        return self.curve.stock_value
+
+    @functools.cached_property
+    def returns(self):
+        values = self.values
+        return np.diff(values) / values[:-1]
+
+    @functools.cached_property
+    def scaled_lags(self):
+        """
+        (X_scaled, y, starts) of stack_lag_windows for this curve alone: the LAGS returns
+        before each return, standardized, and the return itself. None when there are not
+        enough returns for one row.
+        """
+        if len(self.returns) <= LAGS:
+            return None
+        X, y, starts = stack_lag_windows([self.returns])
+        return standardize_lags(X, starts), y, starts
+
+    @functools.cached_property
+    def lag_gram(self):
+        """
+        The centered normal equations of scaled_lags, shared by the ridge and elastic-net losses.
+        """
+        return _centered_gram(*self.scaled_lags)
+
+    @functools.cached_property
+    def trade_returns(self):
+        return [trade["profit_loss_percent"] for trade in self.results["trades_history"]]
+
+    @functools.cached_property
+    def day_index(self):
+        return day_offsets(self.curve)
+
+    @functools.cached_property
+    def stabilized_periods(self):
+        return find_stabilized_variance(self.curve, day_index=self.day_index)
+
+    def period_returns(self, num_periods):
+        """
+        (portfolio returns, market returns) per period, as get_period_returns.
+        """
+        if num_periods not in self.period_splits:
+            self.period_splits[num_periods] = get_period_returns(self.curve, num_periods, day_index=self.day_index)
+        return self.period_splits[num_periods]
+
+
+def loss_inputs(backtest_results):
+    """
+    Return backtest_results as LossInputs, reusing it when it already is one.
+    """
+    return backtest_results if isinstance(backtest_results, LossInputs) else LossInputs(backtest_results)
+
+
+LAGS = 5
+
+
+def lag_windows(returns, lags=LAGS):
+    """
+    The rows of the lagged regression on one return series, as views of it: X[j] holds the
+    lags returns before y[j]. The same rows as stacking returns[i : i + len(returns) - lags]
+    for i in range(lags), without copying.
+    """
+    windows = np.lib.stride_tricks.sliding_window_view(returns, lags + 1)
+    return windows[:, :lags], windows[:, lags]
+
+
+def stack_lag_windows(returns_batch, lags=LAGS):
+    """
+    Lag windows of several return series, one series after the other, so they can be
+    fitted at once without padding.
+
+    Parameters:
+    - returns_batch (list): Return arrays, each longer than lags.
+    - lags (int): Previous returns per row.
+
+    Returns:
+    - tuple: (X, y, starts). X is (rows, lags) and y (rows,); starts holds the first row of
+      each series.
+    """
+    windows = [lag_windows(returns, lags) for returns in returns_batch]
+    starts = np.cumsum([0] + [len(y) for _, y in windows[:-1]])
+    if len(windows) == 1:
+        return windows[0][0], windows[0][1], starts
+    return np.concatenate([X for X, _ in windows]), np.concatenate([y for _, y in windows]), starts
+
+
+def _series_sum(rows, starts):
+    # Sum of the rows of every series
+    return np.add.reduceat(rows, starts, axis=0)
+
+
+def _series_counts(starts, n_rows):
+    return np.diff(np.r_[starts, n_rows])
+
+
+def standardize_lags(X, starts):
+    """
+    Standardize every lag column of every series, as StandardScaler().fit_transform does:
+    zero mean, unit variance, and a scale of 1 for columns that are constant up to rounding.
+    """
+    counts = _series_counts(starts, len(X))
+    mean = _series_sum(X, starts) / counts[:, None]
+    centered = X - np.repeat(mean, counts, axis=0)
+    # Two-pass variance with the same correction term as StandardScaler
+    var = (_series_sum(centered ** 2, starts) - _series_sum(centered, starts) ** 2 / counts[:, None]) / counts[:, None]
+    eps = np.finfo(np.float64).eps
+    constant = var <= counts[:, None] * eps * var + (counts[:, None] * mean * eps) ** 2
+    return centered / np.repeat(np.where(constant, 1.0, np.sqrt(var)), counts, axis=0)
+
+
+def _centered_gram(X, y, starts):
+    # The normal equations of the regressions with an intercept: X'X and X'y of the centered rows
+    counts = _series_counts(starts, len(X))
+    x_mean = _series_sum(X, starts) / counts[:, None]
+    y_mean = _series_sum(y, starts) / counts
+    X_centered = X - np.repeat(x_mean, counts, axis=0)
+    y_centered = y - np.repeat(y_mean, counts)
+    # One small BLAS product per series beats summing per-row outer products
+    ends = np.r_[starts[1:], len(X)]
+    gram = np.stack([X_centered[a:b].T @ X_centered[a:b] for a, b in zip(starts, ends)])
+    xy = np.stack([X_centered[a:b].T @ y_centered[a:b] for a, b in zip(starts, ends)])
+    yy = _series_sum(y_centered ** 2, starts)
+    return x_mean, y_mean, gram, xy, yy
+
+
+def _predict(X, starts, coefficients, x_mean, y_mean):
+    counts = _series_counts(starts, len(X))
+    intercept = y_mean - np.einsum('bi,bi->b', x_mean, coefficients)
+    return np.einsum('ri,ri->r', X, np.repeat(coefficients, counts, axis=0)) + np.repeat(intercept, counts)
+
+
+def ridge_predictions(X, y, starts, alpha=1.0, gram=None):
+    """
+    In-sample predictions of Ridge(alpha) fitted to each series, in closed form: the
+    (lags x lags) normal equations (X'X + alpha I) w = X'y of every series are solved at once.
+
+    Parameters:
+    - X, y, starts: From stack_lag_windows, X usually standardized.
+    - alpha (float): L2 penalty, as sklearn's Ridge.
+    - gram (tuple): Optional. The normal equations of X and y when already computed, e.g.
+      LossInputs.lag_gram.
+
+    Returns:
+    - ndarray: The prediction for every row.
+    """
+    x_mean, y_mean, gram, xy, _ = gram if gram is not None else _centered_gram(X, y, starts)
+    coefficients = np.linalg.solve(gram + alpha * np.eye(X.shape[1]), xy[..., None])[..., 0]
+    return _predict(X, starts, coefficients, x_mean, y_mean)
+
+
+def _elastic_net_gap(w, Qw, xy, yy, l1, l2):
+    # Duality gap of the elastic net (sklearn's formulation A), from the Gram matrix
+    w_l2_norm2 = np.einsum('bi,bi->b', w, w)
+    q_dot_w = np.einsum('bi,bi->b', w, xy)
+    R_norm2 = yy + np.einsum('bi,bi->b', w, Qw) - 2.0 * q_dot_w
+    XtA = xy - Qw - l2[:, None] * w
+    dual_norm_XtA = np.abs(XtA).max(axis=1)
+    primal = 0.5 * (R_norm2 + l2 * w_l2_norm2) + l1 * np.abs(w).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scale = np.where(dual_norm_XtA > l1, l1 / dual_norm_XtA, 1.0)
+    dual = -0.5 * scale ** 2 * (R_norm2 + l2 * w_l2_norm2) + scale * (yy - q_dot_w)
+    return primal - dual, XtA, dual_norm_XtA
+
+
+def elastic_net_predictions(X, y, starts, alpha=0.5, l1_ratio=0.5, tol=1e-4, max_iter=1000, gram=None):
+    """
+    In-sample predictions of ElasticNet(alpha, l1_ratio) fitted to each series by cyclic
+    coordinate descent.
+
+    Follows sklearn's solver step for step: it starts from zero coefficients, checks the
+    duality gap before the first sweep and whenever the largest update is within tol of the
+    largest coefficient, stops once the gap is within tol * y'y, and drops the features the
+    gap-safe rule proves to be zero. The sweeps run on the (lags x lags) Gram matrix of every
+    series at once, and a series stops updating as soon as it has converged.
+
+    Parameters:
+    - X, y, starts: From stack_lag_windows, X usually standardized.
+    - alpha, l1_ratio (float): Penalties, as sklearn's ElasticNet.
+    - tol (float): Convergence tolerance, as sklearn's ElasticNet.
+    - max_iter (int): Most sweeps over the features.
+    - gram (tuple): Optional. The normal equations of X and y when already computed, e.g.
+      LossInputs.lag_gram.
+
+    Returns:
+    - ndarray: The prediction for every row.
+    """
+    x_mean, y_mean, gram, xy, yy = gram if gram is not None else _centered_gram(X, y, starts)
+    counts = _series_counts(starts, len(X))
+    l1 = alpha * l1_ratio * counts
+    l2 = alpha * (1.0 - l1_ratio) * counts
+    diagonal = gram.diagonal(axis1=1, axis2=2)
+    gap_tol = tol * yy
+
+    w = np.zeros_like(xy)
+    Qw = np.zeros_like(xy)
+    gap, XtA, dual_norm_XtA = _elastic_net_gap(w, Qw, xy, yy, l1, l2)
+    running = ~(gap <= gap_tol)
+    active = diagonal != 0
+
+    def screen(rows):
+        # Gap-safe screening: features whose coefficient must be 0 at the optimum leave the sweeps
+        if alpha * l1_ratio == 0:
+            return
+        with np.errstate(divide='ignore', invalid='ignore'):
+            Xj_theta = XtA / np.maximum(l1, dual_norm_XtA)[:, None]
+            keep = (1 - np.abs(Xj_theta)) / np.sqrt(diagonal + l2[:, None]) <= (np.sqrt(2 * gap) / l1)[:, None]
+        dropped = rows[:, None] & active & ~keep
+        Qw[:] -= np.einsum('bi,bij->bj', np.where(dropped, w, 0.0), gram)
+        w[dropped] = 0.0
+        active[dropped] = False
+
+    screen(running)
+    for n_iter in range(max_iter):
+        if not running.any():
+            break
+        w_max = np.zeros(len(w))
+        d_w_max = np.zeros(len(w))
+        for j in range(w.shape[1]):
+            updating = running & active[:, j]
+            w_j = w[:, j].copy()
+            tmp = xy[:, j] - Qw[:, j] + w_j * diagonal[:, j]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                updated = np.sign(tmp) * np.maximum(np.abs(tmp) - l1, 0) / (diagonal[:, j] + l2)
+            w[:, j] = np.where(updating, updated, w_j)
+            changed = w[:, j] != w_j
+            Qw[changed] += (w[changed, j] - w_j[changed])[:, None] * gram[changed, j]
+            d_w_max = np.where(updating, np.fmax(d_w_max, np.abs(w[:, j] - w_j)), d_w_max)
+            w_max = np.where(updating, np.fmax(w_max, np.abs(w[:, j])), w_max)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            check = running & ((w_max == 0.0) | (d_w_max / w_max <= tol) | (n_iter == max_iter - 1))
+        if check.any():
+            gap_now, XtA_now, dual_norm_now = _elastic_net_gap(w, Qw, xy, yy, l1, l2)
+            gap[check], XtA[check], dual_norm_XtA[check] = gap_now[check], XtA_now[check], dual_norm_now[check]
+            running &= ~(check & (gap <= gap_tol))
+            screen(check & running)
+    return _predict(X, starts, w, x_mean, y_mean)
+
+
+def regression_losses(y, y_pred, starts, objective):
+    """
+    Loss of the lagged regression of every series: the mean squared error ('mse') or minus
+    the profit of trading the sign of each prediction ('profit').
+    """
+    if objective == 'mse':
+        mse = _series_sum((y - y_pred) ** 2, starts) / _series_counts(starts, len(y))
+        return mse
+    elif objective == 'profit':
+        profit = _series_sum(np.sign(y_pred) * y, starts)
+        return -profit
+    else:
+        raise ValueError(f"Unknown objective '{objective}'")
+
+
+def lagged_regression_losses(backtest_results_batch, predictions, objective='profit'):
+    """
+    Fit the lagged regression of every equity curve at once and return its loss.
+
+    Parameters:
+    - backtest_results_batch (list): Backtest results (or LossInputs), one per curve.
+    - predictions (function): ridge_predictions or elastic_net_predictions.
+    - objective (str): 'profit' or 'mse'.
+
+    Returns:
+    - ndarray: One loss per curve, equal to the matching loss function on that curve alone;
+      NaN for curves with too few returns for one lag row.
+    """
+    batch = [loss_inputs(backtest_results) for backtest_results in backtest_results_batch]
+    fitted = [b for b, inputs in enumerate(batch) if len(inputs.returns) > LAGS]
+    losses = np.full(len(batch), np.nan)
+    if fitted:
+        X, y, starts = stack_lag_windows([batch[b].returns for b in fitted])
+        X = standardize_lags(X, starts)
+        losses[fitted] = regression_losses(y, predictions(X, y, starts), starts, objective)
+    return losses
+
+@requires('total_amount_of_money_made')
 def simple_loss_function(backtest_results):
     total_profit_loss = backtest_results['total_amount_of_money_made']
     return -total_profit_loss
 
+@requires('portfolio_values_over_time')
 def sharpe_ratio_loss_function(backtest_results):
-    values = [d['value'] for d in backtest_results['portfolio_values_over_time']]
-    if len(values) < 2:
+    inputs = loss_inputs(backtest_results)
+    if len(inputs.values) < 2:
         return 0.0
 
-    returns = np.diff(values) / values[:-1]
+    returns = inputs.returns
     mean_return = np.mean(returns)
     std_return = np.std(returns)
     sharpe_ratio = mean_return / std_return if std_return != 0 else 0.0
 
     return -sharpe_ratio
 
+@requires('portfolio_values_over_time')
 def ridge_regression_loss_function(backtest_results, objective='profit'):
-    values = [d['value'] for d in backtest_results['portfolio_values_over_time']]
-    if len(values) < 2:
-        raise ValueError("Not enough data to compute returns for Ridge regression.")
+    inputs = loss_inputs(backtest_results)
+    if len(inputs.values) < 2:
+        raise NotEnoughDataError("Not enough data to compute returns for Ridge regression.")
+    if inputs.scaled_lags is None:
+        raise NotEnoughDataError("Not enough data to create lagged features for Ridge regression.")
 
-    returns = np.diff(values) / values[:-1]
-    min_length = len(returns) - 5
-    if min_length <= 0:
-        raise ValueError("Not enough data to create lagged features for Ridge regression.")
-    X = np.hstack([returns[i : i + min_length].reshape(-1, 1) for i in range(5)])
-    y = returns[5 : 5 + min_length]
+    X_scaled, y, starts = inputs.scaled_lags
+    y_pred = ridge_predictions(X_scaled, y, starts, alpha=1.0, gram=inputs.lag_gram)
+    return regression_losses(y, y_pred, starts, objective)[0]
 
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
-    model = Ridge(alpha=1.0)
-    model.fit(X_scaled, y)
+@requires('portfolio_values_over_time')
+def elastic_net_loss_function(backtest_results, objective='profit'):
+    inputs = loss_inputs(backtest_results)
+    if len(inputs.values) < 2:
+        raise NotEnoughDataError("Not enough data to compute returns for Elastic Net regression.")
+    if inputs.scaled_lags is None:
+        raise NotEnoughDataError("Not enough data to create lagged features for Elastic Net regression.")
 
-    y_pred = model.predict(X_scaled)
+    X_scaled, y, starts = inputs.scaled_lags
+    y_pred = elastic_net_predictions(X_scaled, y, starts, alpha=0.5, l1_ratio=0.5, gram=inputs.lag_gram)
+    return regression_losses(y, y_pred, starts, objective)[0]
 
-    if objective == 'mse':
-        mse = np.mean((y - y_pred) ** 2)
-        return mse
-    elif objective == 'profit':
-        profit = np.sum(np.sign(y_pred) * y)
-        return -profit
-    else:
-        raise ValueError(f"Unknown objective '{objective}'")
 
-def elastic_net_loss_function(backtest_results, objective='profit'):
-    values = [d['value'] for d in backtest_results['portfolio_values_over_time']]
-    if len(values) < 2:
-        raise ValueError("Not enough data to compute returns for Elastic Net regression.")
+ONE_DAY_NS = 86_400_000_000_000
 
-    returns = np.diff(values) / values[:-1]
-    min_length = len(returns) - 5
-    if min_length <= 0:
-        raise ValueError("Not enough data to create lagged features for Elastic Net regression.")
-    X = np.hstack([returns[i : i + min_length].reshape(-1, 1) for i in range(5)])
-    y = returns[5 : 5 + min_length]
 
-    scaler = StandardScaler()
-    X_scaled = scaler.fit_transform(X)
-    en = ElasticNet(alpha=0.5, l1_ratio=0.5)
-    en.fit(X_scaled, y)
+def day_offsets(data):
+    """
+    Index the rows of an equity curve by whole days since its first row.
 
-    y_pred = en.predict(X_scaled)
+    Parameters:
+    - data: PortfolioValues, or a list of dictionaries with 'date_time', 'value' and 'stock_value'.
 
-    if objective == 'mse':
-        mse = np.mean((y - y_pred) ** 2)
-        return mse
-    elif objective == 'profit':
-        profit = np.sum(np.sign(y_pred) * y)
-        return -profit
+    Returns:
+    - tuple: (days, first_rows, values, stock_values). days holds each distinct day offset
+      (int64), first_rows the first row of that day; values and stock_values are the columns
+      in date order.
+    """
+    data = PortfolioValues.from_records(data)
+    date_time, values, stock_values = data.date_time, data.value, data.stock_value
+    if np.any(date_time[1:] < date_time[:-1]):
+        order = np.argsort(date_time, kind='stable')
+        date_time, values, stock_values = date_time[order], values[order], stock_values[order]
+    row_days = (date_time - date_time[0]) // ONE_DAY_NS
+    first_rows = np.flatnonzero(np.r_[True, row_days[1:] != row_days[:-1]])
+    return row_days[first_rows], first_rows, values, stock_values
+
+
+def period_returns(days, first_rows, column, period_length):
+    """
+    Return of the column over each period of period_length days, for periods with at least two rows.
+
+    A day belongs to period day // period_length, as get_period_returns always assigned its
+    rows. Period k starts at the first day from k * period_length on, found with searchsorted
+    and corrected where rounding puts the exact day // period_length on the other side, so
+    only the period boundaries are computed, not an id per row. Periods whose return is NaN
+    are dropped.
+
+    Parameters:
+    - days, first_rows: Distinct day offsets and their first rows, from day_offsets.
+    - column (ndarray): values or stock_values from day_offsets.
+    - period_length (float): Days per period.
+
+    Returns:
+    - ndarray: The period returns, oldest first.
+    """
+    if period_length == 0:
+        raise NotEnoughDataError("Cannot split a portfolio spanning less than a day into periods.")
+    periods = np.arange(1, int(days[-1] // period_length) + 1)
+    boundaries = np.searchsorted(days, periods * period_length)
+    # At most one whole day can sit within rounding of a boundary
+    step_back = (boundaries > 0) & (days[np.maximum(boundaries - 1, 0)] // period_length >= periods)
+    boundaries[step_back] -= 1
+    step_on = (boundaries < len(days)) & (days[np.minimum(boundaries, len(days) - 1)] // period_length < periods)
+    boundaries[step_on] += 1
+    first_days = np.unique(np.r_[0, boundaries[boundaries < len(days)]])
+
+    starts = first_rows[first_days]
+    ends = np.r_[starts[1:], len(column)] - 1
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = (column[ends] - column[starts]) / column[starts]
+    return returns[(ends > starts) & ~np.isnan(returns)]
+
+
+def trend_r_squared(returns):
+    """
+    R-squared of returns against their position, as linregress(range(len(returns)), returns).rvalue ** 2
+    computes it, without the rest of the regression.
+    """
+    x = np.arange(len(returns))
+    ssxm, ssxym, _, ssym = np.cov(x, returns, bias=1).flat
+    if ssxm == 0.0 or ssym == 0.0:
+        r = np.nan if ssxym == 0 else 0.0
     else:
-        raise ValueError(f"Unknown objective '{objective}'")
+        # Clip numerical error as linregress does
+        r = min(max(ssxym / np.sqrt(ssxm * ssym), -1.0), 1.0)
+    return r ** 2
 
-def find_stabilized_variance(data, min_period=20, max_period=100):
+
+def find_stabilized_variance(data, min_period=20, max_period=100, day_index=None):
 # \[
 # \text{Stabilized Variance Period } (n^*) = 
 # \begin{cases} 
@@ -120,18 +521,16 @@ def find_stabilized_variance(data, min_period=20, max_period=100):
     Returns 50 if stabilization is not found within a given range.
 
     Parameters:
-    - data: List of dictionaries with 'date_time' (Timestamp) and 'value' (float).
+    - data: PortfolioValues, or a list of dictionaries with 'date_time' (Timestamp) and 'value' (float).
     - min_period: Minimum number of periods to start with.
     - max_period: Maximum number of periods to check.
+    - day_index: Optional. day_offsets(data), when the caller already has it.
 
     Returns:
     - Optimal number of periods where variance stabilizes, or 50 if not found.
     """
-    df = pd.DataFrame(data)
-    df['date_time'] = pd.to_datetime(df['date_time'])
-    df.sort_values('date_time', inplace=True)
-
-    total_time = (df['date_time'].max() - df['date_time'].min()).days
+    days, first_rows, values, _ = day_index if day_index is not None else day_offsets(data)
+    total_time = int(days[-1])
     results = []
     
     # Start binary-like search to optimize the number of periods
@@ -140,12 +539,9 @@ def find_stabilized_variance(data, min_period=20, max_period=100):
     while low <= high:
         num_periods = (low + high) // 2
         period_length = total_time / num_periods
-        df['period'] = ((df['date_time'] - df['date_time'].min()).dt.days // period_length).astype(int)
 
-        # Compute returns per period
-        returns = df.groupby('period')['value'].apply(
-            lambda g: (g.iloc[-1] - g.iloc[0]) / g.iloc[0] if len(g) > 1 else None
-        ).dropna()
+        # Compute returns per period, from the day offsets shared by every candidate
+        returns = period_returns(days, first_rows, values, period_length)
 
         if len(returns) < 2:
             low = num_periods + 1  # Not enough data for this split, go larger
@@ -174,36 +570,20 @@ def find_stabilized_variance(data, min_period=20, max_period=100):
     return 50
 
 
-def get_period_returns(data, num_periods):
-    df = pd.DataFrame(data)
-    df['date_time'] = pd.to_datetime(df['date_time'])
-    df.sort_values('date_time', inplace=True)
-
-    # Calculate total days and period length in days
-    total_time = (df['date_time'].max() - df['date_time'].min()).days
-    period_length = total_time / num_periods
-    
-    # Assign each row to a period based on integer division
-    df['period'] = ((df['date_time'] - df['date_time'].min()).dt.days // period_length).astype(int)
+def get_period_returns(data, num_periods, day_index=None):
+    # Calculate total days and period length in days (day_index: day_offsets(data), if already computed)
+    days, first_rows, values, stock_values = day_index if day_index is not None else day_offsets(data)
+    period_length = int(days[-1]) / num_periods
 
     # Compute portfolio returns
-    portfolio_returns = (
-        df.groupby('period')['value']
-        .apply(lambda g: (g.iloc[-1] - g.iloc[0]) / g.iloc[0] if len(g) > 1 else None)
-        .dropna()
-        .tolist()
-    )
+    portfolio_returns = period_returns(days, first_rows, values, period_length).tolist()
 
     # Compute market (stock) returns
-    market_returns = (
-        df.groupby('period')['stock_value']
-        .apply(lambda g: (g.iloc[-1] - g.iloc[0]) / g.iloc[0] if len(g) > 1 else None)
-        .dropna()
-        .tolist()
-    )
+    market_returns = period_returns(days, first_rows, stock_values, period_length).tolist()
 
     return portfolio_returns, market_returns
 
+@requires('portfolio_values_over_time', 'trades_history')
 def gt_function(backtest_results, stabilize=False, t_or_p="trades"):
     """
     Calculates the GTScore (Golden-Ticket Score).
@@ -219,9 +599,11 @@ def gt_function(backtest_results, stabilize=False, t_or_p="trades"):
     - float: GTScore value.
     """
     
+    inputs = loss_inputs(backtest_results)
+
     # Get the number of periods
     if stabilize:
-        num_periods = find_stabilized_variance(backtest_results['portfolio_values_over_time'])
+        num_periods = inputs.stabilized_periods
     else:
         num_periods = 50
     
@@ -237,18 +619,16 @@ def gt_function(backtest_results, stabilize=False, t_or_p="trades"):
 
     
     # Get the returns from each period
-    percentage_returns_by_trade = []
-    for trade in backtest_results["trades_history"]:
-            percentage_returns_by_trade.append(trade["profit_loss_percent"]) 
+    percentage_returns_by_trade = inputs.trade_returns
     
     if t_or_p == "portfolio_value":
-        period_percentage_returns, period_percentage_returns_market = get_period_returns(backtest_results['portfolio_values_over_time'], num_periods)
+        period_percentage_returns, period_percentage_returns_market = inputs.period_returns(num_periods)
     elif t_or_p == "trades":
         period_percentage_returns = percentage_returns_by_trade
         period_percentage_returns_market = []
         #just make a list of the actual mean return based on same num trades
-        starting_market_value = backtest_results["portfolio_values_over_time"][0]["stock_value"]
-        ending_market_value = backtest_results["portfolio_values_over_time"][-1]["stock_value"]
+        starting_market_value = float(inputs.stock_values[0])
+        ending_market_value = float(inputs.stock_values[-1])
         the_mum = (ending_market_value / starting_market_value) ** (1 / num_trades) - 1
         for i in range(0,num_trades):
             period_percentage_returns_market.append(the_mum)
@@ -256,7 +636,7 @@ def gt_function(backtest_results, stabilize=False, t_or_p="trades"):
     # Calculate necessary values
     mu = np.mean(period_percentage_returns)
     mum = np.mean(period_percentage_returns_market)
-    r2 = linregress(range(len(percentage_returns_by_trade)), percentage_returns_by_trade).rvalue ** 2
+    r2 = trend_r_squared(percentage_returns_by_trade)
 
     negative_returns = [r for r in period_percentage_returns if r < 0]
     sigma_d = np.std(negative_returns) if negative_returns else 1e-6  # Avoid division by zero
@@ -292,3 +672,84 @@ def gt_function(backtest_results, stabilize=False, t_or_p="trades"):
     gt_score = -gt_score
 
     return gt_score
+
+
+# Every loss compute_all_losses reports, by name. Add entries to report more objectives.
+LOSS_FUNCTIONS = {
+    loss_function.__name__: loss_function for loss_function in (
+        simple_loss_function,
+        sharpe_ratio_loss_function,
+        ridge_regression_loss_function,
+        elastic_net_loss_function,
+        gt_function,
+    )
+}
+
+
+def drawdown_stats(inputs):
+    """
+    Maximum drawdown of the equity curve and the longest time it spent below a previous peak.
+
+    Returns:
+    - dict: 'max_drawdown' (fraction of the peak) and 'max_drawdown_duration' (Timedelta from
+      the peak until the value first reaches it again, or until the end of the curve).
+    """
+    values = inputs.values
+    if len(values) == 0:
+        return {'max_drawdown': 0.0, 'max_drawdown_duration': pd.Timedelta(0)}
+    peaks = np.maximum.accumulate(values)
+    max_drawdown = float(np.max(1 - values / peaks))
+
+    # Underwater stretches: from the row after a peak until the first row back at it
+    underwater = np.r_[0, (values < peaks).astype(np.int8), 0]
+    edges = np.diff(underwater)
+    starts = np.flatnonzero(edges == 1)
+    stops = np.minimum(np.flatnonzero(edges == -1), len(values) - 1)
+    if len(starts) == 0:
+        return {'max_drawdown': max_drawdown, 'max_drawdown_duration': pd.Timedelta(0)}
+    date_time = inputs.curve.date_time
+    longest = np.max(date_time[stops] - date_time[starts - 1])
+    return {'max_drawdown': max_drawdown, 'max_drawdown_duration': pd.Timedelta(int(longest))}
+
+
+def exposure_stats(inputs):
+    """
+    Time spent in the market: the summed holding time of every trade and its share of the curve's span.
+
+    Returns:
+    - dict: 'time_in_market' (Timedelta) and 'exposure' (fraction of the total time).
+    """
+    time_in_market = sum((trade['time_held'] for trade in inputs.results['trades_history']), pd.Timedelta(0))
+    date_time = inputs.curve.date_time
+    span = int(date_time[-1] - date_time[0]) if len(date_time) else 0
+    return {'time_in_market': time_in_market, 'exposure': time_in_market.value / span if span else 0.0}
+
+
+def compute_all_losses(backtest_results, losses=None):
+    """
+    Evaluate every registered loss on one set of backtest results, plus drawdown and exposure stats.
+
+    The curve, returns, trade returns and period splits are derived once (see LossInputs)
+    and shared by all losses; the ridge and elastic-net losses also share one standardized
+    lag matrix and its normal equations. Each loss equals calling the loss function on the
+    results directly. A loss that is too short for its inputs (NotEnoughDataError, e.g. fewer
+    returns than lags for the regressions) is reported as NaN; any other error propagates.
+
+    Parameters:
+    - backtest_results (dict): Results of run_backtest or compile_backtest_results_sequential.
+    - losses (dict): Optional. {name: loss function}; defaults to LOSS_FUNCTIONS.
+
+    Returns:
+    - dict: The loss of every name, then 'max_drawdown', 'max_drawdown_duration',
+      'time_in_market' and 'exposure'.
+    """
+    inputs = loss_inputs(backtest_results)
+    all_losses = {}
+    for name, loss_function in (losses if losses is not None else LOSS_FUNCTIONS).items():
+        try:
+            all_losses[name] = loss_function(inputs)
+        except NotEnoughDataError:
+            all_losses[name] = np.nan
+    all_losses.update(drawdown_stats(inputs))
+    all_losses.update(exposure_stats(inputs))
+    return all_losses
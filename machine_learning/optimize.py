@@ -1,21 +1,34 @@
 # optimize.py
 
+import os
+import sys
+import json
+import hashlib
+import inspect
+import sqlite3
+import threading
+import functools
 import random
 import pandas as pd
 import numpy as np
 import warnings
 from tqdm import tqdm
 from datetime import timedelta
-import copy
-from datetime import datetime
-from collections import defaultdict
+import time
+from collections import defaultdict, OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
 from modules import backtester
+from modules.portfolio_values import PortfolioValues
+from machine_learning.loss_functions import required_results, compute_all_losses, LOSS_FUNCTIONS
+from strategies.indicator_tensors import prime_indicator_cache
 
 warnings.filterwarnings("ignore")
 
 # Optional: Hyperopt for Bayesian-like optimization
 try:
-    from hyperopt import fmin, tpe, hp, Trials, STATUS_OK
+    from hyperopt import tpe, Trials, STATUS_OK, space_eval
+    from hyperopt import base as hyperopt_base
+    from hyperopt.utils import coarse_utcnow
     HYPEROPT_INSTALLED = True
 except ImportError:
     HYPEROPT_INSTALLED = False
@@ -33,27 +46,38 @@ def calculate_average_yearly_gain(portfolio_values):
     Calculates the average yearly percentage gain from a list of portfolio values over time.
     
     Args:
-        portfolio_values (list): A list of dictionaries with "date_time" (pandas Timestamp) and "value" keys.
+        portfolio_values (PortfolioValues or list): Equity curve, or a list of dictionaries with "date_time" (pandas Timestamp) and "value" keys.
 
     Returns:
         float: The average yearly percentage gain as a percentage (e.g., 8.0 for 8%).
     """
-    # Parse the data into a dictionary grouped by year
-    yearly_values = defaultdict(list)
-    for record in portfolio_values:
-        # Ensure date_time is a pandas Timestamp and extract the year
-        date = record["date_time"].to_pydatetime() if hasattr(record["date_time"], "to_pydatetime") else record["date_time"]
-        yearly_values[date.year].append(record["value"])
-    
-    yearly_gains = []
-    
-    # Calculate yearly gains
-    for year, values in sorted(yearly_values.items()):
-        if len(values) >= 2:  # Ensure we have at least start and end values
-            start_value = values[0]
-            end_value = values[-1]
-            yearly_gain = ((end_value - start_value) / start_value)
-            yearly_gains.append(yearly_gain)
+    if isinstance(portfolio_values, PortfolioValues):
+        # First and last row of every calendar year (in the dates' timezone), from the arrays
+        years = portfolio_values.dates.year.to_numpy()
+        _, first_rows = np.unique(years, return_index=True)
+        _, last_rows_reversed = np.unique(years[::-1], return_index=True)
+        last_rows = len(years) - 1 - last_rows_reversed
+        complete = last_rows > first_rows  # Ensure we have at least start and end values
+        start_values = portfolio_values.value[first_rows[complete]]
+        end_values = portfolio_values.value[last_rows[complete]]
+        yearly_gains = ((end_values - start_values) / start_values).tolist()
+    else:
+        # Parse the data into a dictionary grouped by year
+        yearly_values = defaultdict(list)
+        for record in portfolio_values:
+            # Ensure date_time is a pandas Timestamp and extract the year
+            date = record["date_time"].to_pydatetime() if hasattr(record["date_time"], "to_pydatetime") else record["date_time"]
+            yearly_values[date.year].append(record["value"])
+
+        yearly_gains = []
+
+        # Calculate yearly gains
+        for year, values in sorted(yearly_values.items()):
+            if len(values) >= 2:  # Ensure we have at least start and end values
+                start_value = values[0]
+                end_value = values[-1]
+                yearly_gain = ((end_value - start_value) / start_value)
+                yearly_gains.append(yearly_gain)
     
     # Handle cases where years are incomplete
     if len(yearly_gains) > 0:
@@ -64,97 +88,106 @@ def calculate_average_yearly_gain(portfolio_values):
     return average_yearly_gain
 
 
-def compile_backtest_results_sequential(results, data_frames):
+def compile_backtest_results_sequential(results, data_frames, keys=None):
     """
     Combine multiple backtest results (dicts) into one dictionary.
 
     This version preserves chronological order by shifting dates and scaling portfolio values
-    to ensure continuity across multiple tickers or timeframes.
+    to ensure continuity across multiple tickers or timeframes. Only the date offset and
+    scaling factors are chained in Python, once per result; the equity curves are shifted,
+    scaled and concatenated as arrays and each result's trades are shifted in bulk.
 
     Parameters:
     - results: List of backtest result dictionaries.
     - data_frames: List of DataFrames used in the backtests.
+    - keys: Optional. Only compile these keys of the compiled results, e.g. the ones a loss
+      function declares (see loss_functions.required_results). The first and last date and
+      value come from the chain itself, so the combined curve and the shifted trades are
+      only built when a requested key needs them. None compiles everything.
 
     Returns:
     - dict: Compiled results with adjusted portfolio values and chronological order.
     """
-    import pandas as pd
-    from datetime import timedelta
-    first_backtest = copy.deepcopy(results[0])
+    def wanted(*names):
+        return keys is None or any(name in keys for name in names)
+
     compiled_results = {}
-        
-    compiled_portfolio_values = first_backtest['portfolio_values_over_time']
-    compiled_trades_history = first_backtest['trades_history']
+    curves = [PortfolioValues.from_records(r['portfolio_values_over_time']) for r in results]
+    one_day = pd.Timedelta(days=1).value
 
-    # Track the last value and date of the previous backtest
-    last_value = compiled_portfolio_values[-1]['value']
-    last_date = pd.to_datetime(compiled_portfolio_values[-1]['date_time'])
+    # Date offset (ns) and value scaling of each curve, so it continues where the previous one ends
+    date_offsets = np.zeros(len(curves), dtype=np.int64)
+    scaling_factors = np.ones(len(curves))
+    stock_scaling_factors = np.ones(len(curves))
 
-    last_stock_value = compiled_portfolio_values[-1]['stock_value']
+    # Track the last value and date of the previous backtest (dates as Python ints, which cannot overflow)
+    last_date = int(curves[0].date_time[-1])
+    last_value = curves[0].value[-1]
+    last_stock_value = curves[0].stock_value[-1]
 
-    for i in range(1, len(results)):
-        
-        current_results = copy.deepcopy(results[i])
-        current_portfolio_values = copy.deepcopy(current_results['portfolio_values_over_time'])
+    for i in range(1, len(curves)):
+        curve = curves[i]
 
         # Shift the dates for the current portfolio to follow the previous
-        first_date = pd.to_datetime(current_portfolio_values[0]['date_time'])
-        date_offset = last_date + timedelta(days=1) - first_date
+        date_offsets[i] = last_date + one_day - int(curve.date_time[0])
 
         # Calculate the scaling factor for the portfolio values
-        first_value = current_portfolio_values[0]['value']
-        scaling_factor = last_value / first_value if first_value != 0 else 1
+        first_value = curve.value[0]
+        scaling_factors[i] = last_value / first_value if first_value != 0 else 1
 
         # Calculate the scaling factor for the stock values
-        first_stock_value = current_portfolio_values[0]['stock_value']
-        stock_scaling_factor = last_stock_value / first_stock_value if first_stock_value != 0 else 1
-
-        # Adjust the portfolio values and dates
-        adjusted_portfolio_values = []
-        for entry in current_portfolio_values:
-            adjusted_value = entry['value'] * scaling_factor
-            adjusted_stock_value = entry['stock_value'] * stock_scaling_factor
-            adjusted_date = pd.to_datetime(entry['date_time']) + date_offset
-            adjusted_portfolio_values.append({
-                'date_time': adjusted_date,
-                'value': adjusted_value,
-                'stock_value': adjusted_stock_value
-            })
-
-        # Append the adjusted portfolio values to the compiled list
-        compiled_portfolio_values.extend(adjusted_portfolio_values)
-
-        # Adjust and append trades history
-        for trade in current_results['trades_history']:
-            adjusted_trade = trade.copy()
-            adjusted_trade['purchase_date'] += date_offset
-            adjusted_trade['sale_date'] += date_offset
-            compiled_trades_history.append(adjusted_trade)
+        first_stock_value = curve.stock_value[0]
+        stock_scaling_factors[i] = last_stock_value / first_stock_value if first_stock_value != 0 else 1
 
         # Update last_value and last_date for the next iteration
-        last_value = adjusted_portfolio_values[-1]['value']
-        last_date = adjusted_portfolio_values[-1]['date_time']
-        last_stock_value = adjusted_portfolio_values[-1]['stock_value']
+        last_date = int(curve.date_time[-1]) + int(date_offsets[i])
+        if last_date > pd.Timestamp.max.value:
+            raise pd.errors.OutOfBoundsDatetime(f"Compiled dates run past {pd.Timestamp.max}; too many results to chain.")
+        last_value = curve.value[-1] * scaling_factors[i]
+        last_stock_value = curve.stock_value[-1] * stock_scaling_factors[i]
+
+    if wanted('portfolio_values_over_time', 'average_return_per_year'):
+        # Adjust every curve's dates and values at once
+        lengths = [len(curve) for curve in curves]
+        portfolio_values = PortfolioValues(
+            np.concatenate([curve.date_time for curve in curves]) + np.repeat(date_offsets, lengths),
+            np.concatenate([curve.value for curve in curves]) * np.repeat(scaling_factors, lengths),
+            np.concatenate([curve.stock_value for curve in curves]) * np.repeat(stock_scaling_factors, lengths),
+            tz=curves[0].tz
+        )
+        # Update compiled results with the new sequential portfolio values
+        compiled_results['portfolio_values_over_time'] = portfolio_values
 
-    # Update compiled results with the new sequential portfolio values
-    compiled_results['portfolio_values_over_time'] = compiled_portfolio_values
-    compiled_results['trades_history'] = compiled_trades_history
+    if wanted('trades_history'):
+        # Adjust and append trades history: the trades of all later results are shifted in one go
+        compiled_trades_history = [trade.copy() for trade in results[0]['trades_history']]
+        later_trades = [trade for r in results[1:] for trade in r['trades_history']]
+        if later_trades:
+            trade_offsets = pd.to_timedelta(np.repeat(date_offsets[1:], [len(r['trades_history']) for r in results[1:]]))
+            purchase_dates = pd.DatetimeIndex([trade['purchase_date'] for trade in later_trades]) + trade_offsets
+            sale_dates = pd.DatetimeIndex([trade['sale_date'] for trade in later_trades]) + trade_offsets
+            compiled_trades_history.extend(
+                {**trade, 'purchase_date': purchase_date, 'sale_date': sale_date}
+                for trade, purchase_date, sale_date in zip(later_trades, purchase_dates, sale_dates)
+            )
+        compiled_results['trades_history'] = compiled_trades_history
 
     # Calculate total time passed
-    total_time_passed = compiled_portfolio_values[-1]['date_time'] - compiled_portfolio_values[0]['date_time']
+    total_time_passed = pd.Timedelta(last_date - int(curves[0].date_time[0]))
     compiled_results['total_time_passed'] = total_time_passed
     
     total_years = total_time_passed / timedelta(days=365.25)  # Average number of days in a year
     compiled_results['total_years'] = total_years
     
     # use the portfolio_values_over_time to calcualte average yearly gain
-    starting_value = compiled_portfolio_values[0]['value']
-    ending_value = compiled_portfolio_values[-1]['value']
+    starting_value = float(curves[0].value[0])
+    ending_value = float(last_value)
 
     compiled_results['total_percentage_gain'] = (ending_value / starting_value) - 1
     
     
-    compiled_results['average_return_per_year'] = calculate_average_yearly_gain(compiled_portfolio_values)
+    if wanted('average_return_per_year'):
+        compiled_results['average_return_per_year'] = calculate_average_yearly_gain(portfolio_values)
     
     # get the total amount of money made variable
     total_money_made = 0
@@ -163,28 +196,989 @@ def compile_backtest_results_sequential(results, data_frames):
     compiled_results['total_amount_of_money_made'] = total_money_made
 
     # get the total number of trades
-    compiled_results['total_trades'] = len(compiled_trades_history)
+    total_trades = sum(len(r['trades_history']) for r in results)
+    compiled_results['total_trades'] = total_trades
     
-    # calculate the average time holding any given position
-    time_held_list = [trade['time_held'] for trade in compiled_trades_history]
-    if time_held_list:
-        average_time_holding_position = sum(time_held_list, timedelta()) / len(time_held_list)
-        longest_time_position_held = max(time_held_list)
-    else:
-        average_time_holding_position = timedelta(0)
-        longest_time_position_held = timedelta(0)
-    compiled_results['average_time_holding_position'] = average_time_holding_position
+    if wanted('average_time_holding_position'):
+        # calculate the average time holding any given position (shifting does not change it)
+        time_held_list = [trade['time_held'] for r in results for trade in r['trades_history']]
+        if time_held_list:
+            average_time_holding_position = sum(time_held_list, timedelta()) / len(time_held_list)
+            longest_time_position_held = max(time_held_list)
+        else:
+            average_time_holding_position = timedelta(0)
+            longest_time_position_held = timedelta(0)
+        compiled_results['average_time_holding_position'] = average_time_holding_position
 
     # Calculate average number of trades per year
-    compiled_results['average_trades_per_year'] = len(compiled_trades_history) / total_years
+    compiled_results['average_trades_per_year'] = total_trades / total_years
 
+    if keys is not None:
+        compiled_results = {key: value for key, value in compiled_results.items() if key in keys}
     return compiled_results
 
 
-def optimize(strategies, data_frames, loss_function, optimization_method='random', max_evals=10, population_size=10):
+# Keys of the combined results that are plain sums of the per-frame backtest summaries. A loss
+# function reading only these is scored from backtester.backtest_summary, without the trades
+# history or equity curves.
+SUMMED_RESULTS = frozenset({'total_amount_of_money_made', 'total_trades'})
+
+
+def summary_only(loss_function):
+    """
+    True when the loss function declares that it only reads keys in SUMMED_RESULTS.
+    """
+    keys = required_results(loss_function)
+    return keys is not None and keys <= SUMMED_RESULTS
+
+
+def backtest_frame(strategy, params, ohlc, summary=False):
+    """
+    Run a strategy on one ticker's OHLC data and return the numpy-engine backtest results,
+    or with summary=True only the summary stats of backtester.backtest_summary.
+    """
+    trading_signals = strategy(ohlc, params)
+    if summary:
+        return backtester.backtest_summary(trading_signals)
+    backtest_results, _ = backtester.run_backtest(trading_signals, engine='numpy')
+    return backtest_results
+
+
+def evaluate_strategy(strategy, params, data_frames, loss_function, ticker_pool=None):
+    """
+    Backtest a strategy with one parameter set across the data frames and return its loss.
+
+    Parameters:
+    - strategy (callable): Strategy function taking (ohlc, params).
+    - params (dict): Parameters to pass to the strategy.
+    - data_frames (list): Dicts with an 'ohlc' DataFrame, as returned by fetch_historical_data.
+    - loss_function (callable): Takes the backtest results (dict) and returns a float loss.
+    - ticker_pool (TickerPool): Optional. Backtests the data frames concurrently.
+
+    Returns:
+    - float: The loss of the combined results.
+
+    A loss function that only reads SUMMED_RESULTS is scored from the backtest summaries
+    (see summary_only), which sum over the data frames as in compile_backtest_results_sequential.
+    """
+    summary = summary_only(loss_function)
+    if len(data_frames) > 1:
+        if ticker_pool is not None:
+            results = ticker_pool.backtest(strategy, params, summary)
+        else:
+            results = [backtest_frame(strategy, params, df['ohlc'], summary) for df in data_frames]
+        if summary:
+            return loss_function({key: sum(r[key] for r in results) for key in required_results(loss_function)})
+        # Only compile what the loss function reads; the full results are built for the final best
+        combined_results = compile_backtest_results_sequential(results, data_frames, required_results(loss_function))
+        return loss_function(combined_results)
+    else:
+        return loss_function(backtest_frame(strategy, params, data_frames[0]['ohlc'], summary))
+
+
+def halving_fidelities(data_frames, rungs=3, eta=3, by='auto'):
+    """
+    Fidelities of the rungs of successive halving, lowest first. The last one is None, the
+    full data; rung k below it sees 1/eta**k of the data.
+
+    Parameters:
+    - data_frames (list): Data frames passed to optimize().
+    - rungs (int): Number of rungs, including the full evaluation. 1 disables halving.
+    - eta (int): Data grows and the number of trials shrinks by this factor per rung.
+    - by (str): 'tickers' evaluates the lower rungs on a subset of the data frames, spread
+      evenly over the list; 'time' on the leading part of every data frame's bars; 'auto'
+      uses tickers when there are at least eta**(rungs - 1) data frames, else time.
+
+    Returns:
+    - list: ('tickers', frame indices) or ('time', fraction of bars) per rung, then None.
+    """
+    if rungs < 1 or eta < 2:
+        raise ValueError("Successive halving needs at least one rung and eta of at least 2.")
+    if by == 'auto':
+        by = 'tickers' if len(data_frames) >= eta ** (rungs - 1) else 'time'
+    if by not in ('tickers', 'time'):
+        raise ValueError("Invalid halving_by. Use 'auto', 'tickers' or 'time'.")
+
+    fidelities = []
+    for k in range(rungs - 1, 0, -1):
+        fraction = float(eta) ** -k
+        if by == 'tickers':
+            count = max(1, int(round(len(data_frames) * fraction)))
+            indices = np.unique(np.linspace(0, len(data_frames) - 1, count).round().astype(int))
+            fidelities.append(('tickers', tuple(indices.tolist())))
+        else:
+            fidelities.append(('time', fraction))
+    return fidelities + [None]
+
+
+def fidelity_frames(data_frames, fidelity):
+    """
+    The data frames a trial at the given fidelity is evaluated on (see halving_fidelities).
+    Ticker subsets keep the data frame order, so they compile like the full list.
+    """
+    if fidelity is None:
+        return data_frames
+    kind, value = fidelity
+    if kind == 'tickers':
+        return [data_frames[i] for i in value]
+    return [{**df, 'ohlc': df['ohlc'].iloc[:max(2, int(np.ceil(len(df['ohlc']) * value)))]} for df in data_frames]
+
+
+def evaluate_all_losses(strategy, params, data_frames, ticker_pool=None, losses=None):
+    """
+    Backtest a strategy with one parameter set across the data frames once and return every
+    loss of it, plus drawdown and exposure stats (see loss_functions.compute_all_losses).
+
+    Parameters:
+    - strategy (callable): Strategy function taking (ohlc, params).
+    - params (dict): Parameters to pass to the strategy.
+    - data_frames (list): Dicts with an 'ohlc' DataFrame, as returned by fetch_historical_data.
+    - ticker_pool (TickerPool): Optional. Backtests the data frames concurrently.
+    - losses (dict): Optional. {name: loss function}; defaults to loss_functions.LOSS_FUNCTIONS.
+
+    Returns:
+    - dict: As compute_all_losses.
+    """
+    losses = losses if losses is not None else LOSS_FUNCTIONS
+    if len(data_frames) == 1:
+        return compute_all_losses(backtest_frame(strategy, params, data_frames[0]['ohlc']), losses)
+
+    if ticker_pool is not None:
+        results = ticker_pool.backtest(strategy, params)
+    else:
+        results = [backtest_frame(strategy, params, df['ohlc']) for df in data_frames]
+    # Compile what any of the losses reads, plus the curve and trades for the stats
+    keys = {'portfolio_values_over_time', 'trades_history'}
+    for loss_function in losses.values():
+        required = required_results(loss_function)
+        if required is None:
+            keys = None
+            break
+        keys |= required
+    return compute_all_losses(compile_backtest_results_sequential(results, data_frames, keys), losses)
+
+
+# Data and loss function of a pool worker, set once by _init_worker when the worker starts
+_worker_state = {}
+
+
+def prime_indicators(data_frames, windows):
+    """
+    Load the rolling max/min and EMA rows of every window into this process's indicator
+    cache, for every data frame (see indicator_tensors.prime_indicator_cache). None does nothing.
+    """
+    if windows is not None:
+        for df in data_frames:
+            prime_indicator_cache(df['ohlc'], windows)
+
+
+def _init_worker(data_frames, loss_function, ticker_jobs=1, prime_windows=None):
+    # Each worker process has its own indicator cache
+    prime_indicators(data_frames, prime_windows)
+    _worker_state['data_frames'] = data_frames
+    _worker_state['loss_function'] = loss_function
+    _worker_state['fidelity_frames'] = {None: data_frames}
+    # A trial worker is already one process per core, so it fans tickers out over threads
+    _worker_state['ticker_pool'] = TickerPool(data_frames, ticker_jobs, 'thread') if ticker_jobs > 1 else None
+
+
+def _evaluate_in_worker(strategy, params, fidelity=None):
+    frames = _worker_state['fidelity_frames']
+    if fidelity not in frames:
+        frames[fidelity] = fidelity_frames(_worker_state['data_frames'], fidelity)
+    # The ticker pool holds the full data, so reduced fidelities run serially
+    ticker_pool = _worker_state['ticker_pool'] if fidelity is None else None
+    return evaluate_strategy(strategy, params, frames[fidelity], _worker_state['loss_function'], ticker_pool)
+
+
+def _timed_evaluate_in_worker(strategy, params, fidelity=None):
+    start = time.perf_counter()
+    loss = _evaluate_in_worker(strategy, params, fidelity)
+    return loss, time.perf_counter() - start
+
+
+def _backtest_frame_in_worker(strategy, params, index, summary=False):
+    return backtest_frame(strategy, params, _worker_state['data_frames'][index]['ohlc'], summary)
+
+
+class TickerPool:
+    """
+    Runs strategy plus backtest for every data frame of a trial concurrently.
+
+    With threads the frames are shared. With processes each worker receives the data frames
+    once, when it starts, and a task only sends the strategy, its parameters and the frame
+    index. Results come back in data frame order, so compiling them gives exactly the
+    serial results.
+
+    Parameters:
+    - data_frames (list): Data frames passed to optimize().
+    - n_jobs (int): Threads or processes; see resolve_n_jobs.
+    - backend (str): 'thread' or 'process'.
+    - prime_windows (array-like): Optional. Windows each worker process primes its indicator
+      cache with (see prime_indicators).
+    """
+
+    def __init__(self, data_frames, n_jobs, backend='thread', prime_windows=None):
+        if backend not in ('thread', 'process'):
+            raise ValueError("Invalid ticker backend. Use 'thread' or 'process'.")
+        self.data_frames = data_frames
+        self.n_jobs = resolve_n_jobs(n_jobs)
+        self.backend = backend
+        self.prime_windows = prime_windows
+        self.executor = None
+
+    def backtest(self, strategy, params, summary=False):
+        """
+        Return the backtest results of every data frame, in order; with summary=True only
+        their summary stats (see backtest_frame).
+        """
+        if self.executor is None:
+            if self.backend == 'thread':
+                self.executor = ThreadPoolExecutor(max_workers=self.n_jobs)
+            else:
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.n_jobs,
+                    initializer=_init_worker,
+                    initargs=(self.data_frames, None, 1, self.prime_windows)
+                )
+        n_frames = len(self.data_frames)
+        if self.backend == 'thread':
+            frames = [df['ohlc'] for df in self.data_frames]
+            return list(self.executor.map(backtest_frame, [strategy] * n_frames, [params] * n_frames, frames, [summary] * n_frames))
+        return list(self.executor.map(_backtest_frame_in_worker, [strategy] * n_frames, [params] * n_frames, range(n_frames),
+                                      [summary] * n_frames))
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+
+def resolve_n_jobs(n_jobs):
+    """
+    Number of worker processes for n_jobs: None or 1 runs in-process, -1 uses every core.
+    """
+    if n_jobs is None:
+        return 1
+    if n_jobs < 0:
+        return max((os.cpu_count() or 1) + 1 + n_jobs, 1)
+    if n_jobs == 0:
+        raise ValueError("n_jobs must be a positive number of processes or negative to count back from the number of cores.")
+    return n_jobs
+
+
+# Bump when something outside the code covered by code_fingerprint changes losses (e.g. a
+# pandas upgrade), so trials stored on disk by earlier versions are no longer found
+MEMO_VERSION = 2
+
+
+def _canonical_value(value):
+    # NumPy scalars and Python numbers of the same value give the same key
+    if isinstance(value, (bool, np.bool_)):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        value = float(value)
+        return int(value) if value.is_integer() else value
+    return value
+
+
+def canonical_trial_params(strategy, params):
+    """
+    Return params as a sorted tuple of (name, value), reduced to what the strategy uses.
+
+    A strategy module's canonical_params applies the strategy's own casting rules (e.g.
+    int() on window lengths), so samples that differ only in ways the strategy ignores
+    give the same tuple.
+    """
+    module = sys.modules.get(getattr(strategy, '__module__', None))
+    canonical = getattr(module, 'canonical_params', None)
+    if canonical is not None and getattr(module, 'strategy', None) is strategy:
+        params = canonical(params)
+    return tuple(sorted((name, _canonical_value(value)) for name, value in params.items()))
+
+
+def function_key(function):
+    """
+    Name a strategy or loss function across runs, or None for lambdas and local functions.
+    """
+    if isinstance(function, functools.partial):
+        inner = function_key(function.func)
+        if inner is None:
+            return None
+        return f"{inner}{function.args!r}{sorted(function.keywords.items())!r}"
+    qualname = getattr(function, '__qualname__', None)
+    if qualname is None or '<' in qualname:
+        return None
+    return f"{function.__module__}.{qualname}"
+
+
+# Modules a trial's loss depends on whatever the strategy and loss function
+BACKTEST_MODULES = ('modules.backtester', 'modules.portfolio_values')
+
+
+def _module_sources(module_name, whole_package=False):
+    # (path, source bytes) of a module, or of every module in its package directory
+    module = sys.modules.get(module_name)
+    path = getattr(module, '__file__', None)
+    if path is None:
+        return None
+    if whole_package and getattr(module, '__package__', None):
+        directory = os.path.dirname(path)
+        paths = sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.endswith('.py'))
+    else:
+        paths = [path]
+    sources = []
+    for source_path in paths:
+        with open(source_path, 'rb') as source_file:
+            sources.append((os.path.basename(source_path), source_file.read()))
+    return sources
+
+
+@functools.lru_cache(maxsize=None)
+def _code_fingerprint(strategy_module, loss_module):
+    parts = [_module_sources(strategy_module, whole_package=True), _module_sources(loss_module)]
+    parts += [_module_sources(name) for name in BACKTEST_MODULES]
+    if any(part is None for part in parts):
+        return None
+    digest = hashlib.blake2b(digest_size=16)
+    for sources in parts:
+        for name, source in sources:
+            digest.update(name.encode() + b'\0' + source + b'|')
+    # The functions here that turn backtests into the loss
+    for function in (backtest_frame, evaluate_strategy, compile_backtest_results_sequential, calculate_average_yearly_gain):
+        digest.update(inspect.getsource(function).encode())
+    return digest.hexdigest()
+
+
+def code_fingerprint(strategy, loss_function):
+    """
+    Hash the source code a trial's loss depends on, or None when some of it has no file.
+
+    Covers every module in the strategy's package (the strategy and the helpers strategies
+    share, e.g. strategies/signal_utils.py), the loss function's module, the backtester and
+    the functions here that compile the results. Editing any of them changes the trial keys,
+    so a persistent TrialMemo does not return losses computed by other code. Files are read
+    once per process.
+    """
+    while isinstance(loss_function, functools.partial):
+        loss_function = loss_function.func
+    return _code_fingerprint(getattr(strategy, '__module__', None), getattr(loss_function, '__module__', None))
+
+
+def data_fingerprint(data_frames):
+    """
+    Hash the OHLC data (values, dates and index) of every data frame, in order.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for df in data_frames:
+        digest.update(pd.util.hash_pandas_object(df['ohlc'], index=True).to_numpy().tobytes())
+        digest.update(b'|')
+    return digest.hexdigest()
+
+
+class TrialMemo:
+    """
+    Losses of evaluated trials, so a trial that runs the same backtest as an earlier one is free.
+
+    Keys combine the strategy, its canonical parameters, a fingerprint of the data frames,
+    the loss function and a hash of the code behind them (see TrialEvaluator.trial_key and
+    code_fingerprint). The most recently used losses are kept in memory; with a path they
+    are also stored in an SQLite file, which later runs (and other processes) read. Editing
+    a strategy, the loss functions or the backtester changes the keys, so stale losses are
+    not found.
+
+    Parameters:
+    - max_entries (int): Losses kept in memory.
+    - path (str): Optional SQLite file for a store shared across runs.
+    """
+
+    def __init__(self, max_entries=100000, path=None):
+        self.max_entries = max_entries
+        self.path = path
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.connection = None
+        if path is not None:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Written from the executor's callback thread as well as the main thread
+            self.connection = sqlite3.connect(path, check_same_thread=False)
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS trials (key TEXT PRIMARY KEY, loss REAL)")
+            self.connection.commit()
+
+    def _remember(self, key, loss):
+        self.entries[key] = loss
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def get(self, key):
+        """
+        Return the stored loss for key, or None.
+        """
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            if self.connection is not None:
+                row = self.connection.execute("SELECT loss FROM trials WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    # SQLite stores NaN as NULL
+                    loss = float('nan') if row[0] is None else row[0]
+                    self._remember(key, loss)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return loss
+            self.misses += 1
+            return None
+
+    def put(self, key, loss):
+        """
+        Store the loss of a trial.
+        """
+        loss = float(loss)
+        with self.lock:
+            self._remember(key, loss)
+            if self.connection is not None:
+                self.connection.execute("INSERT OR REPLACE INTO trials (key, loss) VALUES (?, ?)", (key, loss))
+                self.connection.commit()
+
+    def stats(self):
+        """
+        Return hit/miss counters and the number of losses in memory as a dict.
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'entries': len(self.entries)
+        }
+
+    def clear(self):
+        """
+        Forget every loss, in memory and on disk.
+        """
+        with self.lock:
+            self.entries.clear()
+            if self.connection is not None:
+                self.connection.execute("DELETE FROM trials")
+                self.connection.commit()
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+class TrialEvaluator:
+    """
+    Evaluates (strategy, params) trials in this process or across a process pool.
+
+    Each worker receives the data frames and the loss function once, when it starts, so a
+    task only sends the strategy function and its parameters. Losses are returned in the
+    order the trials were given, so every optimizer reduces them exactly as a serial run
+    would.
+
+    Parameters:
+    - data_frames (list): Data frames passed to optimize().
+    - loss_function (callable): Loss function passed to optimize().
+    - n_jobs (int): Worker processes; see resolve_n_jobs.
+    - ticker_jobs (int): Threads or processes backtesting the data frames of one trial
+      concurrently (see TickerPool). Trial workers always use threads.
+    - ticker_backend (str): 'thread' or 'process'; 'process' needs n_jobs=1.
+    - memo (TrialMemo): Optional. Trials found in it are not evaluated again, and trials
+      with the same key in flight at the same time are evaluated once.
+    - prime_windows (array-like): Optional. Windows every worker process primes its
+      indicator cache with (see prime_indicators).
+    """
+
+    def __init__(self, data_frames, loss_function, n_jobs=1, ticker_jobs=1, ticker_backend='thread', memo=None,
+                 prime_windows=None):
+        self.data_frames = data_frames
+        self.loss_function = loss_function
+        self.n_jobs = resolve_n_jobs(n_jobs)
+        self.ticker_jobs = resolve_n_jobs(ticker_jobs)
+        if self.n_jobs > 1 and ticker_backend == 'process':
+            raise ValueError("ticker_backend='process' needs n_jobs=1; trial workers fan tickers out over threads.")
+        self.prime_windows = prime_windows
+        self.ticker_pool = TickerPool(data_frames, self.ticker_jobs, ticker_backend, prime_windows) if self.ticker_jobs > 1 else None
+        self.executor = None
+        self.memo = memo
+        self.in_flight = {}
+        self.fidelity_frames = {None: data_frames}
+        if memo is not None:
+            self.data_keys = {None: data_fingerprint(data_frames)}
+            self.loss_key = function_key(loss_function)
+
+    def frames(self, fidelity=None):
+        """
+        The data frames of a fidelity (see fidelity_frames), built once per fidelity.
+        """
+        if fidelity not in self.fidelity_frames:
+            self.fidelity_frames[fidelity] = fidelity_frames(self.data_frames, fidelity)
+        return self.fidelity_frames[fidelity]
+
+    def trial_key(self, strategy, params, fidelity=None):
+        """
+        Memo key of a trial, or None when the trial cannot be memoized.
+        """
+        if self.memo is None or self.loss_key is None:
+            return None
+        strategy_key = function_key(strategy)
+        if strategy_key is None:
+            return None
+        if fidelity not in self.data_keys:
+            # Reduced fidelities are other data, with their own fingerprint
+            self.data_keys[fidelity] = data_fingerprint(self.frames(fidelity))
+        code_key = code_fingerprint(strategy, self.loss_function)
+        if code_key is None:
+            return None
+        params_key = canonical_trial_params(strategy, params)
+        return json.dumps([MEMO_VERSION, strategy_key, params_key, self.data_keys[fidelity], self.loss_key, code_key], default=repr)
+
+    def _evaluate_here(self, strategy, params, fidelity):
+        # The ticker pool holds the full data, so reduced fidelities run serially
+        ticker_pool = self.ticker_pool if fidelity is None else None
+        return evaluate_strategy(strategy, params, self.frames(fidelity), self.loss_function, ticker_pool)
+
+    def evaluate(self, strategy, params, fidelity=None):
+        """
+        Return the loss of one trial, computed in this process.
+        """
+        key = self.trial_key(strategy, params, fidelity)
+        if key is not None:
+            loss = self.memo.get(key)
+            if loss is not None:
+                return loss
+        loss = self._evaluate_here(strategy, params, fidelity)
+        if key is not None:
+            self.memo.put(key, loss)
+        return loss
+
+    def _pool(self):
+        if self.executor is None:
+            # Started on first use, so searches that never map trials start no workers
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.n_jobs,
+                initializer=_init_worker,
+                initargs=(self.data_frames, self.loss_function, self.ticker_jobs, self.prime_windows)
+            )
+        return self.executor
+
+    def map(self, trials):
+        """
+        Yield the loss of each (strategy, params) or (strategy, params, fidelity) trial, in order.
+        """
+        futures = [self.submit(*trial) for trial in trials]
+        for future in futures:
+            yield future.result()[0]
+
+    def submit(self, strategy, params, fidelity=None):
+        """
+        Start one trial and return a Future of (loss, seconds the evaluation took). Without
+        workers the trial is evaluated before submit returns. Memoized trials take 0 seconds.
+        A fidelity evaluates the trial on part of the data (see halving_fidelities).
+        """
+        key = self.trial_key(strategy, params, fidelity)
+        if key is not None:
+            loss = self.memo.get(key)
+            if loss is not None:
+                return _finished_future(loss, 0.0)
+            # The same backtest may already be running; share its loss. A single get, since
+            # _store pops finished keys from the executor's callback thread
+            running = self.in_flight.get(key)
+            if running is not None:
+                return _follow_future(running)
+
+        if self.n_jobs == 1:
+            start = time.perf_counter()
+            loss = self._evaluate_here(strategy, params, fidelity)
+            if key is not None:
+                self.memo.put(key, loss)
+            return _finished_future(loss, time.perf_counter() - start)
+
+        future = self._pool().submit(_timed_evaluate_in_worker, strategy, params, fidelity)
+        if key is not None:
+            self.in_flight[key] = future
+            future.add_done_callback(functools.partial(self._store, key))
+        return future
+
+    def _store(self, key, future):
+        if future.exception() is None:
+            self.memo.put(key, future.result()[0])
+        self.in_flight.pop(key, None)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        if self.ticker_pool is not None:
+            self.ticker_pool.close()
+
+
+def run_searches(evaluator, searches, names=None, progress=None):
+    """
+    Run several searches at once on the evaluator's workers, most expensive strategy first.
+
+    A search is a generator that yields a batch of (strategy, params) or (strategy, params,
+    fidelity) trials, is sent the list of their losses (in batch order) and either yields the next batch or returns its
+    result. Trials from every search share the evaluator's workers. Each worker that
+    frees up takes the next trial of the search whose measured cost per evaluation is
+    highest; searches not measured yet go first, so their cost is learned early. Long
+    trials therefore start early and the short ones fill in at the end instead of leaving
+    workers idle. A search only sees its own losses, so the results do not depend on the
+    scheduling.
+
+    Parameters:
+    - evaluator (TrialEvaluator): Evaluates the trials.
+    - searches (list): The search generators.
+    - names (list): Optional. Name of each search for the cost report.
+    - progress (tqdm): Optional. Progress bar advanced once per finished trial.
+
+    Returns:
+    - tuple: (results, costs). results holds the return value of each search, costs a dict
+      per search with 'strategy', 'evaluations', 'seconds' and 'seconds_per_evaluation'.
+    """
+    names = names if names is not None else [None] * len(searches)
+    states = [{'search': search, 'batch': [], 'losses': [], 'pending': [], 'remaining': 0,
+               'result': None, 'evaluations': 0, 'seconds': 0.0} for search in searches]
+
+    def advance(state, losses=None):
+        # Hand the finished batch back and queue the search's next one
+        while True:
+            try:
+                batch = next(state['search']) if losses is None else state['search'].send(losses)
+            except StopIteration as stop:
+                state['result'] = stop.value
+                return
+            if batch:
+                break
+            losses = []
+        state['batch'] = list(batch)
+        state['losses'] = [None] * len(batch)
+        state['pending'] = list(range(len(batch)))[::-1]
+        state['remaining'] = len(batch)
+
+    def cost(k):
+        state = states[k]
+        return state['seconds'] / state['evaluations'] if state['evaluations'] else float('inf')
+
+    for state in states:
+        advance(state)
+
+    in_flight = {}
+    best_loss = float('inf')
+    while True:
+        while len(in_flight) < evaluator.n_jobs:
+            ready = [k for k, state in enumerate(states) if state['pending']]
+            if not ready:
+                break
+            # Most expensive first; ties keep the order of the searches
+            k = max(ready, key=lambda k: (cost(k), -k))
+            index = states[k]['pending'].pop()
+            in_flight[evaluator.submit(*states[k]['batch'][index])] = (k, index)
+        if not in_flight:
+            break
+
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            k, index = in_flight.pop(future)
+            loss, seconds = future.result()
+            state = states[k]
+            state['losses'][index] = loss
+            state['remaining'] -= 1
+            state['evaluations'] += 1
+            state['seconds'] += seconds
+            if progress is not None:
+                best_loss = min(best_loss, loss)
+                progress.update(1)
+                progress.set_postfix({'Best': f"{best_loss:.4f}"})
+            if state['remaining'] == 0:
+                advance(state, state['losses'])
+
+    costs = [{
+        'strategy': name,
+        'evaluations': state['evaluations'],
+        'seconds': state['seconds'],
+        'seconds_per_evaluation': cost(k) if state['evaluations'] else np.nan
+    } for k, (name, state) in enumerate(zip(names, states))]
+    return [state['result'] for state in states], costs
+
+
+def _trial_batch(trials):
+    # A search with a fixed set of trials: one batch, returns its losses
+    losses = yield trials
+    return losses
+
+
+def _with_final_evaluation(search, strategy):
+    # Runs a search returning (best params, ...) and evaluates the best params once more
+    result = yield from search
+    losses = yield [(strategy, result[0])]
+    return result, losses[0]
+
+
+def _isolated_random(search, seed):
+    # Gives a search drawing from the global random module its own stream, so searches
+    # running side by side do not change each other's draws
+    generator = random.Random(seed)
+    losses = None
+    while True:
+        saved = random.getstate()
+        random.setstate(generator.getstate())
+        try:
+            batch = next(search) if losses is None else search.send(losses)
+        except StopIteration as stop:
+            return stop.value
+        finally:
+            generator.setstate(random.getstate())
+            random.setstate(saved)
+        losses = yield batch
+
+
+def _rank_loss(loss):
+    # NaN losses rank behind every other loss
+    return float('inf') if np.isnan(loss) else loss
+
+
+def successive_halving_steps(trials, fidelities=(None,), eta=3):
+    """
+    Successive halving over (strategy, params) trials as a search generator for run_searches.
+
+    Every trial is evaluated at the first fidelity, the best 1/eta of them (at least one)
+    at the next and so on, up to the full data (the last fidelity, None). At a rung,
+    trials are ranked by their loss there, NaN last and ties by position. With eta=3 and
+    three rungs on tickers, the trials cost about a third of evaluating all of them on
+    the full data; the full-data losses of the survivors are exact.
+
+    Parameters:
+    - trials (list): The (strategy, params) trials.
+    - fidelities (list): The rungs, as returned by halving_fidelities. (None,) evaluates
+      every trial on the full data.
+    - eta (int): Only the best 1/eta of a rung's trials are promoted.
+
+    Returns:
+    - list: Full-data loss of each trial; inf for trials pruned at a lower rung.
+    """
+    losses = [float('inf')] * len(trials)
+    survivors = list(range(len(trials)))
+    for rung, fidelity in enumerate(fidelities):
+        last = rung == len(fidelities) - 1
+        if not last and len(survivors) <= 1:
+            # Nothing left to prune
+            continue
+        rung_losses = yield [(*trials[i], fidelity) for i in survivors]
+        if last:
+            for i, loss in zip(survivors, rung_losses):
+                losses[i] = loss
+            break
+        ranked = sorted(range(len(survivors)), key=lambda j: (_rank_loss(rung_losses[j]), j))
+        survivors = sorted(survivors[j] for j in ranked[:max(1, len(survivors) // eta)])
+    return losses
+
+
+def tpe_search_steps(strategy, param_space, max_evals, concurrent_trials=1, rstate=None):
+    """
+    Hyperopt TPE search as a search generator for run_searches (see batched_tpe_search).
+
+    Returns:
+    - tuple: (argmin, trials, batches), as batched_tpe_search.
+    """
+    if concurrent_trials < 1:
+        raise ValueError("concurrent_trials must be at least 1.")
+    rstate = rstate if rstate is not None else np.random.default_rng()
+    domain = hyperopt_base.Domain(lambda params: None, param_space)
+    trials = Trials()
+    batches = []
+
+    while len(trials.trials) < max_evals:
+        start = time.perf_counter()
+        batch_size = min(concurrent_trials, max_evals - len(trials.trials))
+        queued = 0
+        while queued < batch_size:
+            # After its startup trials TPE proposes one point per call. Points still being
+            # evaluated count as infinite losses, which steers the next ones elsewhere.
+            new_ids = trials.new_trial_ids(batch_size - queued)
+            trials.refresh()
+            new_docs = tpe.suggest(new_ids, domain, trials, rstate.integers(2**31 - 1))
+            if not new_docs:
+                break
+            trials.insert_trial_docs(new_docs)
+            trials.refresh()
+            queued += len(new_docs)
+        if queued == 0:
+            break
+        suggest_seconds = time.perf_counter() - start
+
+        # The point each trial is evaluated at, with hp.choice indexes resolved as fmin does
+        docs = [trial for trial in trials._dynamic_trials if trial['state'] == hyperopt_base.JOB_STATE_NEW]
+        points = [space_eval(param_space, hyperopt_base.spec_from_misc(doc['misc'])) for doc in docs]
+        for doc in docs:
+            doc['state'] = hyperopt_base.JOB_STATE_RUNNING
+            doc['book_time'] = doc['refresh_time'] = coarse_utcnow()
+
+        start = time.perf_counter()
+        losses = yield [(strategy, point) for point in points]
+        evaluate_seconds = time.perf_counter() - start
+
+        for doc, point, loss in zip(docs, points, losses):
+            doc['state'] = hyperopt_base.JOB_STATE_DONE
+            doc['result'] = {'loss': loss, 'status': STATUS_OK, 'params': point}
+            doc['refresh_time'] = coarse_utcnow()
+        trials.refresh()
+
+        batches.append({
+            'trials': len(docs),
+            'suggest_seconds': suggest_seconds,
+            'evaluate_seconds': evaluate_seconds,
+            'best_loss': min(trials.losses())
+        })
+
+    return trials.argmin, trials, batches
+
+
+def _finished_future(loss, seconds):
+    future = Future()
+    future.set_result((loss, seconds))
+    return future
+
+
+def _follow_future(future):
+    # A future that finishes with the loss of another one, at no cost of its own
+    follower = Future()
+
+    def finish(done):
+        if done.exception() is not None:
+            follower.set_exception(done.exception())
+        else:
+            follower.set_result((done.result()[0], 0.0))
+
+    future.add_done_callback(finish)
+    return follower
+
+
+def batched_tpe_search(strategy, param_space, evaluator, max_evals, concurrent_trials=1, rstate=None):
+    """
+    Hyperopt TPE search that asks for several candidates at once and evaluates them together.
+
+    Each round asks tpe.suggest for concurrent_trials new points given every trial so far,
+    evaluates the batch through the evaluator (in parallel when it has a process pool), and
+    records the losses in the Trials before asking again. This is the loop fmin runs with
+    max_queue_len=concurrent_trials, so for the same rstate it proposes and returns exactly
+    what fmin does.
+
+    Parameters:
+    - strategy (callable): Strategy function to optimize.
+    - param_space (dict): Hyperopt search space.
+    - evaluator (TrialEvaluator): Evaluates the (strategy, params) trials.
+    - max_evals (int): Total number of trials.
+    - concurrent_trials (int): Candidates proposed and evaluated per batch.
+    - rstate (np.random.Generator): Random state for TPE; None draws a fresh one.
+
+    Returns:
+    - tuple: (argmin, trials, batches). argmin is the best point as fmin returns it,
+      trials the hyperopt Trials and batches a list of per-batch dicts with 'trials',
+      'suggest_seconds', 'evaluate_seconds' and 'best_loss'.
+    """
+    search = tpe_search_steps(strategy, param_space, max_evals, concurrent_trials, rstate)
+    results, _ = run_searches(evaluator, [search])
+    return results[0]
+
+
+def genetic_search_steps(strategy, bounds, population_size, ngen, cxpb=0.7, mutpb=0.3, fidelities=(None,), eta=3):
+    """
+    DEAP genetic algorithm as a search generator for run_searches.
+
+    Runs the generations of algorithms.eaSimple (tournament selection, two-point crossover,
+    Gaussian mutation) and yields the individuals each generation has to evaluate as
+    parameter dicts. Draws from the global random module, like eaSimple. With several
+    fidelities each generation's new individuals go through successive_halving_steps, and
+    the pruned ones get an infinite loss, so selection passes them over.
+
+    Parameters:
+    - strategy (callable): Strategy function to optimize.
+    - bounds (dict): (min, max) of each parameter for the initial population.
+    - population_size (int): Individuals per generation.
+    - ngen (int): Number of generations.
+    - cxpb, mutpb (float): Crossover and mutation probabilities.
+    - fidelities (list), eta (int): Successive halving of each generation, as in
+      successive_halving_steps.
+
+    Returns:
+    - tuple: (best params, logbook with the min and avg loss of every generation).
+    """
+    toolbox = base.Toolbox()
+
+    # Register parameter generation
+    for param_name in bounds:
+        min_val, max_val = bounds[param_name]
+        toolbox.register(f"attr_{param_name}",
+                         random.uniform, min_val, max_val)
+
+    def safe_cxTwoPoint(ind1, ind2):
+        if len(ind1) > 1 and len(ind2) > 1:
+            return tools.cxTwoPoint(ind1, ind2)
+        else:
+            # Return unchanged individuals if crossover is invalid
+            return ind1, ind2
+
+    # Structure initializers
+    param_names = list(bounds.keys())
+    toolbox.register("individual", tools.initCycle, creator.Individual,
+                     [getattr(toolbox, f"attr_{name}") for name in param_names], n=1)
+    toolbox.register("population", tools.initRepeat, list, toolbox.individual)
+    toolbox.register("mate", safe_cxTwoPoint)
+    toolbox.register("mutate", tools.mutGaussian, mu=0, sigma=1, indpb=0.2)
+    toolbox.register("select", tools.selTournament, tournsize=3)
+
+    stats = tools.Statistics(lambda ind: ind.fitness.values)
+    stats.register("min", np.min)
+    stats.register("avg", np.mean)
+    logbook = tools.Logbook()
+    logbook.header = ['gen', 'nevals'] + stats.fields
+
+    population = toolbox.population(n=population_size)
+    offspring = population
+    for gen in range(ngen + 1):
+        if gen > 0:
+            # Select and vary the next generation
+            offspring = toolbox.select(population, len(population))
+            offspring = algorithms.varAnd(offspring, toolbox, cxpb, mutpb)
+
+        # Evaluate the individuals with an invalid fitness
+        invalid_ind = [ind for ind in offspring if not ind.fitness.valid]
+        losses = yield from successive_halving_steps(
+            [(strategy, dict(zip(param_names, ind))) for ind in invalid_ind], fidelities, eta
+        )
+        for ind, loss in zip(invalid_ind, losses):
+            ind.fitness.values = (loss,)
+
+        population[:] = offspring
+        logbook.record(gen=gen, nevals=len(invalid_ind), **stats.compile(population))
+
+    best_ind = tools.selBest(population, 1)[0]
+    return dict(zip(param_names, best_ind)), logbook
+
+
+def optimize(strategies, data_frames, loss_function, optimization_method='random', max_evals=10, population_size=10, n_jobs=1, seed=None, concurrent_trials=1,
+             ticker_jobs=1, ticker_backend='thread', memo=None, halving_rungs=1, halving_eta=3, halving_by='auto',
+             prime_windows=None):
     """
     Optimize the given strategies using the given data, loss function, and a chosen method.
 
+    The searches of all strategies run at the same time and share the n_jobs workers, the
+    most expensive strategy's trials first (see run_searches).
+
     Parameters
     ----------
     strategies : list of dict
@@ -216,13 +1210,67 @@ def optimize(strategies, data_frames, loss_function, optimization_method='random
     max_evals : int
         Max evaluations/iterations for the chosen optimization method.
 
+    n_jobs : int
+        Worker processes for the trial evaluations. 1 evaluates in this process, -1 uses
+        every core. Each worker loads data_frames once. Results do not depend on n_jobs.
+
+    seed : int
+        Seeds the random sampling (Python's and NumPy's global generators and hyperopt's
+        TPE), so repeated runs return the same result. None leaves them unseeded. The TPE
+        search and the genetic algorithm of each strategy draw from their own stream, seeded
+        from Python's generator in strategies order. A given seed therefore returns different
+        trials than a serial run that drew every strategy from one stream.
+
+    concurrent_trials : int
+        Hyperopt only: candidates TPE proposes per batch, which are evaluated together
+        (see batched_tpe_search). Set it to n_jobs to keep every worker busy; 1 runs the
+        same search as fmin.
+
+    ticker_jobs : int
+        Threads or processes backtesting the data frames of one trial concurrently. The
+        results are compiled in data frame order, so losses do not depend on it.
+
+    ticker_backend : str
+        "thread" or "process" for ticker_jobs. With n_jobs > 1 each trial worker uses threads.
+
+    memo : TrialMemo or bool
+        Losses of trials already evaluated. None memoizes within this call; pass a TrialMemo,
+        e.g. TrialMemo(path='output/trial_memo.sqlite'), to share losses across calls and
+        runs, or False to evaluate every trial.
+
+    halving_rungs : int
+        Random and genetic only: successive halving with this many rungs (see
+        successive_halving_steps). The samples of a strategy, or the new individuals of a
+        generation, are scored on 1/halving_eta**(halving_rungs - 1) of the data first and
+        only the best 1/halving_eta move up a rung, until the last rung scores the
+        survivors on the full data. 1 evaluates every trial on the full data. Works with
+        any loss function, as every rung runs it on real backtest results.
+
+    halving_eta : int
+        Data growth and trial reduction per rung. Three rungs with eta 3 cost about a third
+        of the full evaluations, four rungs about a seventh.
+
+    halving_by : str
+        "tickers", "time" or "auto": whether the lower rungs see a subset of the data frames
+        or the leading part of every frame (see halving_fidelities).
+
+    prime_windows : array-like
+        Optional, e.g. range(5, 61). Before the search, the rolling max/min and EMA of every
+        one of these windows are computed for each data frame in one pass and loaded into
+        the indicator cache, in this process and in every worker (see prime_indicators).
+        Trials then slice them instead of computing them. Pays off when the search covers
+        most of the windows; the losses are the same either way.
+
     Returns
     -------
     dict
         {
           'best_loss': float,
           'best_params': dict,
-          'best_strategy': function
+          'best_strategy': function,
+          'batch_timings': list of dict,  # hyperopt only, one per TPE batch
+          'strategy_costs': list of dict,  # per strategy: evaluations and seconds per evaluation
+          'memo': dict  # TrialMemo.stats() of the memo used, if any
         }
     """
 
@@ -230,28 +1278,57 @@ def optimize(strategies, data_frames, loss_function, optimization_method='random
     best_params = None
     best_strategy = None
 
-    # Helper function to evaluate strategy across data frames
-    def evaluate_strategy(strategy, params):
-        if len(data_frames) > 1:
-            results = []
-            for df in data_frames:
-                trading_signals = strategy(df['ohlc'], params)
-                backtest_results, _ = backtester.run_backtest(trading_signals)
-                results.append(backtest_results)
-            combined_results = compile_backtest_results_sequential(results, data_frames)
-            return loss_function(combined_results)
-        else:
-            trading_signals = strategy(data_frames[0]['ohlc'], params)
-            backtest_results, _ = backtester.run_backtest(trading_signals)
-            return loss_function(backtest_results)
+    if seed is not None:
+        # The random search and DEAP draw from the global generators
+        random.seed(seed)
+        np.random.seed(seed)
+
+    if halving_rungs > 1 and optimization_method == 'hyperopt':
+        raise ValueError("Successive halving works with the 'random' and 'genetic' methods.")
+    fidelities = halving_fidelities(data_frames, halving_rungs, halving_eta, halving_by)
+
+    if memo is None or memo is True:
+        memo = TrialMemo()
+    evaluator = TrialEvaluator(data_frames, loss_function, n_jobs, ticker_jobs, ticker_backend, memo or None, prime_windows)
+    if evaluator.n_jobs == 1:
+        prime_indicators(data_frames, prime_windows)
+    batch_timings = []
+    strategy_costs = []
+    try:
+        best_loss, best_params, best_strategy = _run_search(
+            evaluator, strategies, optimization_method, max_evals, population_size, seed,
+            concurrent_trials, batch_timings, strategy_costs, fidelities, halving_eta
+        )
+    finally:
+        evaluator.close()
+
+    results = {
+        'best_loss': best_loss,
+        'best_params': best_params,
+        'best_strategy': best_strategy,
+        'strategy_costs': strategy_costs
+    }
+    if memo:
+        results['memo'] = memo.stats()
+    if optimization_method == 'hyperopt':
+        results['batch_timings'] = batch_timings
+    return results
+
+
+def _run_search(evaluator, strategies, optimization_method, max_evals, population_size, seed, concurrent_trials, batch_timings, strategy_costs,
+                fidelities=(None,), eta=3):
+    best_loss = float('inf')
+    best_params = None
+    best_strategy = None
+    names = [strategy_dict['strategy'].__module__ for strategy_dict in strategies]
+    progress = tqdm(desc="Evaluations")
 
     # 1. RANDOM SEARCH
     if optimization_method == 'random':
-        
-        # Create progress bar for evaluations
-        eval_bar = tqdm(range(max_evals), desc="Evaluations")
-        
-        for eval_num in eval_bar:
+
+        # Draw every sample up front, in the order the serial search drew them
+        trials = []
+        for eval_num in range(max_evals):
             # Try each strategy
             for strategy_dict in strategies:
                 strategy = strategy_dict['strategy']
@@ -266,22 +1343,27 @@ def optimize(strategies, data_frames, loss_function, optimization_method='random
                 
                 # Merge with base params
                 current_params.update({k:v for k,v in base_params.items() if k not in current_params})
-                
-                # Evaluate strategy with current parameters
-                loss = evaluate_strategy(strategy, current_params)
-                
+                trials.append((strategy, current_params))
+
+        # One search per strategy, each evaluating (or halving) its samples
+        n_strategies = len(strategies)
+        if len(fidelities) == 1:
+            progress.total = len(trials)
+        losses, costs = run_searches(
+            evaluator, [successive_halving_steps(trials[k::n_strategies], fidelities, eta) for k in range(n_strategies)],
+            names, progress
+        )
+
+        # Reduce in the order the samples were drawn
+        for eval_num in range(max_evals):
+            for k in range(n_strategies):
+                strategy, current_params = trials[eval_num * n_strategies + k]
+                loss = losses[k][eval_num]
                 # Update best if better
                 if loss < best_loss:
                     best_loss = loss
                     best_params = current_params.copy()
                     best_strategy = strategy
-                    
-                # Update progress bar description with current status
-                eval_bar.set_postfix({
-                    'Strategy': strategy.__name__,
-                    'Loss': f"{loss:.4f}",
-                    'Best': f"{best_loss:.4f}"
-                })
 
     # 2. HYPEROPT (Tree-structured Parzen Estimator)
     elif optimization_method == 'hyperopt':
@@ -290,108 +1372,53 @@ def optimize(strategies, data_frames, loss_function, optimization_method='random
                 "Hyperopt not installed. Install with 'pip3 install hyperopt'."
             )
 
+        searches = []
         for strategy_dict in strategies:
             strategy = strategy_dict['strategy']
-            params = strategy_dict['params']
-            param_space = strategy_dict['param_space']
-
-            def objective(params):
-                current_loss = evaluate_strategy(strategy, params)
-                return {'loss': current_loss, 'status': STATUS_OK, 'params': params}
-
-            trials = Trials()
-            best_params_for_strategy = fmin(
-                fn=objective,
-                space=param_space,
-                algo=tpe.suggest,
-                max_evals=max_evals,
-                trials=trials
+            # Each strategy gets its own TPE stream, seeded from the global generator in order
+            search = tpe_search_steps(
+                strategy, strategy_dict['param_space'], max_evals,
+                concurrent_trials=concurrent_trials,
+                rstate=np.random.default_rng(random.getrandbits(64)) if seed is not None else None
             )
-            final_loss = evaluate_strategy(strategy, best_params_for_strategy)
+            searches.append(_with_final_evaluation(search, strategy))
+        progress.total = (max_evals + 1) * len(strategies)
+        results, costs = run_searches(evaluator, searches, names, progress)
+
+        for strategy_dict, name, ((best_params_for_strategy, trials, batches), final_loss) in zip(strategies, names, results):
+            batch_timings.extend({'strategy': name, 'batch': k, **batch} for k, batch in enumerate(batches))
 
             if final_loss < best_loss:
                 best_loss = final_loss
                 best_params = best_params_for_strategy
-                best_strategy = strategy
+                best_strategy = strategy_dict['strategy']
 
     # 3. GENETIC ALGORITHM (via DEAP)
     elif optimization_method == 'genetic':
         if not DEAP_INSTALLED:
             raise ImportError("DEAP not installed. Install with 'pip3 install deap'.")
 
+        creator.create("FitnessMin", base.Fitness, weights=(-1.0,))
+        creator.create("Individual", list, fitness=creator.FitnessMin)
+
+        searches = []
         for strategy_dict in strategies:
             strategy = strategy_dict['strategy']
-            params = strategy_dict['params']
-            bounds = strategy_dict['ga_bounds']
-            
-            creator.create("FitnessMin", base.Fitness, weights=(-1.0,))
-            creator.create("Individual", list, fitness=creator.FitnessMin)
-            
-            toolbox = base.Toolbox()
-            
-            # Register parameter generation
-            for param_name in bounds:
-                min_val, max_val = bounds[param_name]
-                toolbox.register(f"attr_{param_name}", 
-                                random.uniform, min_val, max_val)
-            
-            def safe_cxTwoPoint(ind1, ind2):
-                if len(ind1) > 1 and len(ind2) > 1:
-                    return tools.cxTwoPoint(ind1, ind2)
-                else:
-                    # Return unchanged individuals if crossover is invalid
-                    return ind1, ind2
-            
-            # Structure initializers
-            param_names = list(bounds.keys())
-            toolbox.register("individual", tools.initCycle, creator.Individual,
-                             [getattr(toolbox, f"attr_{name}") for name in param_names], n=1)
-            toolbox.register("population", tools.initRepeat, list, toolbox.individual)
-            
-            def evaluate(individual):
-                param_dict = dict(zip(param_names, individual))
-                return (evaluate_strategy(strategy, param_dict),)
-                
-            toolbox.register("evaluate", evaluate)
-            toolbox.register("mate", safe_cxTwoPoint)
-            toolbox.register("mutate", tools.mutGaussian, mu=0, sigma=1, indpb=0.2)
-            toolbox.register("select", tools.selTournament, tournsize=3)
-            
-            pop = toolbox.population(n=population_size)
-            result, logbook = algorithms.eaSimple(pop, toolbox, 
-                                                cxpb=0.7, mutpb=0.3,
-                                                ngen=max_evals,
-                                                verbose=False)
-                                                
-            best_ind = tools.selBest(pop, 1)[0]
-            final_params = dict(zip(param_names, best_ind))
-            final_loss = evaluate_strategy(strategy, final_params)
-            
+            search = genetic_search_steps(strategy, strategy_dict['ga_bounds'], population_size, max_evals,
+                                          fidelities=fidelities, eta=eta)
+            # Each strategy gets its own random stream, seeded from the global one in order
+            searches.append(_isolated_random(_with_final_evaluation(search, strategy), random.getrandbits(64)))
+        results, costs = run_searches(evaluator, searches, names, progress)
+
+        for strategy_dict, ((final_params, _), final_loss) in zip(strategies, results):
             if final_loss < best_loss:
                 best_loss = final_loss
                 best_params = final_params
-                best_strategy = strategy
-                # Progress monitoring for GA
-                def show_progress(gen, num_gen, fits, best):
-                    mean = sum(fits) / len(fits)
-                    print(f"Gen {gen}/{num_gen} - Best: {min(fits):.4f}, Avg: {mean:.4f}")
-
-                # Add stats tracking
-                stats = tools.Statistics(lambda ind: ind.fitness.values)
-                stats.register("min", np.min)
-                stats.register("avg", np.mean)
-
-                # Add the progress callback to eaSimple
-                result, logbook = algorithms.eaSimple(pop, toolbox,
-                                                    cxpb=0.7, mutpb=0.3,
-                                                    ngen=max_evals,
-                                                    stats=stats,
-                                                    verbose=True)
+                best_strategy = strategy_dict['strategy']
     else:
+        progress.close()
         raise ValueError("Invalid optimization_method. Use 'random', 'hyperopt', or 'genetic'.")
 
-    return {
-        'best_loss': best_loss,
-        'best_params': best_params,
-        'best_strategy': best_strategy
-    }
\ No newline at end of file
+    progress.close()
+    strategy_costs.extend(costs)
+    return best_loss, best_params, best_strategy
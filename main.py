@@ -17,6 +17,8 @@ max_evals = 100
 pop_size = 5
 optimization_technique = "hyperopt"
 loss_function = loss_functions.sharpe_ratio_loss_function
+seed = None  # Unseeded by default; set an int (e.g. 42) so a rerun asks for the same trials and finds them in the memo
+trial_memo = optimize.TrialMemo(path='output/trial_memo.sqlite')
 
 data_frames = []
 for i in range(len(tickers)):
@@ -24,7 +26,7 @@ for i in range(len(tickers)):
 
 print('optimizing strategies...')
 
-results = optimize.optimize(strategies, data_frames, loss_function, optimization_technique, max_evals=max_evals, population_size=pop_size)
+results = optimize.optimize(strategies, data_frames, loss_function, optimization_technique, max_evals=max_evals, population_size=pop_size, seed=seed, memo=trial_memo)
 
 print('results:')
 print('Best loss:', results['best_loss'])
@@ -1,8 +1,11 @@
-def run_backtest(trading_signals_original, starting_cash=1000000, commission=0.0001, spread=0.0001):
-    import pandas as pd
-    from datetime import timedelta
-    import copy
+import copy
+import numpy as np
+import pandas as pd
+from datetime import timedelta
+from modules.portfolio_values import PortfolioValues
 
+
+def run_backtest(trading_signals_original, starting_cash=1000000, commission=0.0001, spread=0.0001, engine='pandas'):
     """
     Run a backtest based on buy and sell actions.
 
@@ -11,27 +14,42 @@ def run_backtest(trading_signals_original, starting_cash=1000000, commission=0.0
     - starting_cash (float): Initial amount of cash. Default is $1,000,000.
     - commission (float): Percentage commission on each trade. Default is 0.001 (0.1%).
     - spread (float): The price spread in dollars. Default is $0.01.
+    - engine (str): 'pandas' walks the rows one at a time, 'numpy' finds the entry and exit bars
+      with array operations. Both return the same results. When Date is already a datetime
+      column in strictly increasing order, 'numpy' skips the deep copy, the date parsing and
+      the sort, and the returned DataFrame shares its columns with the input.
 
     Returns:
     - dict: Contains trade details and performance metrics.
     - DataFrame: The trading signals DataFrame with portfolio values.
     """
 
+    if engine == 'numpy' and _is_sorted_by_date(trading_signals_original):
+        # Only the index and the portfolio_value column change, so a shallow copy keeps the input untouched
+        trading_signals = trading_signals_original.copy(deep=False)
+        trading_signals.index = pd.RangeIndex(len(trading_signals))
+        return _run_backtest_numpy(trading_signals, starting_cash, commission, spread)
+
+    trading_signals = copy.deepcopy(trading_signals_original)
+
+    # Ensure Date is sorted and in datetime format
+    trading_signals['Date'] = pd.to_datetime(trading_signals['Date'])
+    trading_signals = trading_signals.sort_values('Date').reset_index(drop=True)
+
+    if engine == 'numpy':
+        return _run_backtest_numpy(trading_signals, starting_cash, commission, spread)
+    elif engine != 'pandas':
+        raise ValueError("Invalid engine. Use 'pandas' or 'numpy'.")
+
     cash = starting_cash
     position = 0
     entry_price = 0
     entry_time = None
     trades_history = []
 
-    # We'll store each row's time and portfolio value here
+    # We'll store each row's portfolio value here
     portfolio_values = []
 
-    trading_signals = copy.deepcopy(trading_signals_original)
-
-    # Ensure Date is sorted and in datetime format
-    trading_signals['Date'] = pd.to_datetime(trading_signals['Date'])
-    trading_signals = trading_signals.sort_values('Date').reset_index(drop=True)
-
     for index, row in trading_signals.iterrows():
         action = row['action']
         price = row['Close']
@@ -70,7 +88,7 @@ def run_backtest(trading_signals_original, starting_cash=1000000, commission=0.0
 
         # Calculate and record portfolio value at each row
         current_value = cash + (position * price if position > 0 else 0)
-        portfolio_values.append({"date_time": time, "value": current_value, "stock_value": row['Close']})
+        portfolio_values.append(current_value)
 
     # If still in a position at the end, close it
     if position > 0:
@@ -91,6 +109,118 @@ def run_backtest(trading_signals_original, starting_cash=1000000, commission=0.0
             'time_held': time_held
         })
 
+    portfolio_values = PortfolioValues.from_columns(trading_signals['Date'], portfolio_values, trading_signals['Close'])
+    return _summarize_backtest(trades_history, cash, starting_cash, trading_signals, portfolio_values)
+
+
+def _is_sorted_by_date(trading_signals):
+    """
+    True when the signals need no date parsing or sorting: a datetime Date column in strictly
+    increasing order, so sorting could not reorder equal dates.
+    """
+    dates = trading_signals['Date']
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        return False
+    nanoseconds = dates.to_numpy().view(np.int64) if dates.dt.tz is None else dates.array.asi8
+    return bool(np.all(nanoseconds[1:] > nanoseconds[:-1]))
+
+
+def _run_backtest_numpy(trading_signals, starting_cash, commission, spread):
+    """
+    Vectorized equivalent of the row loop in run_backtest.
+
+    A buy opens a position only when flat and a sell closes it only when long, so the
+    position after every row is the last buy/sell signal carried forward. Entry and exit
+    rows fall out of that held mask, cash is chained once per trade with the same
+    arithmetic as the row loop, and the per-row portfolio value is filled in with array
+    operations.
+
+    Parameters:
+    - trading_signals (DataFrame): Sorted signals with datetime 'Date', 'action', 'Close'.
+    - starting_cash (float): Initial amount of cash.
+    - commission (float): Percentage commission on each trade.
+    - spread (float): The price spread in dollars.
+
+    Returns:
+    - dict: Contains trade details and performance metrics.
+    - DataFrame: The trading signals DataFrame with portfolio values.
+    """
+    actions = trading_signals['action'].to_numpy()
+    close = trading_signals['Close'].to_numpy(dtype=float)
+    dates = pd.DatetimeIndex(trading_signals['Date'])
+    n = len(close)
+
+    # Carry the last buy (1) / sell (0) signal forward; rows before any signal are flat
+    signal = np.full(n, np.nan)
+    signal[actions == 'buy'] = 1.0
+    signal[actions == 'sell'] = 0.0
+    last_signal = np.where(np.isnan(signal), 0, np.arange(n))
+    np.maximum.accumulate(last_signal, out=last_signal)
+    held = signal[last_signal] == 1.0
+
+    was_held = np.concatenate(([False], held[:-1]))
+    entries = np.flatnonzero(held & ~was_held)
+    exits = np.flatnonzero(~held & was_held)
+
+    cash = starting_cash
+    trades_history = []
+    cash_while_held = np.empty(len(entries))
+    positions = np.empty(len(entries))
+    cash_after_trade = np.empty(len(entries))
+
+    for k, entry in enumerate(entries):
+        buy_price = close[entry] + spread
+        buy_cost = cash * (1 - commission)
+        position = buy_cost / buy_price
+        cash -= buy_cost
+        cash_while_held[k] = cash
+        positions[k] = position
+
+        # A position still open on the last row is closed at the final close
+        exit_index = exits[k] if k < len(exits) else n - 1
+        sell_price = close[exit_index] - spread
+        sell_revenue = position * sell_price * (1 - commission)
+        cash += sell_revenue
+        cash_after_trade[k] = cash
+
+        profit = sell_revenue - (position * buy_price)
+        trades_history.append({
+            'purchase_price': buy_price,
+            'sale_price': sell_price,
+            'purchase_date': dates[entry],
+            'sale_date': dates[exit_index],
+            'profit_loss_percent': profit / (position * buy_price),
+            'profit_loss_dollars': profit,
+            'time_held': dates[exit_index] - dates[entry]
+        })
+
+    # Portfolio value per row: cash plus the open position, or the cash left by the last trade
+    trade_index = np.cumsum(held & ~was_held) - 1
+    values = np.full(n, float(starting_cash))
+    flat_after_trade = ~held & (trade_index >= 0)
+    values[flat_after_trade] = cash_after_trade[trade_index[flat_after_trade]]
+    values[held] = cash_while_held[trade_index[held]] + positions[trade_index[held]] * close[held]
+
+    portfolio_values = PortfolioValues.from_columns(trading_signals['Date'], values, close)
+
+    return _summarize_backtest(trades_history, cash, starting_cash, trading_signals, portfolio_values)
+
+
+def _summarize_backtest(trades_history, cash, starting_cash, trading_signals, portfolio_values):
+    """
+    Build the result dict shared by both backtest engines.
+
+    Parameters:
+    - trades_history (list): Closed trades, oldest first.
+    - cash (float): Cash after the final position has been closed.
+    - starting_cash (float): Initial amount of cash.
+    - trading_signals (DataFrame): Sorted signals with datetime 'Date' column.
+    - portfolio_values (PortfolioValues): Date, portfolio value and close price per row.
+
+    Returns:
+    - dict: Contains trade details and performance metrics.
+    - DataFrame: The trading signals DataFrame with portfolio values.
+    """
     total_trades = len(trades_history)
     total_money_made = cash - starting_cash
     total_percentage_gain = total_money_made / starting_cash if starting_cash else 0
@@ -98,7 +228,6 @@ def run_backtest(trading_signals_original, starting_cash=1000000, commission=0.0
     total_days = (trading_signals['Date'].iloc[-1] - trading_signals['Date'].iloc[0]).days or 1
 
     # Compute average hold time
-    from datetime import timedelta
     time_held_list = [trade['time_held'] for trade in trades_history]
     if time_held_list:
         average_time_holding_position = sum(time_held_list, timedelta()) / len(time_held_list)
@@ -121,7 +250,7 @@ def run_backtest(trading_signals_original, starting_cash=1000000, commission=0.0
     average_monthly_percentage_gain = average_yearly_percentage_gain / 12
 
     # Attach numerical portfolio values back to the DataFrame for convenience
-    trading_signals['portfolio_value'] = [p['value'] for p in portfolio_values]
+    trading_signals['portfolio_value'] = portfolio_values.value
 
     return {
         'trades_history': trades_history,
@@ -135,8 +264,155 @@ def run_backtest(trading_signals_original, starting_cash=1000000, commission=0.0
         'average_gain_dollars_per_trade': avg_gain_dollars,
         'average_yearly_percentage_gain': average_yearly_percentage_gain,
         'average_monthly_percentage_gain': average_monthly_percentage_gain,
-        # Returns the list of dictionaries with {"date_time", "value"}
+        # Columnar equity curve; indexes and iterates like a list of {"date_time", "value", "stock_value"} dicts
         'portfolio_values_over_time': portfolio_values,
         # Original signals DataFrame with numeric portfolio values attached
         'trading_signals': trading_signals
     }, trading_signals
+
+
+def run_backtest_batch(close, dates, actions_matrix, starting_cash=1000000, commission=0.0001, spread=0.0001):
+    """
+    Backtest many candidate signal columns against one price series in a single pass.
+
+    Uses the same trading rules as run_backtest: a buy opens a position with all available
+    cash when flat, a sell closes it when long, commission is charged on both legs, the spread
+    is added to the buy price and subtracted from the sell price, and a position still open
+    on the last row is closed at the final close.
+
+    Parameters:
+    - close (array-like): Close prices, shape (time,), sorted by date.
+    - dates (array-like): Dates matching close.
+    - actions_matrix (array-like or DataFrame): 'buy'/'sell'/'none' per row (time) and
+      candidate (column), shape (time, candidates).
+    - starting_cash (float): Initial amount of cash for every candidate.
+    - commission (float): Percentage commission on each trade.
+    - spread (float): The price spread in dollars.
+
+    Returns:
+    - ndarray: Portfolio value per row and candidate, shape (time, candidates).
+    - dict: Per-candidate arrays with 'total_trades', 'final_cash', 'total_amount_of_money_made',
+      'total_percentage_gain', 'average_gain_percent_per_trade', 'average_gain_dollars_per_trade',
+      'average_time_holding_position', 'longest_time_position_held',
+      'average_yearly_percentage_gain' and 'average_monthly_percentage_gain'.
+    """
+    close = np.asarray(close, dtype=float)
+    # Nanoseconds since the epoch (UTC for tz-aware dates), so differences are exact integers
+    dates = pd.Series(dates)
+    if not pd.api.types.is_datetime64_any_dtype(dates):
+        dates = pd.to_datetime(dates)
+    dates = dates.array.asi8
+    actions = np.asarray(actions_matrix, dtype=object)
+    if actions.ndim == 1:
+        actions = actions[:, None]
+    n_rows, n_candidates = actions.shape
+    if len(close) != n_rows:
+        raise ValueError("actions_matrix must have one row per close price.")
+
+    # Held mask per candidate: the last buy (1) / sell (0) signal carried down each column
+    signal = np.full(actions.shape, np.nan)
+    signal[actions == 'buy'] = 1.0
+    signal[actions == 'sell'] = 0.0
+    last_signal = np.where(np.isnan(signal), 0, np.arange(n_rows)[:, None])
+    np.maximum.accumulate(last_signal, axis=0, out=last_signal)
+    held = np.take_along_axis(signal, last_signal, axis=0) == 1.0
+
+    was_held = np.zeros_like(held)
+    was_held[1:] = held[:-1]
+    entry_mask = held & ~was_held
+    exit_mask = ~held & was_held
+
+    # Trades ordered by candidate, then time; the k-th exit of a candidate closes its k-th entry
+    entry_candidate, entry_row = np.nonzero(entry_mask.T)
+    exit_candidate, exit_row = np.nonzero(exit_mask.T)
+    trades_per_candidate = np.bincount(entry_candidate, minlength=n_candidates)
+    exits_per_candidate = np.bincount(exit_candidate, minlength=n_candidates)
+    first_trade = np.concatenate(([0], np.cumsum(trades_per_candidate)[:-1]))
+    first_exit = np.concatenate(([0], np.cumsum(exits_per_candidate)[:-1]))
+
+    trade_rank = np.arange(len(entry_row)) - first_trade[entry_candidate]
+    closed = trade_rank < exits_per_candidate[entry_candidate]
+    trade_exit_row = np.full(len(entry_row), n_rows - 1)
+    trade_exit_row[closed] = exit_row[first_exit[entry_candidate[closed]] + trade_rank[closed]]
+
+    buy_price = close[entry_row] + spread
+    sell_price = close[trade_exit_row] - spread
+    kept_fraction = 1 - commission
+
+    # Chain cash trade by trade with the arithmetic of run_backtest's row loop, so the cash
+    # matches it exactly. Step k handles the k-th trade of every candidate that has one.
+    positions = np.empty(len(entry_row))
+    cash_while_held = np.empty(len(entry_row))
+    sell_revenue = np.empty(len(entry_row))
+    cash_after_trade = np.empty(len(entry_row))
+    cash = np.full(n_candidates, float(starting_cash))
+    for rank in range(trades_per_candidate.max(initial=0)):
+        trading = np.flatnonzero(trades_per_candidate > rank)
+        k = first_trade[trading] + rank
+        buy_cost = cash[trading] * kept_fraction
+        positions[k] = buy_cost / buy_price[k]
+        cash_while_held[k] = cash[trading] - buy_cost
+        sell_revenue[k] = positions[k] * sell_price[k] * kept_fraction
+        cash[trading] = cash_while_held[k] + sell_revenue[k]
+        cash_after_trade[k] = cash[trading]
+
+    profit_dollars = sell_revenue - (positions * buy_price)
+    profit_percent = profit_dollars / (positions * buy_price)
+
+    # Portfolio value per row, looked up from the candidate's current or most recent trade
+    trade_index = np.cumsum(entry_mask, axis=0) - 1
+    global_trade_index = np.clip(trade_index + first_trade, 0, max(len(entry_row) - 1, 0))
+    if len(entry_row):
+        value_held = cash_while_held[global_trade_index] + positions[global_trade_index] * close[:, None]
+        value_flat = np.where(trade_index >= 0, cash_after_trade[global_trade_index], float(starting_cash))
+        equity_curves = np.where(held, value_held, value_flat)
+    else:
+        equity_curves = np.full(actions.shape, float(starting_cash))
+
+    final_cash = cash
+    total_money_made = final_cash - starting_cash
+    total_percentage_gain = total_money_made / starting_cash if starting_cash else np.zeros(n_candidates)
+
+    trade_count = np.maximum(trades_per_candidate, 1)
+    time_held = dates[trade_exit_row] - dates[entry_row]
+    average_time_held = np.bincount(entry_candidate, weights=time_held, minlength=n_candidates) / trade_count
+    longest_time_held = np.zeros(n_candidates, dtype=np.int64)
+    np.maximum.at(longest_time_held, entry_candidate, time_held)
+
+    total_days = int((dates[-1] - dates[0]) // pd.Timedelta(days=1).value) or 1
+    years_in_data = total_days / 365.0
+    average_yearly_percentage_gain = total_percentage_gain / years_in_data if years_in_data > 0 else np.zeros(n_candidates)
+
+    return equity_curves, {
+        'total_trades': trades_per_candidate,
+        'final_cash': final_cash,
+        'total_amount_of_money_made': total_money_made,
+        'total_percentage_gain': total_percentage_gain,
+        'average_gain_percent_per_trade': np.bincount(entry_candidate, weights=profit_percent, minlength=n_candidates) / trade_count,
+        'average_gain_dollars_per_trade': np.bincount(entry_candidate, weights=profit_dollars, minlength=n_candidates) / trade_count,
+        'average_time_holding_position': average_time_held.astype('timedelta64[ns]'),
+        'longest_time_position_held': longest_time_held.astype('timedelta64[ns]'),
+        'average_yearly_percentage_gain': average_yearly_percentage_gain,
+        'average_monthly_percentage_gain': average_yearly_percentage_gain / 12
+    }
+
+
+def backtest_summary(trading_signals, starting_cash=1000000, commission=0.0001, spread=0.0001):
+    """
+    Return the summary stats of run_backtest for one signals DataFrame, from run_backtest_batch
+    with a single candidate. No trades history, equity curve or signals DataFrame is built.
+
+    Parameters:
+    - trading_signals (DataFrame): Contains 'Date', 'action', 'Close' columns.
+    - starting_cash (float): Initial amount of cash.
+    - commission (float): Percentage commission on each trade.
+    - spread (float): The price spread in dollars.
+
+    Returns:
+    - dict: The keys of run_backtest_batch's summary, as scalars.
+    """
+    if not _is_sorted_by_date(trading_signals):
+        trading_signals = trading_signals.assign(Date=pd.to_datetime(trading_signals['Date'])).sort_values('Date')
+    _, summary = run_backtest_batch(trading_signals['Close'], trading_signals['Date'], trading_signals['action'],
+                                    starting_cash, commission, spread)
+    return {key: pd.Timedelta(values[0]) if values.dtype.kind == 'm' else values[0].item() for key, values in summary.items()}
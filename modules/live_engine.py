@@ -0,0 +1,200 @@
+import asyncio
+import inspect
+import time
+
+import numpy as np
+import pandas as pd
+
+from modules.live_sim_backtest import get_live_strategy, latency_summary
+
+
+class ReplayFeed:
+    """
+    Async bar feed that replays stored OHLC bars, a local stand-in for a broker feed.
+
+    Any object with a `ticker` attribute and an async `bars()` generator yielding bar dicts
+    can be given to LiveEngine; this one reads the bars from a CSV file (as written by
+    DataFrame.to_csv) or a DataFrame.
+
+    Parameters:
+    - source (str or DataFrame): CSV path or frame with 'Date' and the OHLC columns. Dates
+      read from a CSV file are converted to UTC.
+    - ticker (str): Ticker the bars belong to.
+    - speed (float): None replays as fast as the consumer takes the bars. Otherwise the gap
+      between consecutive bar dates is waited out divided by speed: 1 is real time, 60 plays
+      an hour of minute bars in a minute.
+    - max_delay (float): Longest wait between two bars in seconds, e.g. to skip overnight gaps.
+    """
+
+    def __init__(self, source, ticker, speed=None, max_delay=None):
+        self.source = source
+        self.ticker = ticker
+        self.speed = speed
+        self.max_delay = max_delay
+
+    def load(self):
+        """
+        Return the bars to replay as a DataFrame sorted by date.
+        """
+        if isinstance(self.source, pd.DataFrame):
+            data = self.source.copy()
+        else:
+            data = pd.read_csv(self.source)
+            # Bars around a daylight-saving change carry different UTC offsets
+            data['Date'] = pd.to_datetime(data['Date'], utc=True)
+        return data.sort_values('Date').reset_index(drop=True)
+
+    async def bars(self):
+        """
+        Yield the bars one at a time as dicts, paced by speed.
+        """
+        data = self.load()
+        previous_date = None
+        for bar in data.to_dict('records'):
+            if self.speed and previous_date is not None:
+                delay = (bar['Date'] - previous_date).total_seconds() / self.speed
+                if self.max_delay is not None:
+                    delay = min(delay, self.max_delay)
+                await asyncio.sleep(max(delay, 0))
+            else:
+                # Let the other tickers' tasks run between bars
+                await asyncio.sleep(0)
+            previous_date = bar['Date']
+            yield bar
+
+
+class PrefixStrategy:
+    """
+    Per-bar adapter for a strategy function without a LiveStrategy: every bar calls
+    strategy_function on all bars received so far, like run_live_simulation(incremental=False).
+    """
+
+    def __init__(self, strategy_function, params):
+        self.strategy_function = strategy_function
+        self.params = params
+        self.history = []
+
+    def on_bar(self, bar):
+        self.history.append(bar)
+        return self.strategy_function(pd.DataFrame(self.history), self.params)
+
+
+class LiveEngine:
+    """
+    Event-driven live engine: bars from async feeds are dispatched to one strategy task per
+    ticker, so many tickers are monitored concurrently in one process.
+
+    Each ticker has a bounded queue between its feed and its strategy task. When a strategy
+    falls behind, the queue fills up and the feed waits before producing the next bar
+    (backpressure), so memory stays bounded however fast the feed is. Every bar is timed
+    from the moment the feed hands it over until the strategy has decided on it.
+
+    Parameters:
+    - strategy_function (callable): A strategy module's should_buy_live. Every ticker gets its
+      own instance of the module's LiveStrategy; other functions are called on the bars
+      received so far.
+    - params (dict): Parameters to pass to the strategy.
+    - queue_size (int): Bars buffered per ticker before the feed is held back.
+    - on_signal (callable): Optional. Called (or awaited, if a coroutine function) with
+      (ticker, bar, action, value) for every 'buy' or 'sell', e.g. to place orders.
+    """
+
+    def __init__(self, strategy_function, params=None, queue_size=64, on_signal=None):
+        self.strategy_function = strategy_function
+        self.params = params if params is not None else {}
+        self.queue_size = queue_size
+        self.on_signal = on_signal
+        self.feeds = []
+
+    def add_feed(self, feed):
+        """
+        Register a feed; each ticker can only be fed once.
+        """
+        if any(existing.ticker == feed.ticker for existing in self.feeds):
+            raise ValueError(f"A feed for {feed.ticker} was already added.")
+        self.feeds.append(feed)
+
+    def _create_strategy(self):
+        live_strategy = get_live_strategy(self.strategy_function, dict(self.params))
+        if live_strategy is None or live_strategy is self.strategy_function:
+            # An on_bar object holds one ticker's state, so it cannot be shared
+            return PrefixStrategy(self.strategy_function, self.params)
+        return live_strategy
+
+    async def _produce(self, feed, queue, result):
+        try:
+            async for bar in feed.bars():
+                wait_start = time.perf_counter()
+                await queue.put((wait_start, bar))
+                # Time spent waiting for room in the queue
+                result['backpressure_seconds'] += time.perf_counter() - wait_start
+                result['max_queue_depth'] = max(result['max_queue_depth'], queue.qsize())
+        finally:
+            await queue.put(None)
+
+    async def _consume(self, ticker, queue, result):
+        strategy = self._create_strategy()
+        records = []
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            received, bar = item
+            try:
+                action, value = strategy.on_bar(bar)[:2]
+            except Exception as error:
+                # One failing bar or ticker must not stop the others
+                result['errors'].append((bar.get('Date'), repr(error)))
+                action, value = 'error', None
+            latency = time.perf_counter() - received
+            records.append((bar.get('Date'), action, value, latency))
+
+            if self.on_signal is not None and action in ('buy', 'sell'):
+                signal = self.on_signal(ticker, bar, action, value)
+                if inspect.isawaitable(signal):
+                    await signal
+
+        result['signals'] = pd.DataFrame(records, columns=['Date', 'action', 'value', 'latency'])
+        result['latency'] = latency_summary(result['signals']['latency'])
+
+    async def run(self):
+        """
+        Run every feed to the end.
+
+        Returns:
+        - dict: Per ticker, 'signals' (DataFrame of Date, action, value and latency in seconds
+          per bar), 'latency' (latency_summary of the bars), 'errors' (list of (Date, error)
+          for bars whose strategy call raised; their action is 'error'),
+          'backpressure_seconds' (time the feed waited for the strategy) and 'max_queue_depth'.
+          Under the key None, 'latency' over all tickers plus 'bars_per_second' and 'seconds'.
+        """
+        results = {}
+        tasks = []
+        start = time.perf_counter()
+        for feed in self.feeds:
+            queue = asyncio.Queue(maxsize=self.queue_size)
+            result = {'signals': None, 'latency': None, 'errors': [], 'backpressure_seconds': 0.0, 'max_queue_depth': 0}
+            results[feed.ticker] = result
+            tasks.append(self._produce(feed, queue, result))
+            tasks.append(self._consume(feed.ticker, queue, result))
+        await asyncio.gather(*tasks)
+        seconds = time.perf_counter() - start
+
+        latencies = [result['signals']['latency'].to_numpy() for result in results.values()]
+        latencies = np.concatenate(latencies) if latencies else np.array([])
+        results[None] = {
+            'latency': latency_summary(latencies),
+            'bars_per_second': len(latencies) / seconds if seconds > 0 else np.nan,
+            'seconds': seconds
+        }
+        return results
+
+
+def run_live_engine(strategy_function, feeds, params=None, queue_size=64, on_signal=None):
+    """
+    Build a LiveEngine over `feeds`, run it to the end and return LiveEngine.run's results.
+    """
+    engine = LiveEngine(strategy_function, params=params, queue_size=queue_size, on_signal=on_signal)
+    for feed in feeds:
+        engine.add_feed(feed)
+    return asyncio.run(engine.run())
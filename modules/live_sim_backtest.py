@@ -1,22 +1,135 @@
+import json
+import sys
+import time
+import numpy as np
 import pandas as pd
 from datetime import timedelta
 
 
-def run_live_simulation(strategy_function, data, starting_cash=1000000, commission=0.001, spread=0.01, params=None, save_path=None):
+def get_live_strategy(strategy_function, params):
+    """
+    Return the incremental strategy that replaces calls to strategy_function, or None.
+
+    An object with on_bar() is used as is. A strategy module's should_buy_live is replaced
+    by that module's LiveStrategy built with params.
+    """
+    if hasattr(strategy_function, 'on_bar'):
+        return strategy_function
+    module = sys.modules.get(getattr(strategy_function, '__module__', None))
+    live_strategy = getattr(module, 'LiveStrategy', None)
+    if live_strategy is not None and getattr(module, 'should_buy_live', None) is strategy_function:
+        return live_strategy(params)
+    return None
+
+
+def latency_summary(latencies):
+    """
+    Summarize per-bar latencies.
+
+    Parameters:
+    - latencies (array-like): Latencies in seconds.
+
+    Returns:
+    - dict: Bar count, mean/p50/p95/p99/max latency in milliseconds.
+    """
+    latencies = np.asarray(latencies, dtype=float) * 1000
+    if len(latencies) == 0:
+        return {'bars': 0, 'mean_ms': np.nan, 'p50_ms': np.nan, 'p95_ms': np.nan, 'p99_ms': np.nan, 'max_ms': np.nan}
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {'bars': len(latencies), 'mean_ms': latencies.mean(), 'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99, 'max_ms': latencies.max()}
+
+
+def latency_report(timings, strategy_name=None, slowest=10):
+    """
+    Build the latency report of a live simulation from its per-bar timings.
+
+    Parameters:
+    - timings (DataFrame): One row per bar with 'Date', 'history_length' and 'seconds'.
+    - strategy_name (str): Name stored in the report.
+    - slowest (int): Number of slowest ticks to list.
+
+    Returns:
+    - dict: 'strategy', 'summary' (latency_summary), 'bars_per_second' over the strategy
+      calls, 'growth_ms_per_1000_bars' (how much the median latency grows per 1000 bars of
+      history, comparing the first and last quarter of the bars), 'slowest_ticks'
+      (DataFrame) and 'timings'.
+    """
+    seconds = timings['seconds'].to_numpy(dtype=float)
+    total = seconds.sum()
+    growth = np.nan
+    quarter = len(seconds) // 4
+    if quarter > 0:
+        # Medians keep one-off spikes (first-call compilation, GC pauses) out of the trend
+        history_length = timings['history_length'].to_numpy(dtype=float)
+        span = history_length[-quarter:].mean() - history_length[:quarter].mean()
+        if span > 0:
+            growth = (np.median(seconds[-quarter:]) - np.median(seconds[:quarter])) / span * 1000 * 1000
+    return {
+        'strategy': strategy_name,
+        'summary': latency_summary(seconds),
+        'bars_per_second': len(seconds) / total if total > 0 else np.nan,
+        'growth_ms_per_1000_bars': growth,
+        'slowest_ticks': timings.nlargest(slowest, 'seconds'),
+        'timings': timings
+    }
+
+
+def export_latency_report(report, path):
+    """
+    Write a latency report to `path`.
+
+    A '.json' path gets the summary, throughput, growth, slowest ticks and every timing.
+    Any other path gets the per-bar timings as CSV.
+    """
+    if str(path).lower().endswith('.json'):
+        def records(frame):
+            return json.loads(frame.to_json(orient='records', date_format='iso'))
+
+        payload = {key: value for key, value in report.items() if key not in ('slowest_ticks', 'timings')}
+        payload['slowest_ticks'] = records(report['slowest_ticks'])
+        payload['timings'] = records(report['timings'])
+        with open(path, 'w') as file:
+            json.dump(payload, file, indent=2, default=float)
+    else:
+        timings = report['timings'].copy()
+        timings.insert(0, 'strategy', report['strategy'])
+        timings.to_csv(path, index=False)
+
+
+def strategy_name_of(strategy_function):
+    """
+    Name used for a strategy in reports, e.g. 'MACD_Strategy' for MACD_Strategy.should_buy_live.
+    """
+    module = getattr(strategy_function, '__module__', None) or type(strategy_function).__module__
+    return module.rsplit('.', 1)[-1]
+
+
+def run_live_simulation(strategy_function, data, starting_cash=1000000, commission=0.001, spread=0.01, params=None, save_path=None, incremental=True, measure_latency=False, latency_path=None, warmup_bars=None):
     """
     Run a live simulation backtest based on a strategy function.
 
     Parameters:
-    - strategy_function (callable): The strategy function to test (e.g., should_buy_live).
+    - strategy_function (callable): The strategy function to test (e.g., should_buy_live), or a
+      fresh incremental strategy object (e.g., RSI_Strategy.LiveStrategy(params)).
     - data (DataFrame): Contains 'Date' and 'Close' columns with historical price data.
     - starting_cash (float): The initial amount of cash.
     - commission (float): The percentage commission on each trade.
     - spread (float): The price spread in dollars.
     - params (dict): Parameters to pass to the strategy function.
     - save_path (str): Optional. Path to save the resulting DataFrame as a CSV file.
+    - incremental (bool): Drive the strategy module's LiveStrategy one bar at a time (O(1) per
+      bar) instead of calling should_buy_live on every prefix. Both give the same results.
+    - measure_latency (bool): Time every strategy call and add a 'latency' report to the results
+      (see latency_report).
+    - latency_path (str): Optional. Export the latency report there as JSON ('.json') or CSV.
+      Implies measure_latency.
+    - warmup_bars (int): Optional. Compute the first warmup_bars bars in one batch with
+      LiveStrategy.warmup, then continue bar by bar from the state it leaves. The actions,
+      trades and portfolio values are the same as replaying every bar; only the startup is
+      faster. Needs an incremental strategy. Latency is measured on the bars after the warm-up.
 
     Returns:
-    - dict: Contains trade details and performance metrics.
+    - dict: Contains trade details and performance metrics, plus 'latency' when measured.
     - DataFrame: The trading signals DataFrame with portfolio values.
     """
 
@@ -34,19 +147,48 @@ def run_live_simulation(strategy_function, data, starting_cash=1000000, commissi
     data['action'] = 'none'
     data['RSI'] = None
 
+    live_strategy = get_live_strategy(strategy_function, params) if incremental else None
+    if warmup_bars and live_strategy is None:
+        raise ValueError("warmup_bars needs an incremental strategy: a strategy module's should_buy_live with incremental=True.")
+    warmup_bars = min(int(warmup_bars or 0), len(data))
+    # Bars after the warm-up, fed to the incremental strategy one at a time
+    bars = data.iloc[warmup_bars:].to_dict('records') if live_strategy is not None else None
+    measure_latency = measure_latency or latency_path is not None
+    call_seconds = np.empty(len(data) - warmup_bars) if measure_latency else None
+
+    # The history segment's decisions come from one batch
+    actions, values = [], []
+    warmup_seconds = 0.0
+    if warmup_bars:
+        warmup_start = time.perf_counter()
+        actions, values = live_strategy.warmup(data.iloc[:warmup_bars])
+        warmup_seconds = time.perf_counter() - warmup_start
+
+    dates = data['Date']
+    closes = data['Close'].to_numpy()
+
     for i in range(len(data)):
-        current_time = data.at[i, 'Date']
-        current_price = data.at[i, 'Close']
-        current_data = data.iloc[:i+1]
+        current_price = closes[i]
 
         # pulls a list that has the action and the RSI value [action, RSI]
-        action_full = strategy_function(current_data, params)
+        if i >= warmup_bars:
+            if measure_latency:
+                call_start = time.perf_counter()
+            if live_strategy is not None:
+                action_full = live_strategy.on_bar(bars[i - warmup_bars])
+            else:
+                current_data = data.iloc[:i+1]
+                action_full = strategy_function(current_data, params)
+            if measure_latency:
+                call_seconds[i - warmup_bars] = time.perf_counter() - call_start
+            actions.append(action_full[0])
+            values.append(action_full[1])
+            if live_strategy is None:
+                # should_buy_live sees the columns written so far
+                data.at[i, 'action'] = action_full[0]
+                data.at[i, 'RSI'] = action_full[1]
 
-        action = action_full[0]
-        
-    
-        data.at[i, 'action'] = action
-        data.at[i, 'RSI'] = action_full[1]
+        action = actions[i]
 
         if action == 'buy' and position == 0:
             buy_price = current_price + spread
@@ -54,9 +196,10 @@ def run_live_simulation(strategy_function, data, starting_cash=1000000, commissi
             position = buy_cost / buy_price
             cash -= buy_cost
             entry_price = buy_price
-            entry_time = current_time
+            entry_time = dates.iat[i]
 
         elif action == 'sell' and position > 0:
+            current_time = dates.iat[i]
             sell_price = current_price - spread
             sell_revenue = position * sell_price * (1 - commission)
             cash += sell_revenue
@@ -81,6 +224,9 @@ def run_live_simulation(strategy_function, data, starting_cash=1000000, commissi
         portfolio_value = cash + (position * current_price if position > 0 else 0)
         portfolio_values.append(portfolio_value)
 
+    data['action'] = pd.Series(actions, index=data.index, dtype=object)
+    data['RSI'] = pd.Series(values, index=data.index, dtype=object)
+
     if position > 0:
         sell_price = data.iloc[-1]['Close'] - spread
         sell_revenue = position * sell_price * (1 - commission)
@@ -117,7 +263,20 @@ def run_live_simulation(strategy_function, data, starting_cash=1000000, commissi
     if save_path:
         data.to_csv(save_path, index=False)
 
-    return {
+    latency = None
+    if measure_latency:
+        timings = pd.DataFrame({
+            'Date': data['Date'].iloc[warmup_bars:],
+            'history_length': np.arange(warmup_bars + 1, len(data) + 1),
+            'seconds': call_seconds
+        })
+        latency = latency_report(timings, strategy_name_of(strategy_function))
+        latency['warmup_bars'] = warmup_bars
+        latency['warmup_seconds'] = warmup_seconds
+        if latency_path:
+            export_latency_report(latency, latency_path)
+
+    results = {
         'trades_history': trades_history,
         'total_trades': total_trades,
         'final_cash': cash,
@@ -128,4 +287,7 @@ def run_live_simulation(strategy_function, data, starting_cash=1000000, commissi
         'average_time_holding_position': average_time_holding_position,
         'longest_time_position_held': longest_time_position_held,
         'trading_signals': data
-    }, data
\ No newline at end of file
+    }
+    if latency is not None:
+        results['latency'] = latency
+    return results, data
\ No newline at end of file
@@ -0,0 +1,89 @@
+import operator
+from collections.abc import Sequence
+
+import numpy as np
+import pandas as pd
+
+
+class PortfolioValues(Sequence):
+    """
+    Equity curve of a backtest held as contiguous NumPy columns.
+
+    Columns:
+    - date_time (ndarray[int64]): Nanoseconds since the epoch (UTC for timezone-aware dates).
+    - value (ndarray[float64]): Portfolio value at each row.
+    - stock_value (ndarray[float64]): Close price of the traded stock at each row.
+
+    Indexing and iteration still yield {"date_time", "value", "stock_value"} dicts, so code
+    written against the old list of dicts (including pd.DataFrame(...)) keeps working, while
+    loss functions can read the arrays directly.
+    """
+
+    __slots__ = ('date_time', 'value', 'stock_value', 'tz')
+
+    def __init__(self, date_time, value, stock_value, tz=None):
+        self.date_time = np.ascontiguousarray(date_time, dtype=np.int64)
+        self.value = np.ascontiguousarray(value, dtype=np.float64)
+        self.stock_value = np.ascontiguousarray(stock_value, dtype=np.float64)
+        self.tz = tz
+
+    @classmethod
+    def from_columns(cls, dates, value, stock_value):
+        """
+        Build from a date column (Series, DatetimeIndex or array) and two value columns.
+        """
+        dates = pd.DatetimeIndex(dates).as_unit('ns')
+        return cls(dates.asi8, value, stock_value, tz=dates.tz)
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Build from a list of {"date_time", "value", "stock_value"} dicts.
+        """
+        if isinstance(records, cls):
+            return records
+        records = list(records)
+        return cls.from_columns(
+            pd.to_datetime([record['date_time'] for record in records]),
+            [record['value'] for record in records],
+            [record['stock_value'] for record in records]
+        )
+
+    @property
+    def dates(self):
+        """
+        The date_time column as a DatetimeIndex in the original timezone.
+        """
+        dates = pd.to_datetime(self.date_time, utc=self.tz is not None)
+        return dates.tz_convert(self.tz) if self.tz is not None else dates
+
+    def to_frame(self):
+        """
+        Return the curve as a DataFrame with 'date_time', 'value' and 'stock_value' columns.
+        """
+        return pd.DataFrame({
+            'date_time': self.dates,
+            'value': self.value,
+            'stock_value': self.stock_value
+        })
+
+    def __len__(self):
+        return len(self.value)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return PortfolioValues(self.date_time[index], self.value[index], self.stock_value[index], tz=self.tz)
+        index = operator.index(index)
+        date_time = pd.Timestamp(int(self.date_time[index]), tz='UTC' if self.tz is not None else None)
+        return {
+            'date_time': date_time.tz_convert(self.tz) if self.tz is not None else date_time,
+            'value': float(self.value[index]),
+            'stock_value': float(self.stock_value[index])
+        }
+
+    def __iter__(self):
+        for date_time, value, stock_value in zip(self.dates, self.value.tolist(), self.stock_value.tolist()):
+            yield {'date_time': date_time, 'value': value, 'stock_value': stock_value}
+
+    def __repr__(self):
+        return f"PortfolioValues(rows={len(self)}, tz={self.tz})"
@@ -1,9 +1,12 @@
 import pandas as pd
 from hyperopt import hp
+from strategies.signal_utils import lagged, action_codes, assign_actions, IncrementalStrategy
+from strategies.streaming_indicators import StreamingBollingerBands
+from strategies import indicator_cache
 
-def calculate_bollinger_bands(data, window=20, num_std_dev=2):
-    rolling_mean = data['Close'].rolling(window=window).mean()
-    rolling_std = data['Close'].rolling(window=window).std()
+def calculate_bollinger_bands(data, window=20, num_std_dev=2, cache=True):
+    rolling_mean = indicator_cache.rolling_mean(data['Close'], window, cache)
+    rolling_std = indicator_cache.rolling_std(data['Close'], window, cache)
     upper_band = rolling_mean + (rolling_std * num_std_dev)
     lower_band = rolling_mean - (rolling_std * num_std_dev)
     return rolling_mean, upper_band, lower_band
@@ -25,15 +28,14 @@ def strategy(data, params={'window': 20, 'num_std_dev': 2}):
     data_copy['action'] = "none"
     
     # Example: shift comparisons by 1 day
-    for i in range(2, len(data_copy)):
-        data_copy.at[i, 'action'] = check_bollinger_action(
-            current_close=data_copy['Close'].iloc[i-1],
-            upper_band=data_copy['Upper Band'].iloc[i-1],
-            lower_band=data_copy['Lower Band'].iloc[i-1],
-            previous_close=data_copy['Close'].iloc[i-2],
-            previous_upper_band=data_copy['Upper Band'].iloc[i-2],
-            previous_lower_band=data_copy['Lower Band'].iloc[i-2]
-        )
+    current_close, previous_close = lagged(data_copy['Close'])
+    upper_band, previous_upper_band = lagged(data_copy['Upper Band'])
+    lower_band, previous_lower_band = lagged(data_copy['Lower Band'])
+    codes = action_codes(
+        buy=(current_close < lower_band) & (previous_close >= previous_lower_band),
+        sell=(current_close > upper_band) & (previous_close <= previous_upper_band)
+    )
+    assign_actions(data_copy, codes, start=2)
     
     return data_copy
 
@@ -45,7 +47,7 @@ def should_buy_live(data, params={'window': 20, 'num_std_dev': 2}):
         num_std_dev = params.get('num_std_dev')
         
         recent_data = data  # Only take the last `window` periods
-        rolling_mean, upper_band, lower_band = calculate_bollinger_bands(recent_data, window, num_std_dev)
+        rolling_mean, upper_band, lower_band = calculate_bollinger_bands(recent_data, window, num_std_dev, cache=False)
         
         current_close = recent_data['Close'].iloc[-1]
         previous_close = recent_data['Close'].iloc[-2]
@@ -58,6 +60,43 @@ def should_buy_live(data, params={'window': 20, 'num_std_dev': 2}):
     
     return decision
 
+class LiveStrategy(IncrementalStrategy):
+    """
+    Incremental should_buy_live: the rolling mean and standard deviation advance one bar at
+    a time instead of being recomputed over the whole history.
+    """
+
+    def __init__(self, params={'window': 20, 'num_std_dev': 2}):
+        super().__init__(params)
+        self.bands = StreamingBollingerBands(params.get('window'), params.get('num_std_dev'))
+        self.previous = None
+
+    def on_bar(self, bar):
+        close = bar['Close']
+        _, upper_band, lower_band = self.bands.update(close)
+        current = (close, upper_band, lower_band)
+        previous, self.previous = self.previous, current
+        self.bars += 1
+
+        if self.bars < self.params.get('window'):
+            return ['none', 0]
+        current_close, current_upper_band, current_lower_band = current
+        previous_close, previous_upper_band, previous_lower_band = previous
+        return [check_bollinger_action(current_close, current_upper_band, current_lower_band, previous_close, previous_upper_band, previous_lower_band), current_close]
+
+    def on_bars(self, history):
+        closes = history['Close'].tolist()
+        _, upper_band, lower_band = self.bands.update_many(closes)
+        current = list(zip(closes, upper_band.tolist(), lower_band.tolist()))
+        previous = [self.previous] + current[:-1]
+        skip = self.leading_rows(len(closes), self.params.get('window'))
+        if current:
+            self.previous = current[-1]
+        self.bars += len(closes)
+
+        actions = ['none'] * skip + [check_bollinger_action(*bar, *previous_bar) for bar, previous_bar in zip(current[skip:], previous[skip:])]
+        return actions, [0] * skip + closes[skip:]
+
 param_space = {
     'window': hp.quniform('window', 10, 50, 1),
     'num_std_dev': hp.uniform('num_std_dev', 1, 3)
@@ -69,6 +108,13 @@ ga_bounds = {
     'num_std_dev': (1, 3)
 }
 
+
+def canonical_params(params):
+    """
+    The parameters as strategy() uses them, so samples that run the same backtest are equal.
+    """
+    return {'window': int(params.get('window')), 'num_std_dev': params.get('num_std_dev')}
+
 # Example usage:
 # df = fetch_historical_data('AAPL', '1d', '2018-01-01', '2024-01-01')
 # params = {'window': 20, 'num_std_dev': 2}
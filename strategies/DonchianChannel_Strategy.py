@@ -1,10 +1,15 @@
+from collections import deque
+import numpy as np
 import pandas as pd
 from hyperopt import hp
+from strategies.signal_utils import lagged, action_codes, assign_actions, IncrementalStrategy
+from strategies.streaming_indicators import StreamingDonchianChannel
+from strategies import indicator_cache
 
-def calculate_donchian_channel(data, window):
+def calculate_donchian_channel(data, window, cache=True):
     window = int(window)  # Ensure window is an integer
-    high = data['High'].rolling(window=window).max()
-    low = data['Low'].rolling(window=window).min()
+    high = indicator_cache.rolling_max(data['High'], window, cache)
+    low = indicator_cache.rolling_min(data['Low'], window, cache)
     return high, low
 
 def check_donchian_action(current_close, upper_band, lower_band, prev_close, prev_upper_band, prev_lower_band):
@@ -20,15 +25,14 @@ def strategy(data, params={'window': 20}):
     data_copy['Upper Band'], data_copy['Lower Band'] = calculate_donchian_channel(data_copy, window)
     data_copy['action'] = "none"
     
-    for i in range(1, len(data_copy)):
-        data_copy.at[i, 'action'] = check_donchian_action(
-            current_close=data_copy['Close'].iloc[i-1],
-            upper_band=data_copy['Upper Band'].iloc[i-1],
-            lower_band=data_copy['Lower Band'].iloc[i-1],
-            prev_close=data_copy['Close'].iloc[i-2],
-            prev_upper_band=data_copy['Upper Band'].iloc[i-2],
-            prev_lower_band=data_copy['Lower Band'].iloc[i-2]
-        )
+    current_close, prev_close = lagged(data_copy['Close'])
+    upper_band, prev_upper_band = lagged(data_copy['Upper Band'])
+    lower_band, prev_lower_band = lagged(data_copy['Lower Band'])
+    codes = action_codes(
+        buy=(current_close > upper_band) & (prev_close <= prev_upper_band),
+        sell=(current_close < lower_band) & (prev_close >= prev_lower_band)
+    )
+    assign_actions(data_copy, codes, start=1)
     
     return data_copy
 
@@ -38,7 +42,7 @@ def should_buy_live(data, params={'window': 20}):
     
     window = int(params.get('window'))
     recent_data = data.tail(window)
-    upper_band, lower_band = calculate_donchian_channel(recent_data, window)
+    upper_band, lower_band = calculate_donchian_channel(recent_data, window, cache=False)
     
     current_close = recent_data['Close'].iloc[-1]
     previous_close = recent_data['Close'].iloc[-2]
@@ -53,6 +57,45 @@ def should_buy_live(data, params={'window': 20}):
     ), current_close]
     return decision
 
+class LiveStrategy(IncrementalStrategy):
+    """
+    Incremental should_buy_live with the channel kept by monotonic-deque rolling max/min.
+
+    should_buy_live computes the channel over only the last `window` bars, so its previous
+    bar never has a full window and the previous bands are NaN: it never signals, and that
+    is kept here.
+    """
+
+    def __init__(self, params={'window': 20}):
+        super().__init__(params)
+        self.channel = StreamingDonchianChannel(int(params.get('window')))
+        self.closes = deque([np.nan, np.nan], maxlen=2)
+
+    def on_bar(self, bar):
+        upper_band, lower_band = self.channel.update(bar['High'], bar['Low'])
+        self.closes.append(bar['Close'])
+        self.bars += 1
+
+        if self.bars < self.params.get('window'):
+            return ['none', 0]
+        previous_close, current_close = self.closes
+        return [check_donchian_action(
+            current_close, upper_band, lower_band,
+            previous_close, np.nan, np.nan
+        ), current_close]
+
+    def on_bars(self, history):
+        closes = history['Close'].tolist()
+        upper_band, lower_band = self.channel.update_many(history['High'].to_numpy(dtype=float), history['Low'].to_numpy(dtype=float))
+        previous_closes = [self.closes[-1]] + closes[:-1]
+        skip = self.leading_rows(len(closes), self.params.get('window'))
+        self.closes.extend(closes)
+        self.bars += len(closes)
+
+        rows = zip(closes[skip:], upper_band[skip:].tolist(), lower_band[skip:].tolist(), previous_closes[skip:])
+        actions = [check_donchian_action(close, upper, lower, previous_close, np.nan, np.nan) for close, upper, lower, previous_close in rows]
+        return ['none'] * skip + actions, [0] * skip + closes[skip:]
+
 # Define the param_space for Hyperopt optimization
 param_space = {
     'window': hp.quniform('window', 10, 50, 1)
@@ -62,3 +105,10 @@ param_space = {
 ga_bounds = {
     'window': (10, 50)
 }
+
+
+def canonical_params(params):
+    """
+    The parameters as strategy() uses them, so samples that run the same backtest are equal.
+    """
+    return {'window': int(params.get('window'))}
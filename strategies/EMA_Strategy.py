@@ -1,9 +1,13 @@
+from collections import deque
 import pandas as pd
 from hyperopt import hp
+from strategies.signal_utils import crossover_tpsl_actions, assign_actions, IncrementalStrategy
+from strategies.streaming_indicators import ewm_mean_series, trailing_ewm_mean
+from strategies import indicator_cache
 
-def calculate_ema(data, short_window, long_window):
-    short_ema = data['Close'].ewm(span=short_window, adjust=False).mean()
-    long_ema = data['Close'].ewm(span=long_window, adjust=False).mean()
+def calculate_ema(data, short_window, long_window, cache=True):
+    short_ema = indicator_cache.ewm_mean(data['Close'], short_window, cache)
+    long_ema = indicator_cache.ewm_mean(data['Close'], long_window, cache)
     return short_ema, long_ema
 
 def strategy(data, 
@@ -25,42 +29,16 @@ def strategy(data,
     data_copy['Short EMA'], data_copy['Long EMA'] = calculate_ema(data_copy, short_window, long_window)
     data_copy['action'] = 'none'
     
-    in_position = False
-    buy_price = None
-    
-    # Loop through data to generate signals
-    for i in range(1, len(data_copy)):
-        current_short_ema = data_copy['Short EMA'].iloc[i-1]
-        current_long_ema = data_copy['Long EMA'].iloc[i-1]
-        previous_short_ema = data_copy['Short EMA'].iloc[i-2] if i >= 2 else None
-        previous_long_ema = data_copy['Long EMA'].iloc[i-2] if i >= 2 else None
-        close_price = data_copy['Close'].iloc[i]
-        
-        if not in_position:
-            # Check for EMA-based BUY
-            if current_short_ema > current_long_ema and previous_short_ema <= previous_long_ema:
-                data_copy.at[i, 'action'] = 'buy'
-                in_position = True
-                buy_price = close_price
-        else:
-            # If TP/SL is ON, only sell when TP or SL is triggered
-            if tpsl_flag == 1:
-                # Take Profit condition
-                if close_price >= buy_price * (1 + take_profit_pct):
-                    data_copy.at[i, 'action'] = 'sell'
-                    in_position = False
-                    buy_price = None
-                # Stop Loss condition
-                elif close_price <= buy_price * (1 - stop_loss_pct):
-                    data_copy.at[i, 'action'] = 'sell'
-                    in_position = False
-                    buy_price = None
-            else:
-                # If TP/SL is OFF, sell on EMA crossover
-                if current_short_ema < current_long_ema and previous_short_ema >= previous_long_ema:
-                    data_copy.at[i, 'action'] = 'sell'
-                    in_position = False
-                    buy_price = None
+    # Entry/TP/SL/crossover-exit state machine, compiled with Numba when available
+    codes = crossover_tpsl_actions(
+        data_copy['Short EMA'].to_numpy(dtype=float),
+        data_copy['Long EMA'].to_numpy(dtype=float),
+        data_copy['Close'].to_numpy(dtype=float),
+        tpsl_flag == 1,
+        float(take_profit_pct),
+        float(stop_loss_pct)
+    )
+    assign_actions(data_copy, codes)
     
     return data_copy
 
@@ -89,7 +67,7 @@ def should_buy_live(data,
     stop_loss_pct = params.get('stop_loss_pct', 0.005)
     
     recent_data = data[-long_window:]
-    short_ema, long_ema = calculate_ema(recent_data, short_window, long_window)
+    short_ema, long_ema = calculate_ema(recent_data, short_window, long_window, cache=False)
     
     if len(short_ema) < 2:
         return ['none', 0]
@@ -119,6 +97,57 @@ def should_buy_live(data,
         return ['buy', current_short_ema]
     return ['none', current_short_ema]
 
+class LiveStrategy(IncrementalStrategy):
+    """
+    Incremental should_buy_live. The live check recomputes both EMAs over the last
+    `long_window` bars, so only those are kept and the work per bar does not grow with
+    the history.
+    """
+
+    def __init__(self, params={'short_window': 12, 'long_window': 26, 'take_profit_stop_loss': 0, 'take_profit_pct': 0.005, 'stop_loss_pct': 0.005}):
+        super().__init__(params)
+        self.short_window = int(params.get('short_window', 12))
+        self.long_window = int(params.get('long_window', 26))
+        self.closes = deque(maxlen=self.long_window)
+
+    def on_bar(self, bar):
+        self.closes.append(bar['Close'])
+        self.bars += 1
+
+        if self.bars < self.params.get('long_window', 26):
+            return ['none', 0]
+        short_ema = ewm_mean_series(self.closes, self.short_window)
+        long_ema = ewm_mean_series(self.closes, self.long_window)
+        if len(short_ema) < 2:
+            return ['none', 0]
+
+        return self._decide(short_ema[-1], long_ema[-1], short_ema[-2], long_ema[-2])
+
+    def on_bars(self, history):
+        closes = history['Close'].tolist()
+        skip = self.leading_rows(len(closes), self.params.get('long_window', 26))
+        tail = list(self.closes) + closes
+        start = len(self.closes)
+        self.closes.extend(closes)
+        self.bars += len(closes)
+        if skip == len(closes) or self.long_window < 2:
+            return ['none'] * len(closes), [0] * len(closes)
+
+        # Both EMAs restart on the last `long_window` closes of every bar
+        short_ema, previous_short_ema = (values.tolist() for values in trailing_ewm_mean(tail, self.long_window, self.short_window))
+        long_ema, previous_long_ema = (values.tolist() for values in trailing_ewm_mean(tail, self.long_window, self.long_window))
+        decisions = [self._decide(short_ema[t], long_ema[t], previous_short_ema[t], previous_long_ema[t]) for t in range(start + skip, len(tail))]
+        return ['none'] * skip + [decision[0] for decision in decisions], [0] * skip + [decision[1] for decision in decisions]
+
+    def _decide(self, current_short_ema, current_long_ema, previous_short_ema, previous_long_ema):
+        if current_short_ema > current_long_ema and previous_short_ema <= previous_long_ema:
+            return ['buy', current_short_ema]
+        # With TP/SL on, selling is left to the caller as in should_buy_live
+        if self.params.get('take_profit_stop_loss', 0) == 0:
+            if current_short_ema < current_long_ema and previous_short_ema >= previous_long_ema:
+                return ['sell', current_short_ema]
+        return ['none', current_short_ema]
+
 # Add take-profit/stop-loss parameters to the Hyperopt param_space
 param_space = {
     'short_window': hp.quniform('short_window', 5, 20, 1),
@@ -136,3 +165,19 @@ ga_bounds = {
     'take_profit_pct': (0.001, 0.01),
     'stop_loss_pct': (0.001, 0.01)
 }
+
+
+def canonical_params(params):
+    """
+    The parameters as strategy() uses them, so samples that run the same backtest are equal.
+    """
+    canonical = {
+        'short_window': int(params.get('short_window', 12)),
+        'long_window': int(params.get('long_window', 26)),
+        'take_profit_stop_loss': int(params.get('take_profit_stop_loss', 0) == 1)
+    }
+    # The take-profit/stop-loss levels only matter when the flag is on
+    if canonical['take_profit_stop_loss']:
+        canonical['take_profit_pct'] = params.get('take_profit_pct', 0.005)
+        canonical['stop_loss_pct'] = params.get('stop_loss_pct', 0.005)
+    return canonical
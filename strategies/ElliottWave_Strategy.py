@@ -1,19 +1,56 @@
+import numpy as np
 import pandas as pd
 from hyperopt import hp
 
+from strategies.signal_utils import NONE, BUY, SELL, assign_actions, LiveStateCache, IncrementalStrategy
+
+# Wave codes stored in the index-to-wave map
+PEAK, TROUGH = 1, 2
+WAVE_NAMES = {PEAK: 'peak', TROUGH: 'trough'}
+
+def elliott_wave_map(data, window=20):
+    """
+    Classify every bar as a peak, trough or neither with vectorized neighbour comparisons.
+
+    Bars are first filtered like detect_elliott_wave: the first window - 1 rows (the rolling
+    swing high/low warm-up) and any row containing NaN are dropped. Positions refer to the
+    remaining rows.
+
+    Parameters:
+    - data (DataFrame): Price data with 'High' and 'Low' columns.
+    - window (int): Rolling window of the swing high/low.
+
+    Returns:
+    - ndarray[int8]: Wave code (0, PEAK or TROUGH) per remaining row.
+    - ndarray[float]: High for peaks, Low for troughs, NaN elsewhere.
+    """
+    window = int(window)
+    high = data['High'].to_numpy(dtype=float)
+    low = data['Low'].to_numpy(dtype=float)
+
+    # Rolling max/min are NaN until `window` non-NaN High and Low values are available
+    missing = np.concatenate(([0], np.cumsum(np.isnan(high) | np.isnan(low))))
+    rows = np.arange(len(data))
+    window_start = np.maximum(rows + 1 - window, 0)
+    keep = (rows >= window - 1) & (missing[rows + 1] == missing[window_start])
+    keep &= data.notna().all(axis=1).to_numpy()
+
+    high = high[keep]
+    low = low[keep]
+    kinds = np.zeros(len(high), dtype=np.int8)
+    if len(high) >= 3:
+        middle_high = high[1:-1]
+        middle_low = low[1:-1]
+        peak = (middle_high > high[:-2]) & (middle_high > high[2:])
+        trough = ~peak & (middle_low < low[:-2]) & (middle_low < low[2:])
+        kinds[1:-1] = np.where(peak, PEAK, np.where(trough, TROUGH, 0))
+    prices = np.where(kinds == PEAK, high, np.where(kinds == TROUGH, low, np.nan))
+    return kinds, prices
+
 def detect_elliott_wave(data, window=20):
-    data_copy = data.copy()
-    data_copy['Swing High'] = data['High'].rolling(window=int(window)).max()
-    data_copy['Swing Low'] = data['Low'].rolling(window=int(window)).min()
-    data_copy.dropna(inplace=True)  # Drop rows with NaN values from rolling calculations
-    
-    waves = []
-    for i in range(1, len(data_copy) - 1):
-        if data_copy['High'].iloc[i] > data_copy['High'].iloc[i - 1] and data_copy['High'].iloc[i] > data_copy['High'].iloc[i + 1]:
-            waves.append(('peak', i, data_copy['High'].iloc[i]))
-        elif data_copy['Low'].iloc[i] < data_copy['Low'].iloc[i - 1] and data_copy['Low'].iloc[i] < data_copy['Low'].iloc[i + 1]:
-            waves.append(('trough', i, data_copy['Low'].iloc[i]))
-    return waves
+    kinds, prices = elliott_wave_map(data, window)
+    positions = np.flatnonzero(kinds)
+    return [(WAVE_NAMES[kinds[i]], int(i), prices[i]) for i in positions]
 
 def check_elliott_action(waves, current_index, close_price):
     if len(waves) < 5:
@@ -25,28 +62,126 @@ def check_elliott_action(waves, current_index, close_price):
         return 'buy'
     return 'none'
 
+class ElliottWaveDetector:
+    """
+    Incremental peak/trough detector for data that grows one bar at a time.
+
+    A bar is classified once the bar after it arrives, so each new bar only compares the
+    last three kept bars. Rows are filtered like detect_elliott_wave, but only on the price
+    columns, so values a caller writes into other columns after the call (such as the 'RSI'
+    column of run_live_simulation) do not change earlier waves.
+    """
+
+    def __init__(self, window=20, columns=('Date', 'Open', 'High', 'Low', 'Close')):
+        self.window = int(window)
+        self.columns = list(columns)
+        self.waves = []
+        self.kept = 0  # Rows kept after the warm-up/NaN filter
+        self.valid_run = 0  # Consecutive rows with non-NaN High and Low
+        self.recent = []  # (high, low) of the last three kept rows
+
+    def update(self, high, low, complete=True):
+        """
+        Add one bar. `complete` is False when another consumed column of the row is NaN.
+        """
+        if np.isnan(high) or np.isnan(low):
+            self.valid_run = 0
+            return
+        self.valid_run += 1
+        if self.valid_run < self.window or not complete:
+            return
+
+        self.recent = self.recent[-2:] + [(high, low)]
+        self.kept += 1
+        if len(self.recent) == 3:
+            (prev_high, prev_low), (mid_high, mid_low), (next_high, next_low) = self.recent
+            position = self.kept - 2
+            if mid_high > prev_high and mid_high > next_high:
+                self.waves.append(('peak', position, mid_high))
+            elif mid_low < prev_low and mid_low < next_low:
+                self.waves.append(('trough', position, mid_low))
+
+    def feed(self, rows):
+        """
+        Add the bars of a DataFrame slice.
+        """
+        columns = [column for column in self.columns if column in rows.columns]
+        complete = rows[columns].notna().all(axis=1).tolist()
+        high = rows['High'].to_numpy(dtype=float)
+        low = rows['Low'].to_numpy(dtype=float)
+        for bar_high, bar_low, bar_complete in zip(high, low, complete):
+            self.update(bar_high, bar_low, bar_complete)
+
 def strategy(data, params={'window': 20}):
     window = int(params.get('window'))
     data_copy = data.copy()
-    waves = detect_elliott_wave(data_copy, window)
+    kinds, _ = elliott_wave_map(data_copy, window)
     data_copy['action'] = "none"
-    
-    for i in range(len(data_copy)):
-        data_copy.at[i, 'action'] = check_elliott_action(waves, i, data_copy['Close'].iloc[i])
+
+    # Only the most recent wave can trigger, once at least five waves exist
+    codes = np.full(len(data_copy), NONE, dtype=np.int8)
+    positions = np.flatnonzero(kinds)
+    if len(positions) >= 5 and positions[-1] < len(codes):
+        codes[positions[-1]] = SELL if kinds[positions[-1]] == PEAK else BUY
+    assign_actions(data_copy, codes, start=0)
     
     return data_copy.dropna()  # Drop rows with NaN actions to avoid downstream issues
 
+# One detector per window, advanced with only the bars added since the last call
+_live_detectors = LiveStateCache(ElliottWaveDetector)
+
 def should_buy_live(data, params={'window': 20}):
     if len(data) < params.get('window'):
         return ['none', 0]
     
     window = int(params.get('window'))
-    waves = detect_elliott_wave(data, window)
+    waves = _live_detectors.advance((window,), data).waves
     current_index = len(data) - 1
     current_close = data['Close'].iloc[-1]
     decision = [check_elliott_action(waves, current_index, current_close), current_close]
     return decision
 
+class LiveStrategy(IncrementalStrategy):
+    """
+    Incremental should_buy_live driving an ElliottWaveDetector.
+
+    A wave is only detected once the bar after it arrives, so the last wave is never the
+    current bar and should_buy_live never signals; that is kept here.
+    """
+
+    def __init__(self, params={'window': 20}):
+        super().__init__(params)
+        self.detector = ElliottWaveDetector(int(params.get('window')))
+
+    def on_bar(self, bar):
+        complete = not any(pd.isna(bar[column]) for column in self.detector.columns if column in bar)
+        self.detector.update(float(bar['High']), float(bar['Low']), complete)
+        self.bars += 1
+
+        if self.bars < self.params.get('window'):
+            return ['none', 0]
+        current_close = bar['Close']
+        return [check_elliott_action(self.detector.waves, self.bars - 1, current_close), current_close]
+
+    def on_bars(self, history):
+        columns = [column for column in self.detector.columns if column in history.columns]
+        complete = history[columns].notna().all(axis=1).tolist()
+        highs = history['High'].to_numpy(dtype=float).tolist()
+        lows = history['Low'].to_numpy(dtype=float).tolist()
+        closes = history['Close'].tolist()
+        window = self.params.get('window')
+        actions, values = [], []
+        for high, low, bar_complete, close in zip(highs, lows, complete, closes):
+            self.detector.update(high, low, bar_complete)
+            self.bars += 1
+            if self.bars < window:
+                actions.append('none')
+                values.append(0)
+            else:
+                actions.append(check_elliott_action(self.detector.waves, self.bars - 1, close))
+                values.append(close)
+        return actions, values
+
 # Define the param_space for Hyperopt optimization
 param_space = {
     'window': hp.quniform('window', 10, 50, 1)
@@ -56,3 +191,10 @@ param_space = {
 ga_bounds = {
     'window': (10, 50)
 }
+
+
+def canonical_params(params):
+    """
+    The parameters as strategy() uses them, so samples that run the same backtest are equal.
+    """
+    return {'window': int(params.get('window'))}
@@ -1,7 +1,12 @@
+from collections import deque
 import pandas as pd
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from hyperopt import hp
+from strategies.signal_utils import lagged, action_codes, assign_actions, IncrementalStrategy
+from strategies import indicator_cache
 
-def calculate_ichimoku(data, tenkan_window=9, kijun_window=26, senkou_span_b_window=52):
+def calculate_ichimoku(data, tenkan_window=9, kijun_window=26, senkou_span_b_window=52, cache=True):
     # Cast windows to integers
     tenkan_window = int(tenkan_window)
     kijun_window = int(kijun_window)
@@ -10,19 +15,19 @@ def calculate_ichimoku(data, tenkan_window=9, kijun_window=26, senkou_span_b_win
     data_copy = data.copy()
     
     # Tenkan-sen (Conversion Line)
-    data_copy['Tenkan-sen'] = (data_copy['High'].rolling(window=tenkan_window).max() + 
-                               data_copy['Low'].rolling(window=tenkan_window).min()) / 2
+    data_copy['Tenkan-sen'] = (indicator_cache.rolling_max(data_copy['High'], tenkan_window, cache) + 
+                               indicator_cache.rolling_min(data_copy['Low'], tenkan_window, cache)) / 2
     
     # Kijun-sen (Base Line)
-    data_copy['Kijun-sen'] = (data_copy['High'].rolling(window=kijun_window).max() + 
-                              data_copy['Low'].rolling(window=kijun_window).min()) / 2
+    data_copy['Kijun-sen'] = (indicator_cache.rolling_max(data_copy['High'], kijun_window, cache) + 
+                              indicator_cache.rolling_min(data_copy['Low'], kijun_window, cache)) / 2
     
     # Senkou Span A (Leading Span A)
     data_copy['Senkou Span A'] = ((data_copy['Tenkan-sen'] + data_copy['Kijun-sen']) / 2).shift(kijun_window)
     
     # Senkou Span B (Leading Span B)
-    data_copy['Senkou Span B'] = ((data_copy['High'].rolling(window=senkou_span_b_window).max() + 
-                                   data_copy['Low'].rolling(window=senkou_span_b_window).min()) / 2).shift(kijun_window)
+    data_copy['Senkou Span B'] = ((indicator_cache.rolling_max(data_copy['High'], senkou_span_b_window, cache) + 
+                                   indicator_cache.rolling_min(data_copy['Low'], senkou_span_b_window, cache)) / 2).shift(kijun_window)
     
     return data_copy
 
@@ -37,15 +42,19 @@ def strategy(data, params={'tenkan_window': 9, 'kijun_window': 26, 'senkou_span_
     data_copy = calculate_ichimoku(data, **params)
     data_copy['action'] = "none"
     
-    for i in range(1, len(data_copy)):
-        data_copy.at[i, 'action'] = check_ichimoku_action(
-            current_close=data_copy['Close'].iloc[i-1],
-            tenkan=data_copy['Tenkan-sen'].iloc[i-1],
-            kijun=data_copy['Kijun-sen'].iloc[i-1],
-            senkou_a=data_copy['Senkou Span A'].iloc[i-1],
-            senkou_b=data_copy['Senkou Span B'].iloc[i-1],
-            prev_close=data_copy['Close'].iloc[i-2]
-        )
+    current_close, _ = lagged(data_copy['Close'])
+    tenkan, _ = lagged(data_copy['Tenkan-sen'])
+    kijun, _ = lagged(data_copy['Kijun-sen'])
+    senkou_a, _ = lagged(data_copy['Senkou Span A'])
+    senkou_b, _ = lagged(data_copy['Senkou Span B'])
+    # Same as the builtin max()/min() in check_ichimoku_action, which keep senkou_a unless senkou_b compares larger/smaller
+    cloud_top = np.where(senkou_b > senkou_a, senkou_b, senkou_a)
+    cloud_bottom = np.where(senkou_b < senkou_a, senkou_b, senkou_a)
+    codes = action_codes(
+        buy=(current_close > tenkan) & (tenkan > kijun) & (current_close > cloud_top),
+        sell=(current_close < tenkan) & (tenkan < kijun) & (current_close < cloud_bottom)
+    )
+    assign_actions(data_copy, codes, start=1)
     
     return data_copy
 
@@ -53,7 +62,7 @@ def should_buy_live(data, params={'tenkan_window': 9, 'kijun_window': 26, 'senko
     if len(data) < params.get('senkou_span_b_window', 52):
         return ['none', 0]
     
-    recent_data = calculate_ichimoku(data.tail(params['senkou_span_b_window']), **params)
+    recent_data = calculate_ichimoku(data.tail(params['senkou_span_b_window']), **params, cache=False)
     current_row = recent_data.iloc[-1]
     previous_row = recent_data.iloc[-2]
     
@@ -68,6 +77,90 @@ def should_buy_live(data, params={'tenkan_window': 9, 'kijun_window': 26, 'senko
     
     return decision
 
+class LiveStrategy(IncrementalStrategy):
+    """
+    Incremental should_buy_live. The live check computes the cloud over the last
+    `senkou_span_b_window` bars only, so only those are kept.
+    """
+
+    def __init__(self, params={'tenkan_window': 9, 'kijun_window': 26, 'senkou_span_b_window': 52}):
+        super().__init__(params)
+        self.tenkan_window = int(params['tenkan_window'])
+        self.kijun_window = int(params['kijun_window'])
+        self.senkou_span_b_window = int(params['senkou_span_b_window'])
+        self.closes = deque(maxlen=self.senkou_span_b_window)
+        self.highs = deque(maxlen=self.senkou_span_b_window)
+        self.lows = deque(maxlen=self.senkou_span_b_window)
+
+    def _midpoint(self, highs, lows, position, window):
+        # (rolling max High + rolling min Low) / 2 at a position of the tail
+        if position < 0 or position < window - 1:
+            return np.nan
+        start = position - window + 1
+        return (np.max(highs[start:position + 1]) + np.min(lows[start:position + 1])) / 2
+
+    def on_bar(self, bar):
+        self.closes.append(bar['Close'])
+        self.highs.append(bar['High'])
+        self.lows.append(bar['Low'])
+        self.bars += 1
+
+        if self.bars < self.params.get('senkou_span_b_window', 52):
+            return ['none', 0]
+        highs = np.asarray(self.highs, dtype=float)
+        lows = np.asarray(self.lows, dtype=float)
+        last = len(highs) - 1
+        shifted = last - self.kijun_window  # Senkou spans are shifted forward by kijun_window
+        senkou_a = (self._midpoint(highs, lows, shifted, self.tenkan_window) + self._midpoint(highs, lows, shifted, self.kijun_window)) / 2
+        return [check_ichimoku_action(
+            current_close=self.closes[-1],
+            tenkan=self._midpoint(highs, lows, last, self.tenkan_window),
+            kijun=self._midpoint(highs, lows, last, self.kijun_window),
+            senkou_a=senkou_a,
+            senkou_b=self._midpoint(highs, lows, shifted, self.senkou_span_b_window),
+            prev_close=self.closes[-2]
+        ), self.closes[-1]]
+
+    def _midpoints(self, highs, lows, window, position):
+        # _midpoint at `position` of the tail ending at every bar, from rolling max/min
+        midpoints = np.full(len(highs), np.nan)
+        lag = self.senkou_span_b_window - 1 - position
+        if position < 0 or position < window - 1 or window < 1 or window - 1 + lag >= len(highs):
+            return midpoints
+        rolling = (sliding_window_view(highs, window).max(axis=1) + sliding_window_view(lows, window).min(axis=1)) / 2
+        midpoints[window - 1 + lag:] = rolling[:len(rolling) - lag]
+        return midpoints
+
+    def on_bars(self, history):
+        closes = history['Close'].tolist()
+        skip = self.leading_rows(len(closes), self.params.get('senkou_span_b_window', 52))
+        tail_closes = list(self.closes) + closes
+        highs = np.concatenate((np.asarray(self.highs, dtype=float), history['High'].to_numpy(dtype=float)))
+        lows = np.concatenate((np.asarray(self.lows, dtype=float), history['Low'].to_numpy(dtype=float)))
+        start = len(self.closes)
+        self.closes.extend(closes)
+        self.highs.extend(history['High'].tolist())
+        self.lows.extend(history['Low'].tolist())
+        self.bars += len(closes)
+        if skip == len(closes):
+            return ['none'] * skip, [0] * skip
+
+        last = self.senkou_span_b_window - 1
+        shifted = last - self.kijun_window
+        tenkan = self._midpoints(highs, lows, self.tenkan_window, last)
+        kijun = self._midpoints(highs, lows, self.kijun_window, last)
+        senkou_a = (self._midpoints(highs, lows, self.tenkan_window, shifted) + self._midpoints(highs, lows, self.kijun_window, shifted)) / 2
+        senkou_b = self._midpoints(highs, lows, self.senkou_span_b_window, shifted)
+        actions = [check_ichimoku_action(
+            current_close=tail_closes[t],
+            tenkan=tenkan[t],
+            kijun=kijun[t],
+            senkou_a=senkou_a[t],
+            senkou_b=senkou_b[t],
+            prev_close=tail_closes[t - 1]
+        ) for t in range(start + skip, len(tail_closes))]
+        return ['none'] * skip + actions, [0] * skip + closes[skip:]
+
 # Define the param_space for Hyperopt optimization
 param_space = {
     'tenkan_window': hp.quniform('tenkan_window', 5, 20, 1),
@@ -81,3 +174,16 @@ ga_bounds = {
     'kijun_window': (21, 30),
     'senkou_span_b_window': (45, 60)
 }
+
+
+def canonical_params(params):
+    """
+    The parameters as strategy() uses them, so samples that run the same backtest are equal.
+    """
+    # Every key is passed on to calculate_ichimoku, which casts the windows
+    return {
+        **params,
+        'tenkan_window': int(params.get('tenkan_window', 9)),
+        'kijun_window': int(params.get('kijun_window', 26)),
+        'senkou_span_b_window': int(params.get('senkou_span_b_window', 52))
+    }
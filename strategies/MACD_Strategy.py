@@ -1,11 +1,18 @@
 import pandas as pd
 from hyperopt import hp
+from strategies.signal_utils import crossover_tpsl_actions, assign_actions, IncrementalStrategy
+from strategies.streaming_indicators import StreamingMACD
+from strategies import indicator_cache
 
-def calculate_macd(data, short_window=12, long_window=26, signal_window=9):
-    short_ema = data['Close'].ewm(span=short_window, adjust=False).mean()
-    long_ema = data['Close'].ewm(span=long_window, adjust=False).mean()
+def calculate_macd(data, short_window=12, long_window=26, signal_window=9, cache=True):
+    short_ema = indicator_cache.ewm_mean(data['Close'], short_window, cache)
+    long_ema = indicator_cache.ewm_mean(data['Close'], long_window, cache)
     macd = short_ema - long_ema
-    signal = macd.ewm(span=signal_window, adjust=False).mean()
+    # Keyed on the Close column so the MACD line itself does not need fingerprinting
+    signal = indicator_cache.cached_indicator(
+        'macd_signal', [data['Close']], (short_window, long_window, signal_window),
+        lambda: macd.ewm(span=signal_window, adjust=False).mean(), cache
+    )
     return macd, signal
 
 def check_macd_action(current_macd, current_signal, previous_macd, previous_signal):
@@ -37,47 +44,16 @@ def strategy(data, params={
     )
     data_copy['action'] = 'none'
 
-    in_position = False
-    buy_price = None
-    
-    for i in range(1, len(data_copy)):
-        current_macd = data_copy['MACD'].iloc[i-1]
-        current_signal = data_copy['Signal'].iloc[i-1]
-        previous_macd = data_copy['MACD'].iloc[i-2] if i >= 2 else None
-        previous_signal = data_copy['Signal'].iloc[i-2] if i >= 2 else None
-        close_price = data_copy['Close'].iloc[i]
-        
-        if not in_position:
-            # Check for MACD-based BUY
-            if (current_macd > current_signal and 
-                previous_macd is not None and 
-                previous_signal is not None and
-                previous_macd <= previous_signal):
-                data_copy.at[i, 'action'] = 'buy'
-                in_position = True
-                buy_price = close_price
-        else:
-            # If TP/SL is ON, only sell when TP or SL is reached
-            if tpsl_flag == 1:
-                # Take Profit
-                if close_price >= buy_price * (1 + take_profit_pct):
-                    data_copy.at[i, 'action'] = 'sell'
-                    in_position = False
-                    buy_price = None
-                # Stop Loss
-                elif close_price <= buy_price * (1 - stop_loss_pct):
-                    data_copy.at[i, 'action'] = 'sell'
-                    in_position = False
-                    buy_price = None
-            else:
-                # If TP/SL is OFF, use MACD-based SELL
-                if (current_macd < current_signal and 
-                    previous_macd is not None and 
-                    previous_signal is not None and
-                    previous_macd >= previous_signal):
-                    data_copy.at[i, 'action'] = 'sell'
-                    in_position = False
-                    buy_price = None
+    # Entry/TP/SL/crossover-exit state machine, compiled with Numba when available
+    codes = crossover_tpsl_actions(
+        data_copy['MACD'].to_numpy(dtype=float),
+        data_copy['Signal'].to_numpy(dtype=float),
+        data_copy['Close'].to_numpy(dtype=float),
+        tpsl_flag == 1,
+        float(take_profit_pct),
+        float(stop_loss_pct)
+    )
+    assign_actions(data_copy, codes)
     
     return data_copy
 
@@ -103,7 +79,7 @@ def should_buy_live(data, params={
     # The TP/SL logic here is non-trivial in a "stateless" live call,
     # so we'll focus on MACD-based signals unless you manage position states externally.
 
-    macd, signal = calculate_macd(data, short_window, long_window, signal_window)
+    macd, signal = calculate_macd(data, short_window, long_window, signal_window, cache=False)
     if len(macd) < 2:
         return ['none', 0]
     
@@ -126,6 +102,49 @@ def should_buy_live(data, params={
         return ['buy', current_macd]
     return ['none', current_macd]
 
+class LiveStrategy(IncrementalStrategy):
+    """
+    Incremental should_buy_live: the MACD and signal lines advance one bar at a time instead
+    of being recomputed over the whole history.
+    """
+
+    def __init__(self, params={'short_window': 12, 'long_window': 26, 'signal_window': 9, 'take_profit_stop_loss': 0, 'take_profit_pct': 0.005, 'stop_loss_pct': 0.005}):
+        super().__init__(params)
+        self.macd = StreamingMACD(int(params.get('short_window', 12)), int(params.get('long_window', 26)), int(params.get('signal_window', 9)))
+        self.previous = None
+
+    def on_bar(self, bar):
+        current = self.macd.update(bar['Close'])
+        previous, self.previous = self.previous, current
+        self.bars += 1
+
+        if self.bars < self.params.get('long_window', 26) or self.bars < 2:
+            return ['none', 0]
+        return self._decide(current, previous)
+
+    def on_bars(self, history):
+        macd, signal = self.macd.update_many(history['Close'].to_numpy(dtype=float))
+        current = list(zip(macd.tolist(), signal.tolist()))
+        previous = [self.previous] + current[:-1]
+        skip = self.leading_rows(len(current), max(self.params.get('long_window', 26), 2))
+        if current:
+            self.previous = current[-1]
+        self.bars += len(current)
+
+        decisions = [self._decide(bar, previous_bar) for bar, previous_bar in zip(current[skip:], previous[skip:])]
+        return ['none'] * skip + [decision[0] for decision in decisions], [0] * skip + [decision[1] for decision in decisions]
+
+    def _decide(self, current, previous):
+        current_macd, current_signal = current
+        previous_macd, previous_signal = previous
+        if current_macd > current_signal and previous_macd <= previous_signal:
+            return ['buy', current_macd]
+        # With TP/SL on, selling is left to the caller as in should_buy_live
+        if self.params.get('take_profit_stop_loss', 0) == 0:
+            if current_macd < current_signal and previous_macd >= previous_signal:
+                return ['sell', current_macd]
+        return ['none', current_macd]
+
 # Updated Hyperopt space: add take_profit_stop_loss, take_profit_pct, stop_loss_pct
 param_space = {
     'short_window': hp.quniform('short_window', 5, 20, 1),
@@ -145,3 +164,20 @@ ga_bounds = {
     'take_profit_pct': (0.001, 0.01),
     'stop_loss_pct': (0.001, 0.01)
 }
+
+
+def canonical_params(params):
+    """
+    The parameters as strategy() uses them, so samples that run the same backtest are equal.
+    """
+    canonical = {
+        'short_window': int(params.get('short_window', 12)),
+        'long_window': int(params.get('long_window', 26)),
+        'signal_window': int(params.get('signal_window', 9)),
+        'take_profit_stop_loss': int(params.get('take_profit_stop_loss', 0) == 1)
+    }
+    # The take-profit/stop-loss levels only matter when the flag is on
+    if canonical['take_profit_stop_loss']:
+        canonical['take_profit_pct'] = params.get('take_profit_pct', 0.005)
+        canonical['stop_loss_pct'] = params.get('stop_loss_pct', 0.005)
+    return canonical
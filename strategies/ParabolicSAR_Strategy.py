@@ -2,58 +2,159 @@ import pandas as pd
 import numpy as np
 from hyperopt import hp
 
+from strategies.signal_utils import njit, assign_actions, action_codes, LiveStateCache, IncrementalStrategy
+
+@njit(cache=True)
+def _sar_step(prev_sar, prev_ep, prev_af, prev_trend, prev_high, prev_low, high, low, af_start, af_step, af_max):
+    """
+    Advance the Parabolic SAR recursion by one bar.
+
+    Returns:
+    - tuple: (sar, ep, af, trend) for the new bar.
+    """
+    sar = prev_sar + prev_af * (prev_ep - prev_sar)
+    # Clamp against the previous and current bar, keeping min()/max() tie and NaN behaviour.
+    # The clamp includes the current bar, so the reversal checks below never fire (see
+    # calculate_parabolic_sar)
+    if prev_trend == 1:  # Uptrend
+        if prev_low < sar:
+            sar = prev_low
+        if low < sar:
+            sar = low
+    else:  # Downtrend
+        if prev_high > sar:
+            sar = prev_high
+        if high > sar:
+            sar = high
+
+    if prev_trend == 1 and low < sar:
+        return prev_ep, low, af_start, -1
+    elif prev_trend == -1 and high > sar:
+        return prev_ep, high, af_start, 1
+
+    ep = prev_ep
+    if prev_trend == 1:
+        if high > ep:
+            ep = high
+    elif low < ep:
+        ep = low
+    af = prev_af
+    if ep != prev_ep:
+        af = prev_af + af_step
+        if af_max < af:
+            af = af_max
+    return sar, ep, af, prev_trend
+
+@njit(cache=True, nogil=True)
+def parabolic_sar_kernel(high, low, af_start, af_step, af_max):
+    """
+    Parabolic SAR over whole High/Low arrays in one O(n) pass.
+
+    Parameters:
+    - high, low (ndarray): High and Low prices.
+    - af_start, af_step, af_max (float): Acceleration factor start, step and cap.
+
+    Returns:
+    - tuple: (sar, ep, af, trend) arrays, one value per bar.
+    """
+    n = len(high)
+    sar = np.empty(n)
+    ep = np.empty(n)
+    af = np.empty(n)
+    trend = np.empty(n, dtype=np.int64)
+    if n == 0:
+        return sar, ep, af, trend
+
+    sar[0] = low[0]
+    ep[0] = high[0]
+    af[0] = af_start
+    trend[0] = 1
+    for i in range(1, n):
+        step_sar, step_ep, step_af, step_trend = _sar_step(
+            sar[i - 1], ep[i - 1], af[i - 1], trend[i - 1], high[i - 1], low[i - 1], high[i], low[i],
+            af_start, af_step, af_max
+        )
+        sar[i] = step_sar
+        ep[i] = step_ep
+        af[i] = step_af
+        trend[i] = step_trend
+    return sar, ep, af, trend
+
 def calculate_parabolic_sar(data, af_start=0.02, af_step=0.02, af_max=0.2):
     """
     Calculate Parabolic SAR for the given data.
     - af_start: Initial acceleration factor
     - af_step: Step to increase acceleration factor
     - af_max: Maximum acceleration factor
+
+    The SAR is clamped to the current bar's Low (High in a downtrend) before the reversal
+    check, so it can never cross the price: the trend stays 1 from the first bar and the
+    strategy never trades. The original row loop behaved this way and it is preserved on
+    purpose, so optimizer results and stored trials stay comparable;
+    testing_and_confirmation/test_strategy_parity.py checks the SAR line against that loop.
     """
-    data_copy = data.copy()
-    data_copy['SAR'] = np.nan
-    data_copy['EP'] = np.nan  # Extreme point
-    data_copy['AF'] = af_start  # Acceleration factor
-    data_copy['Trend'] = 1  # 1 for uptrend, -1 for downtrend
-    
-    # Initialize values
-    data_copy.at[0, 'SAR'] = data_copy['Low'].iloc[0]
-    data_copy.at[0, 'EP'] = data_copy['High'].iloc[0]
-    
-    for i in range(1, len(data_copy)):
-        prev_sar = data_copy['SAR'].iloc[i - 1]
-        prev_ep = data_copy['EP'].iloc[i - 1]
-        prev_af = data_copy['AF'].iloc[i - 1]
-        prev_trend = data_copy['Trend'].iloc[i - 1]
-        
-        if prev_trend == 1:  # Uptrend
-            sar = prev_sar + prev_af * (prev_ep - prev_sar)
-            sar = min(sar, data_copy['Low'].iloc[i - 1], data_copy['Low'].iloc[i])
-        else:  # Downtrend
-            sar = prev_sar + prev_af * (prev_ep - prev_sar)
-            sar = max(sar, data_copy['High'].iloc[i - 1], data_copy['High'].iloc[i])
-        
-        if prev_trend == 1 and data_copy['Low'].iloc[i] < sar:
-            data_copy.at[i, 'Trend'] = -1
-            data_copy.at[i, 'SAR'] = prev_ep
-            data_copy.at[i, 'EP'] = data_copy['Low'].iloc[i]
-            data_copy.at[i, 'AF'] = af_start
-        elif prev_trend == -1 and data_copy['High'].iloc[i] > sar:
-            data_copy.at[i, 'Trend'] = 1
-            data_copy.at[i, 'SAR'] = prev_ep
-            data_copy.at[i, 'EP'] = data_copy['High'].iloc[i]
-            data_copy.at[i, 'AF'] = af_start
+    sar, _, _, trend = parabolic_sar_kernel(
+        data['High'].to_numpy(dtype=float), data['Low'].to_numpy(dtype=float),
+        float(af_start), float(af_step), float(af_max)
+    )
+    return pd.DataFrame({'SAR': sar, 'Trend': trend}, index=data.index)
+
+class ParabolicSARStream:
+    """
+    Parabolic SAR that advances one bar at a time.
+
+    Produces the same SAR and Trend values as calculate_parabolic_sar over the bars fed so
+    far, keeping only the last bar's state.
+    """
+
+    def __init__(self, af_start=0.02, af_step=0.02, af_max=0.2):
+        self.af_start = float(af_start)
+        self.af_step = float(af_step)
+        self.af_max = float(af_max)
+        self.bars = 0
+        self.sar = self.ep = self.af = self.trend = None
+        self.prev_sar = self.prev_trend = None
+        self.high = self.low = None
+
+    def update(self, high, low):
+        """
+        Add one bar and return its (sar, trend).
+        """
+        high, low = float(high), float(low)
+        self.prev_sar, self.prev_trend = self.sar, self.trend
+        if self.bars == 0:
+            self.sar, self.ep, self.af, self.trend = low, high, self.af_start, 1
         else:
-            data_copy.at[i, 'Trend'] = prev_trend
-            data_copy.at[i, 'SAR'] = sar
-            if prev_trend == 1:
-                ep = max(prev_ep, data_copy['High'].iloc[i])
-            else:
-                ep = min(prev_ep, data_copy['Low'].iloc[i])
-            data_copy.at[i, 'EP'] = ep
-            af = min(prev_af + af_step, af_max) if ep != prev_ep else prev_af
-            data_copy.at[i, 'AF'] = af
-    
-    return data_copy[['SAR', 'Trend']]
+            self.sar, self.ep, self.af, self.trend = _sar_step(
+                self.sar, self.ep, self.af, self.trend, self.high, self.low, high, low,
+                self.af_start, self.af_step, self.af_max
+            )
+        self.high, self.low = high, low
+        self.bars += 1
+        return self.sar, self.trend
+
+    def update_many(self, high, low):
+        """
+        Add several bars at once and return their (sar, trend) arrays.
+        """
+        high = np.asarray(high, dtype=float)
+        low = np.asarray(low, dtype=float)
+        if self.bars == 0 and len(high) > 1:
+            # Warm up a fresh stream with the compiled kernel and keep its last two bars
+            sar, ep, af, trend = parabolic_sar_kernel(high, low, self.af_start, self.af_step, self.af_max)
+            self.prev_sar, self.prev_trend = float(sar[-2]), int(trend[-2])
+            self.sar, self.ep, self.af, self.trend = float(sar[-1]), float(ep[-1]), float(af[-1]), int(trend[-1])
+            self.high, self.low = float(high[-1]), float(low[-1])
+            self.bars = len(high)
+            return sar, trend
+        steps = [self.update(bar_high, bar_low) for bar_high, bar_low in zip(high.tolist(), low.tolist())]
+        return np.array([step[0] for step in steps], dtype=float), np.array([step[1] for step in steps], dtype=np.int64)
+
+    def feed(self, rows):
+        """
+        Add the bars of a DataFrame slice with 'High' and 'Low' columns.
+        """
+        self.update_many(rows['High'].to_numpy(dtype=float), rows['Low'].to_numpy(dtype=float))
 
 def check_sar_action(current_sar, current_trend, prev_sar, prev_trend):
     if current_trend == 1 and prev_trend == -1:
@@ -73,16 +174,17 @@ def strategy(data, params={'af_start': 0.02, 'af_step': 0.02, 'af_max': 0.2}):
     data_copy['Trend'] = sar_trend['Trend']
     data_copy['action'] = "none"
     
-    for i in range(1, len(data_copy)):
-        data_copy.at[i, 'action'] = check_sar_action(
-            current_sar=data_copy['SAR'].iloc[i],
-            current_trend=data_copy['Trend'].iloc[i],
-            prev_sar=data_copy['SAR'].iloc[i - 1],
-            prev_trend=data_copy['Trend'].iloc[i - 1]
-        )
+    # Iteration i compares the trend on bar i with bar i - 1
+    trend = sar_trend['Trend'].to_numpy()
+    previous_trend = np.roll(trend, 1)
+    codes = action_codes((trend == 1) & (previous_trend == -1), (trend == -1) & (previous_trend == 1))
+    assign_actions(data_copy, codes, start=1)
     
     return data_copy
 
+# One SAR stream per parameter set, advanced with only the bars added since the last call
+_live_streams = LiveStateCache(ParabolicSARStream, columns=('Date', 'High', 'Low'))
+
 def should_buy_live(data, params={'af_start': 0.02, 'af_step': 0.02, 'af_max': 0.2}):
     if len(data) < 2:
         return ['none', 0]
@@ -91,17 +193,39 @@ def should_buy_live(data, params={'af_start': 0.02, 'af_step': 0.02, 'af_max': 0
     af_step = params.get('af_step', 0.02)
     af_max = params.get('af_max', 0.2)
     
-    sar_trend = calculate_parabolic_sar(data, af_start, af_step, af_max)
-    data['SAR'] = sar_trend['SAR']
-    data['Trend'] = sar_trend['Trend']
-    current_sar = data['SAR'].iloc[-1]
-    prev_sar = data['SAR'].iloc[-2]
-    current_trend = data['Trend'].iloc[-1]
-    prev_trend = data['Trend'].iloc[-2]
+    stream = _live_streams.advance((af_start, af_step, af_max), data)
+    current_sar = stream.sar
     
-    decision = [check_sar_action(current_sar, current_trend, prev_sar, prev_trend), current_sar]
+    decision = [check_sar_action(current_sar, stream.trend, stream.prev_sar, stream.prev_trend), current_sar]
     return decision
 
+class LiveStrategy(IncrementalStrategy):
+    """
+    Incremental should_buy_live driving a ParabolicSARStream.
+    """
+
+    def __init__(self, params={'af_start': 0.02, 'af_step': 0.02, 'af_max': 0.2}):
+        super().__init__(params)
+        self.stream = ParabolicSARStream(params.get('af_start', 0.02), params.get('af_step', 0.02), params.get('af_max', 0.2))
+
+    def on_bar(self, bar):
+        current_sar, current_trend = self.stream.update(bar['High'], bar['Low'])
+        self.bars += 1
+
+        if self.bars < 2:
+            return ['none', 0]
+        return [check_sar_action(current_sar, current_trend, self.stream.prev_sar, self.stream.prev_trend), current_sar]
+
+    def warmup(self, history):
+        if self.bars > 0 or len(history) < 2:
+            return super().warmup(history)
+        # A fresh stream runs the whole history through the compiled kernel
+        sar, trend = self.stream.update_many(history['High'], history['Low'])
+        sar, trend = sar.tolist(), trend.tolist()
+        self.bars = len(sar)
+        actions = ['none'] + [check_sar_action(sar[i], trend[i], sar[i - 1], trend[i - 1]) for i in range(1, len(sar))]
+        return actions, [0] + sar[1:]
+
 # Define the param_space for Hyperopt optimization
 param_space = {
     'af_start': hp.uniform('af_start', 0.01, 0.03),
@@ -115,3 +239,10 @@ ga_bounds = {
     'af_step': (0.01, 0.05),
     'af_max': (0.1, 0.3)
 }
+
+
+def canonical_params(params):
+    """
+    The parameters as strategy() uses them, so samples that run the same backtest are equal.
+    """
+    return {'af_start': params.get('af_start', 0.02), 'af_step': params.get('af_step', 0.02), 'af_max': params.get('af_max', 0.2)}
@@ -1,14 +1,22 @@
+from collections import deque
+import numpy as np
 import pandas as pd
 from hyperopt import hp
+from strategies.signal_utils import lagged, action_codes, assign_actions, IncrementalStrategy
+from strategies.streaming_indicators import StreamingRSI
+from strategies import indicator_cache
 
 
-def calculate_rsi(data, window):
-    delta = data['Close'].diff()
-    gain = delta.where(delta > 0, 0).rolling(window=window).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-    rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
+def calculate_rsi(data, window, cache=True):
+    def compute_rsi():
+        delta = data['Close'].diff()
+        gain = delta.where(delta > 0, 0).rolling(window=window).mean()
+        loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
+        rs = gain / loss
+        return 100 - (100 / (1 + rs))
+
+    # Shared across trials: only the first call per (Close column, window) does the work
+    return indicator_cache.cached_indicator('rsi', [data['Close']], (window,), compute_rsi, cache)
 
 def check_rsi_action(current_rsi, previous_rsi, rsi_buy_threshold, rsi_sell_threshold):
     if current_rsi < rsi_buy_threshold and previous_rsi >= rsi_buy_threshold:
@@ -27,13 +35,13 @@ def strategy(data, params={'rsi_buy_threshold': 25, 'rsi_sell_threshold': 75, 'w
     data_copy['RSI'] = calculate_rsi(data_copy, int(params['window']))
     data_copy['action'] = "none"
     
-    for i in range(1, len(data_copy)):
-        data_copy.at[i, 'action'] = check_rsi_action(
-            current_rsi=data_copy['RSI'].iloc[i-1],
-            previous_rsi=data_copy['RSI'].iloc[i - 2],
-            rsi_buy_threshold=rsi_buy_threshold,
-            rsi_sell_threshold=rsi_sell_threshold
-        )
+    # Compare the previous bar's RSI with the one before it (one-bar signal lag)
+    current_rsi, previous_rsi = lagged(data_copy['RSI'])
+    codes = action_codes(
+        buy=(current_rsi < rsi_buy_threshold) & (previous_rsi >= rsi_buy_threshold),
+        sell=(current_rsi > rsi_sell_threshold) & (previous_rsi <= rsi_sell_threshold)
+    )
+    assign_actions(data_copy, codes, start=1)
     
     return data_copy
 
@@ -44,7 +52,7 @@ def should_buy_live(data, params={'rsi_buy_threshold': 25, 'rsi_sell_threshold':
     window = params.get('window')
     
     recent_data = data  # Only take the last `window` periods
-    recent_rsi = calculate_rsi(recent_data, window)
+    recent_rsi = calculate_rsi(recent_data, window, cache=False)
         
     current_rsi = recent_rsi.iloc[-1]
     previous_rsi = recent_rsi.iloc[-2]
@@ -53,6 +61,35 @@ def should_buy_live(data, params={'rsi_buy_threshold': 25, 'rsi_sell_threshold':
     
     return decision
 
+class LiveStrategy(IncrementalStrategy):
+    """
+    Incremental should_buy_live: the RSI advances one bar at a time instead of being
+    recomputed over the whole history.
+    """
+
+    def __init__(self, params={'rsi_buy_threshold': 25, 'rsi_sell_threshold': 75, 'window': 14}):
+        super().__init__(params)
+        self.rsi_stream = StreamingRSI(params.get('window'))
+        self.rsi = deque([np.nan, np.nan], maxlen=2)
+
+    def on_bar(self, bar):
+        self.rsi.append(self.rsi_stream.update(bar['Close']))
+        self.bars += 1
+
+        if self.bars < 2:
+            raise ValueError("Insufficient data to calculate RSI")
+        previous_rsi, current_rsi = self.rsi
+        return [check_rsi_action(current_rsi, previous_rsi, self.params.get('rsi_buy_threshold'), self.params.get('rsi_sell_threshold')), current_rsi]
+
+    def on_bars(self, history):
+        rsi = self.rsi_stream.update_many(history['Close'].to_numpy(dtype=float))
+        previous_rsi = np.concatenate(([self.rsi[-1]], rsi[:-1]))
+        self.rsi.extend(rsi[-2:])
+        self.bars += len(rsi)
+        buy_threshold, sell_threshold = self.params.get('rsi_buy_threshold'), self.params.get('rsi_sell_threshold')
+        actions = [check_rsi_action(current, previous, buy_threshold, sell_threshold) for current, previous in zip(rsi.tolist(), previous_rsi.tolist())]
+        return actions, list(rsi)
+
 # Define the param_space for Hyperopt optimization
 param_space = {
     'rsi_buy_threshold': hp.uniform('rsi_buy_threshold', 10, 40),  # Search between 10 and 40
@@ -67,6 +104,17 @@ ga_bounds = {
     'window': (5, 30)
 }
 
+
+def canonical_params(params):
+    """
+    The parameters as strategy() uses them, so samples that run the same backtest are equal.
+    """
+    return {
+        'rsi_buy_threshold': params.get('rsi_buy_threshold'),
+        'rsi_sell_threshold': params.get('rsi_sell_threshold'),
+        'window': int(params['window'])
+    }
+
 # Example usage:
 # df = fetch_historical_data('AAPL', '1d', '2018-01-01', '2024-01-01')
 # params = {'rsi_buy_threshold': 25, 'rsi_sell_threshold': 75, 'window': 14}
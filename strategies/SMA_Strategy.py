@@ -1,9 +1,13 @@
+from collections import deque
 import pandas as pd
 from hyperopt import hp
+from strategies.signal_utils import lagged, action_codes, assign_actions, IncrementalStrategy
+from strategies.streaming_indicators import rolling_mean_series, trailing_rolling_mean
+from strategies import indicator_cache
 
-def calculate_sma(data, short_window, long_window):
-    short_sma = data['Close'].rolling(window=short_window).mean()
-    long_sma = data['Close'].rolling(window=long_window).mean()
+def calculate_sma(data, short_window, long_window, cache=True):
+    short_sma = indicator_cache.rolling_mean(data['Close'], short_window, cache)
+    long_sma = indicator_cache.rolling_mean(data['Close'], long_window, cache)
     return short_sma, long_sma
 
 def check_sma_action(current_short_sma, current_long_sma, previous_short_sma, previous_long_sma):
@@ -21,13 +25,13 @@ def strategy(data, params={'short_window': 10, 'long_window': 50}):
     data_copy['Short SMA'], data_copy['Long SMA'] = calculate_sma(data_copy, int(short_window), int(long_window))
     data_copy['action'] = "none"
     
-    for i in range(1, len(data_copy)):
-        data_copy.at[i, 'action'] = check_sma_action(
-            current_short_sma=data_copy['Short SMA'].iloc[i-1],
-            current_long_sma=data_copy['Long SMA'].iloc[i-1],
-            previous_short_sma=data_copy['Short SMA'].iloc[i-2],
-            previous_long_sma=data_copy['Long SMA'].iloc[i-2]
-        )
+    current_short_sma, previous_short_sma = lagged(data_copy['Short SMA'])
+    current_long_sma, previous_long_sma = lagged(data_copy['Long SMA'])
+    codes = action_codes(
+        buy=(current_short_sma > current_long_sma) & (previous_short_sma <= previous_long_sma),
+        sell=(current_short_sma < current_long_sma) & (previous_short_sma >= previous_long_sma)
+    )
+    assign_actions(data_copy, codes, start=1)
     
     return data_copy
 
@@ -39,7 +43,7 @@ def should_buy_live(data, params={'short_window': 10, 'long_window': 50}):
     long_window = params.get('long_window')
     
     recent_data = data[-long_window:]  # Take the last `long_window` periods
-    short_sma, long_sma = calculate_sma(recent_data, short_window, long_window)
+    short_sma, long_sma = calculate_sma(recent_data, short_window, long_window, cache=False)
     
     if len(short_sma) < 2:
         return ['none', 0]
@@ -52,6 +56,52 @@ def should_buy_live(data, params={'short_window': 10, 'long_window': 50}):
     decision = [check_sma_action(current_short_sma, current_long_sma, previous_short_sma, previous_long_sma), current_short_sma]
     return decision
 
+class LiveStrategy(IncrementalStrategy):
+    """
+    Incremental should_buy_live. The live check recomputes both averages over the last
+    `long_window` bars, so only those are kept and the work per bar does not grow with
+    the history.
+
+    Over `long_window` bars the previous long SMA is always NaN, so should_buy_live never
+    signals a crossover; that is kept here.
+    """
+
+    def __init__(self, params={'short_window': 10, 'long_window': 50}):
+        super().__init__(params)
+        self.closes = deque(maxlen=int(params.get('long_window')))
+
+    def on_bar(self, bar):
+        self.closes.append(bar['Close'])
+        self.bars += 1
+
+        if self.bars < self.params.get('long_window'):
+            return ['none', 0]
+        short_sma = rolling_mean_series(self.closes, self.params.get('short_window'))
+        long_sma = rolling_mean_series(self.closes, self.params.get('long_window'))
+        if len(short_sma) < 2:
+            return ['none', 0]
+        return [check_sma_action(short_sma[-1], long_sma[-1], short_sma[-2], long_sma[-2]), short_sma[-1]]
+
+    def on_bars(self, history):
+        closes = history['Close'].tolist()
+        skip = self.leading_rows(len(closes), self.params.get('long_window'))
+        tail = list(self.closes) + closes
+        start = len(self.closes)
+        self.closes.extend(closes)
+        self.bars += len(closes)
+        if skip == len(closes):
+            return ['none'] * skip, [0] * skip
+
+        # Both averages restart on the last `long_window` closes of every bar
+        length = self.closes.maxlen
+        short_sma, previous_short_sma = trailing_rolling_mean(tail, length, self.params.get('short_window'))
+        long_sma, previous_long_sma = trailing_rolling_mean(tail, length, self.params.get('long_window'))
+        if length < 2:
+            return ['none'] * len(closes), [0] * len(closes)
+        rows = range(start + skip, len(tail))
+        actions = [check_sma_action(short_sma[t], long_sma[t], previous_short_sma[t], previous_long_sma[t]) for t in rows]
+        return ['none'] * skip + actions, [0] * skip + short_sma[start + skip:].tolist()
+
 # Define the param_space for Hyperopt optimization
 param_space = {
     'short_window': hp.quniform('short_window', 5, 20, 1),
@@ -64,6 +114,13 @@ ga_bounds = {
     'long_window': (30, 100)
 }
 
+
+def canonical_params(params):
+    """
+    The parameters as strategy() uses them, so samples that run the same backtest are equal.
+    """
+    return {'short_window': int(params.get('short_window')), 'long_window': int(params.get('long_window'))}
+
 # Example usage:
 # df = fetch_historical_data('AAPL', '1d', '2018-01-01', '2024-01-01')
 # params = {'short_window': 10, 'long_window': 50}
@@ -1,9 +1,13 @@
+from collections import deque
 import pandas as pd
 from hyperopt import hp
+from strategies.signal_utils import lagged, action_codes, assign_actions, IncrementalStrategy
+from strategies.streaming_indicators import rolling_mean_series, trailing_rolling_mean
+from strategies import indicator_cache
 
-def calculate_small_ma(data, short_window, long_window):
-    short_ma = data['Close'].rolling(window=int(short_window)).mean()
-    long_ma = data['Close'].rolling(window=int(long_window)).mean()
+def calculate_small_ma(data, short_window, long_window, cache=True):
+    short_ma = indicator_cache.rolling_mean(data['Close'], int(short_window), cache)
+    long_ma = indicator_cache.rolling_mean(data['Close'], int(long_window), cache)
     return short_ma, long_ma
 
 def check_small_ma_action(current_short_ma, current_long_ma, prev_short_ma, prev_long_ma):
@@ -21,13 +25,13 @@ def strategy(data, params={'short_window': 5, 'long_window': 10}):
     data_copy['Short MA'], data_copy['Long MA'] = calculate_small_ma(data_copy, short_window, long_window)
     data_copy['action'] = "none"
     
-    for i in range(1, len(data_copy)):
-        data_copy.at[i, 'action'] = check_small_ma_action(
-            current_short_ma=data_copy['Short MA'].iloc[i-1],
-            current_long_ma=data_copy['Long MA'].iloc[i-1],
-            prev_short_ma=data_copy['Short MA'].iloc[i-2],
-            prev_long_ma=data_copy['Long MA'].iloc[i-2]
-        )
+    current_short_ma, prev_short_ma = lagged(data_copy['Short MA'])
+    current_long_ma, prev_long_ma = lagged(data_copy['Long MA'])
+    codes = action_codes(
+        buy=(current_short_ma > current_long_ma) & (prev_short_ma <= prev_long_ma),
+        sell=(current_short_ma < current_long_ma) & (prev_short_ma >= prev_long_ma)
+    )
+    assign_actions(data_copy, codes, start=1)
     
     return data_copy
 
@@ -38,7 +42,7 @@ def should_buy_live(data, params={'short_window': 5, 'long_window': 10}):
     short_window = int(params.get('short_window'))
     long_window = int(params.get('long_window'))
     recent_data = data[-long_window:]
-    short_ma, long_ma = calculate_small_ma(recent_data, short_window, long_window)
+    short_ma, long_ma = calculate_small_ma(recent_data, short_window, long_window, cache=False)
     
     if len(short_ma) < 2:
         return ['none', 0]
@@ -51,6 +55,53 @@ def should_buy_live(data, params={'short_window': 5, 'long_window': 10}):
     decision = [check_small_ma_action(current_short_ma, current_long_ma, prev_short_ma, prev_long_ma), current_short_ma]
     return decision
 
+class LiveStrategy(IncrementalStrategy):
+    """
+    Incremental should_buy_live. The live check recomputes both averages over the last
+    `long_window` bars, so only those are kept and the work per bar does not grow with
+    the history.
+
+    Over `long_window` bars the previous long MA is always NaN, so should_buy_live never
+    signals a crossover; that is kept here.
+    """
+
+    def __init__(self, params={'short_window': 5, 'long_window': 10}):
+        super().__init__(params)
+        self.short_window = int(params.get('short_window'))
+        self.long_window = int(params.get('long_window'))
+        self.closes = deque(maxlen=self.long_window)
+
+    def on_bar(self, bar):
+        self.closes.append(bar['Close'])
+        self.bars += 1
+
+        if self.bars < self.params.get('long_window'):
+            return ['none', 0]
+        short_ma = rolling_mean_series(self.closes, self.short_window)
+        long_ma = rolling_mean_series(self.closes, self.long_window)
+        if len(short_ma) < 2:
+            return ['none', 0]
+        return [check_small_ma_action(short_ma[-1], long_ma[-1], short_ma[-2], long_ma[-2]), short_ma[-1]]
+
+    def on_bars(self, history):
+        closes = history['Close'].tolist()
+        skip = self.leading_rows(len(closes), self.params.get('long_window'))
+        tail = list(self.closes) + closes
+        start = len(self.closes)
+        self.closes.extend(closes)
+        self.bars += len(closes)
+        if skip == len(closes):
+            return ['none'] * skip, [0] * skip
+
+        # Both averages restart on the last `long_window` closes of every bar
+        short_ma, previous_short_ma = trailing_rolling_mean(tail, self.long_window, self.short_window)
+        long_ma, previous_long_ma = trailing_rolling_mean(tail, self.long_window, self.long_window)
+        if self.long_window < 2:
+            return ['none'] * len(closes), [0] * len(closes)
+        rows = range(start + skip, len(tail))
+        actions = [check_small_ma_action(short_ma[t], long_ma[t], previous_short_ma[t], previous_long_ma[t]) for t in rows]
+        return ['none'] * skip + actions, [0] * skip + short_ma[start + skip:].tolist()
+
 # Define the param_space for Hyperopt optimization
 param_space = {
     'short_window': hp.quniform('short_window', 3, 10, 1),
@@ -62,3 +113,10 @@ ga_bounds = {
     'short_window': (3, 10),
     'long_window': (8, 15)
 }
+
+
+def canonical_params(params):
+    """
+    The parameters as strategy() uses them, so samples that run the same backtest are equal.
+    """
+    return {'short_window': int(params.get('short_window')), 'long_window': int(params.get('long_window'))}
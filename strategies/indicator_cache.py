@@ -0,0 +1,206 @@
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Default memory budget of the shared cache (bytes of cached values and their keys)
+DEFAULT_MAX_BYTES = 256 * 1024 ** 2
+
+
+class IndicatorCache:
+    """
+    LRU cache of indicator columns shared by every strategy in the process.
+
+    Optimizer trials evaluate the same tickers with the same few window lengths over and over
+    (hyperopt's quniform returns whole numbers), so RSI(14) or a 20-bar rolling max only need
+    to be computed once per ticker. Entries are keyed by (indicator name, fingerprints of the
+    input columns, parameters). The least recently used entries are evicted once the entries
+    exceed max_bytes, counting each entry's key as well as its values (see entry_bytes). The cache can be shared by threads, e.g. the per-ticker threads of
+    the optimizer; an indicator is computed outside the lock.
+
+    Parameters:
+    - max_bytes (int): Memory budget for the entries. 0 disables caching.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.RLock()
+
+    def get(self, key, compute):
+        """
+        Return the cached (values, name) for `key`, calling compute() on a miss.
+
+        compute must return a Series. The cached values are read-only; callers copy them
+        before handing them out.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        result = compute()
+        return self.put(key, result.to_numpy(), result.name)
+
+    def put(self, key, values, name=None):
+        """
+        Store precomputed values under `key` and return the (values, name) entry.
+        """
+        values = np.array(values, copy=True)
+        values.flags.writeable = False
+        entry = (values, name)
+        size = entry_bytes(key, values)
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= entry_bytes(key, previous[0])
+            if size <= self.max_bytes:
+                self.entries[key] = entry
+                self.bytes += size
+                self._evict()
+        return entry
+
+    def _evict(self):
+        while self.bytes > self.max_bytes and self.entries:
+            key, (values, _) = self.entries.popitem(last=False)
+            self.bytes -= entry_bytes(key, values)
+            self.evictions += 1
+
+    def set_max_bytes(self, max_bytes):
+        """
+        Change the memory budget, evicting entries that no longer fit.
+        """
+        with self.lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def clear(self):
+        """
+        Drop every entry and reset the counters.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self):
+        """
+        Return hit/miss/eviction counters and memory use as a dict.
+        """
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries': len(self.entries),
+            'bytes': self.bytes,
+            'max_bytes': self.max_bytes
+        }
+
+
+def _object_bytes(value):
+    # Size of a key: nested tuples of strings and numbers
+    if isinstance(value, tuple):
+        return sys.getsizeof(value) + sum(_object_bytes(item) for item in value)
+    return sys.getsizeof(value)
+
+
+def entry_bytes(key, values):
+    """
+    Bytes an entry counts against the budget: the values array with its header, and the key
+    with its fingerprints and parameters. Keys are a few hundred bytes, which matters once
+    many short rows are cached, e.g. when prime_windows primes every ticker.
+    """
+    return sys.getsizeof(values) + _object_bytes(key)
+
+
+# The cache used by the strategies under strategies/
+indicator_cache = IndicatorCache()
+
+
+def fingerprint(series):
+    """
+    Hash the values of a column. Equal values give equal fingerprints whatever the index.
+    """
+    values = series.to_numpy()
+    if values.dtype == object:
+        values = pd.util.hash_pandas_object(series, index=False).to_numpy()
+    digest = hashlib.blake2b(np.ascontiguousarray(values).view(np.uint8), digest_size=16)
+    return (str(values.dtype), len(values), digest.hexdigest())
+
+
+def normalize_params(params):
+    """
+    Parameters as part of a cache key. NumPy scalars become Python numbers, and floats are
+    tagged so they never equal ints: 20.0 == 20 as a dict key, but pandas rejects a float
+    rolling window, so a float window must not be served from the entry of window 20.
+    """
+    normalized = []
+    for param in params:
+        if isinstance(param, np.generic):
+            param = param.item()
+        normalized.append(('float', param) if isinstance(param, float) else param)
+    return tuple(normalized)
+
+
+def indicator_key(name, inputs, params):
+    """
+    Cache key for an indicator computed from the `inputs` columns with `params`.
+    """
+    return (name, tuple(fingerprint(series) for series in inputs), normalize_params(params))
+
+
+def cached_indicator(name, inputs, params, compute, cache=True):
+    """
+    Return compute() from the shared cache as a Series on the index of inputs[0].
+
+    Parameters:
+    - name (str): Indicator name, e.g. 'rsi'.
+    - inputs (list): The Series the indicator is computed from.
+    - params (tuple): Parameters that change the result, e.g. (window,).
+    - compute (callable): Computes the indicator as a Series on a miss.
+    - cache (bool): False computes without fingerprinting the inputs or touching the cache.
+      The should_buy_live functions pass it: each call sees a new prefix of the history, so
+      its entry would never be read again and would only evict the optimizer's.
+
+    Returns:
+    - Series: The indicator values, identical to compute().
+    """
+    if not cache:
+        result = compute()
+        return pd.Series(result.to_numpy(), index=inputs[0].index, name=result.name)
+    values, series_name = indicator_cache.get(indicator_key(name, inputs, params), compute)
+    return pd.Series(values.copy(), index=inputs[0].index, name=series_name)
+
+
+def rolling_mean(series, window, cache=True):
+    return cached_indicator('rolling_mean', [series], (window,), lambda: series.rolling(window=window).mean(), cache)
+
+
+def rolling_std(series, window, cache=True):
+    return cached_indicator('rolling_std', [series], (window,), lambda: series.rolling(window=window).std(), cache)
+
+
+def rolling_max(series, window, cache=True):
+    return cached_indicator('rolling_max', [series], (window,), lambda: series.rolling(window=window).max(), cache)
+
+
+def rolling_min(series, window, cache=True):
+    return cached_indicator('rolling_min', [series], (window,), lambda: series.rolling(window=window).min(), cache)
+
+
+def ewm_mean(series, span, cache=True):
+    return cached_indicator('ewm_mean', [series], (span,), lambda: series.ewm(span=span, adjust=False).mean(), cache)
@@ -0,0 +1,218 @@
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from strategies.signal_utils import njit
+from strategies import indicator_cache
+from strategies.streaming_indicators import _rolling_variance_kernel
+
+
+def _as_windows(windows):
+    windows = np.asarray(windows, dtype=np.int64).ravel()
+    if len(windows) == 0 or windows.min() < 1:
+        raise ValueError("Windows must be positive integers.")
+    return windows
+
+
+def _complete_windows(values, windows):
+    """
+    Return a (window × time) mask that is True where the window of windows[k] bars ending at
+    t lies inside the data and contains no NaN.
+    """
+    t = np.arange(len(values))
+    missing = np.concatenate(([0], np.cumsum(np.isnan(values))))
+    start = t[None, :] + 1 - windows[:, None]
+    complete = (start >= 0) & (missing[t + 1][None, :] == missing[np.maximum(start, 0)])
+    return complete
+
+
+def _window_sums(values, windows):
+    """
+    Sums of values over every window, as differences of one cumulative sum, with NaNs
+    counted as zero.
+    """
+    sums = np.concatenate(([0.0], np.cumsum(np.nan_to_num(values))))
+    t = np.arange(len(values))
+    start = np.maximum(t[None, :] + 1 - windows[:, None], 0)
+    return sums[t + 1][None, :] - sums[start]
+
+
+def _reference_level(values):
+    # Sums are taken of deviations from this level to keep the cumulative sums small
+    return np.nanmean(values) if np.isfinite(values).any() else 0.0
+
+
+def rolling_mean_tensor(values, windows):
+    """
+    Rolling means for every window in one pass over cumulative sums.
+
+    Parameters:
+    - values (ndarray): Input column, e.g. Close.
+    - windows (array-like): Window lengths.
+
+    Returns:
+    - ndarray: (len(windows), len(values)) means, NaN where the window is incomplete or
+      contains NaN. Agrees with Series.rolling(w).mean() to floating-point rounding.
+    """
+    values = np.asarray(values, dtype=float)
+    windows = _as_windows(windows)
+    complete = _complete_windows(values, windows)
+    reference = _reference_level(values)
+    means = _window_sums(values - reference, windows) / windows[:, None] + reference
+    return np.where(complete, means, np.nan)
+
+
+def rolling_std_tensor(values, windows, ddof=1):
+    """
+    Rolling sample standard deviations for every window, one compiled pass per window. Same
+    shape and NaN rules as rolling_mean_tensor, and NaN where a window has no more than ddof
+    bars.
+
+    Each pass runs pandas' Welford update with Kahan compensation (the kernel behind
+    streaming_indicators.RollingStd), so rows are identical to Series.rolling(w).std(),
+    including exact zeros on flat stretches, however long or trending the series.
+    """
+    values = np.asarray(values, dtype=float)
+    windows = _as_windows(windows)
+    stds = np.empty((len(windows), len(values)))
+    for k, window in enumerate(windows.tolist()):
+        variances = _rolling_variance_kernel(values, 0, window, ddof, 0, 0.0, 0.0, 0.0, 0.0, 0.0, 0, np.nan)[0]
+        stds[k] = np.sqrt(np.where(variances > 0, variances, 0.0))
+        stds[k, np.isnan(variances)] = np.nan
+    return stds
+
+
+def _rolling_extreme_tensor(values, windows, accumulate):
+    values = np.asarray(values, dtype=float)
+    windows = _as_windows(windows)
+    longest = int(windows.max())
+
+    # Row t of the view holds the `longest` bars ending at t (NaN before the first bar).
+    # Accumulating from the newest bar backwards gives every window length at once.
+    padded = np.concatenate((np.full(longest - 1, np.nan), values))
+    view = sliding_window_view(padded, longest)[:, ::-1]
+    extremes = accumulate(view, axis=1)
+    return np.ascontiguousarray(extremes[:, windows - 1].T)
+
+
+def rolling_max_tensor(values, windows):
+    """
+    Rolling maxima for every window, identical to Series.rolling(w).max().
+
+    Returns:
+    - ndarray: (len(windows), len(values)) maxima.
+    """
+    return _rolling_extreme_tensor(values, windows, np.maximum.accumulate)
+
+
+def rolling_min_tensor(values, windows):
+    """
+    Rolling minima for every window, identical to Series.rolling(w).min().
+    """
+    return _rolling_extreme_tensor(values, windows, np.minimum.accumulate)
+
+
+@njit(cache=True)
+def _ewm_tensor(values, spans):
+    n_spans = len(spans)
+    n = len(values)
+    out = np.empty((n_spans, n))
+    for k in range(n_spans):
+        # Same recursion as pandas' ewm(span, adjust=False).mean(), NaN handling included
+        com = (spans[k] - 1) / 2.0
+        alpha = 1.0 / (1.0 + com)
+        old_wt_factor = 1.0 - alpha
+        if n == 0:
+            continue
+        weighted = values[0]
+        old_wt = 1.0
+        out[k, 0] = weighted
+        for i in range(1, n):
+            cur = values[i]
+            if weighted == weighted:
+                old_wt *= old_wt_factor
+                if cur == cur:
+                    if weighted != cur:
+                        weighted = (old_wt * weighted + alpha * cur) / (old_wt + alpha)
+                    old_wt = 1.0
+            elif cur == cur:
+                weighted = cur
+            out[k, i] = weighted
+    return out
+
+
+def ewm_tensor(values, spans):
+    """
+    Exponential moving averages for every span, identical to
+    Series.ewm(span=s, adjust=False).mean().
+
+    Returns:
+    - ndarray: (len(spans), len(values)) averages.
+    """
+    return _ewm_tensor(np.asarray(values, dtype=float), np.asarray(spans, dtype=float).ravel())
+
+
+def precompute_indicator_tensors(ohlc, windows):
+    """
+    Build every rolling mean, std, EMA, max and min over a window range for one ticker.
+
+    Parameters:
+    - ohlc (DataFrame): Price data with 'High', 'Low' and 'Close' columns.
+    - windows (array-like): Window lengths (EMA spans use the same values).
+
+    Returns:
+    - dict: 'windows' plus one (window × time) array per indicator: 'close_mean',
+      'close_std', 'close_ema', 'high_max' and 'low_min'. Row k belongs to windows[k].
+    """
+    windows = _as_windows(windows)
+    close = ohlc['Close'].to_numpy(dtype=float)
+    return {
+        'windows': windows,
+        'close_mean': rolling_mean_tensor(close, windows),
+        'close_std': rolling_std_tensor(close, windows),
+        'close_ema': ewm_tensor(close, windows),
+        'high_max': rolling_max_tensor(ohlc['High'].to_numpy(dtype=float), windows),
+        'low_min': rolling_min_tensor(ohlc['Low'].to_numpy(dtype=float), windows)
+    }
+
+
+def tensor_row(tensors, indicator, window):
+    """
+    Return the row of `indicator` for `window` from precompute_indicator_tensors output.
+    """
+    position = np.flatnonzero(tensors['windows'] == int(window))
+    if len(position) == 0:
+        raise KeyError(f"Window {window} was not precomputed.")
+    return tensors[indicator][position[0]]
+
+
+def prime_indicator_cache(ohlc, windows, cache=None):
+    """
+    Fill the indicator cache with every rolling max/min and EMA over `windows`, so strategies
+    evaluated on `ohlc` slice precomputed rows instead of computing them.
+
+    Only the exact tensors are stored. Rolling means from cumulative sums differ from
+    pandas in the last bits and stay computed on demand.
+
+    Parameters:
+    - ohlc (DataFrame): Price data with 'High', 'Low' and 'Close' columns.
+    - windows (array-like): Window lengths (EMA spans use the same values).
+    - cache (IndicatorCache): Cache to fill. Defaults to the shared strategy cache.
+
+    Returns:
+    - int: Number of entries stored.
+    """
+    cache = indicator_cache.indicator_cache if cache is None else cache
+    windows = _as_windows(windows)
+    high, low, close = ohlc['High'], ohlc['Low'], ohlc['Close']
+    tensors = [
+        ('rolling_max', high, rolling_max_tensor(high.to_numpy(dtype=float), windows)),
+        ('rolling_min', low, rolling_min_tensor(low.to_numpy(dtype=float), windows)),
+        ('ewm_mean', close, ewm_tensor(close.to_numpy(dtype=float), windows))
+    ]
+    stored = 0
+    for name, series, tensor in tensors:
+        for window, row in zip(windows.tolist(), tensor):
+            key = indicator_cache.indicator_key(name, [series], (window,))
+            cache.put(key, row, series.name)
+            stored += 1
+    return stored
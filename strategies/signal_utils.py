@@ -0,0 +1,229 @@
+import math
+
+import numpy as np
+
+# Optional: Numba for the compiled signal kernels
+try:
+    from numba import njit
+    NUMBA_INSTALLED = True
+except ImportError:
+    NUMBA_INSTALLED = False
+
+    def njit(*args, **kwargs):
+        # Without Numba the kernels run as plain Python loops over NumPy arrays
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda function: function
+
+
+# Integer action codes used by the kernels; ACTION_LABELS[code] gives the 'action' string
+NONE, BUY, SELL = 0, 1, 2
+ACTION_LABELS = np.array(['none', 'buy', 'sell'], dtype=object)
+
+
+def assign_actions(data_copy, codes, start=1):
+    """
+    Store per-iteration action codes in data_copy['action'].
+
+    codes[i] is the action the strategy's row loop produced on iteration i, which the loop
+    wrote with data_copy.at[i, 'action'], i.e. under row label i. Writing by label keeps
+    the same rows for both the 0-based indexes used by the simulators and the 1-based index
+    returned by fetch_historical_data. Labels the frame does not have are skipped.
+
+    Parameters:
+    - data_copy (DataFrame): Frame to receive the 'action' column.
+    - codes (ndarray): Action code per loop iteration (NONE, BUY or SELL), one per row.
+    - start (int): First loop iteration; earlier rows keep 'none'.
+    """
+    labels = np.arange(start, len(codes))
+    positions = data_copy.index.get_indexer(labels)
+    found = positions >= 0
+
+    action_column = np.full(len(data_copy), 'none', dtype=object)
+    action_column[positions[found]] = ACTION_LABELS[codes[start:][found]]
+    data_copy['action'] = action_column
+
+
+@njit(cache=True, nogil=True)
+def crossover_tpsl_actions(fast, slow, close, use_tpsl, take_profit_pct, stop_loss_pct):
+    """
+    Entry/exit state machine for crossover strategies with optional take-profit/stop-loss.
+
+    On iteration i the crossover is read one bar back (fast[i-1] vs slow[i-1], against
+    fast[i-2] vs slow[i-2]) and trades are priced at close[i]. When flat, an upward cross
+    buys. When long, either the take-profit/stop-loss levels around the entry close
+    (use_tpsl) or a downward cross sells.
+
+    Parameters:
+    - fast, slow (ndarray): The two lines whose crossovers drive the signals.
+    - close (ndarray): Close prices.
+    - use_tpsl (bool): Exit on take-profit/stop-loss instead of the downward cross.
+    - take_profit_pct, stop_loss_pct (float): Exit thresholds relative to the entry close.
+
+    Returns:
+    - ndarray[int8]: Action code per iteration.
+    """
+    n = len(close)
+    codes = np.zeros(n, dtype=np.int8)
+    in_position = False
+    buy_price = 0.0
+
+    # Iteration 1 has no previous crossover bar, so nothing can trigger before iteration 2
+    for i in range(2, n):
+        current_fast = fast[i - 1]
+        current_slow = slow[i - 1]
+        previous_fast = fast[i - 2]
+        previous_slow = slow[i - 2]
+        close_price = close[i]
+
+        if not in_position:
+            if current_fast > current_slow and previous_fast <= previous_slow:
+                codes[i] = BUY
+                in_position = True
+                buy_price = close_price
+        elif use_tpsl:
+            if close_price >= buy_price * (1 + take_profit_pct):
+                codes[i] = SELL
+                in_position = False
+            elif close_price <= buy_price * (1 - stop_loss_pct):
+                codes[i] = SELL
+                in_position = False
+        elif current_fast < current_slow and previous_fast >= previous_slow:
+            codes[i] = SELL
+            in_position = False
+
+    return codes
+
+
+def lagged(values):
+    """
+    Return the (current, previous) values each row-loop iteration compared.
+
+    The strategy loops read values.iloc[i-1] as the current bar and values.iloc[i-2] as the
+    previous one, so current[i] == values[i-1] and previous[i] == values[i-2]. On
+    iteration 1 .iloc[-1] wrapped around to the last row, and previous[1] does the same.
+    """
+    values = np.asarray(values, dtype=float)
+    return np.roll(values, 1), np.roll(values, 2)
+
+
+def action_codes(buy, sell):
+    """
+    Combine boolean buy/sell masks into action codes; buy wins when both are set.
+    """
+    return np.where(buy, BUY, np.where(sell, SELL, NONE)).astype(np.int8)
+
+
+class LiveStateCache:
+    """
+    Streaming indicator states reused across stateless should_buy_live(data, params) calls.
+
+    run_live_simulation passes a growing prefix of the same frame on every bar. When the
+    rows a state has already consumed are still the first rows of `data`, only the new rows
+    are fed to it, so each call costs O(new rows) instead of recomputing the whole history.
+    Any other data (a different ticker, a shorter or edited frame) restarts the state.
+
+    Parameters:
+    - create (callable): Builds a fresh state from the cache key (the strategy parameters).
+      The state must provide feed(rows) taking a DataFrame of new rows.
+    - columns (tuple): Columns compared to recognise rows already consumed.
+    - max_states (int): Number of parameter sets kept; the least recently used is dropped.
+    """
+
+    def __init__(self, create, columns=('Date', 'High', 'Low', 'Close'), max_states=32):
+        self.create = create
+        self.columns = list(columns)
+        self.max_states = max_states
+        self.states = {}
+
+    def _row_marker(self, data, position):
+        return tuple(data[column].iat[position] for column in self.columns)
+
+    def advance(self, key, data):
+        """
+        Return the state for `key` after it has consumed every row of `data`.
+        """
+        entry = self.states.pop(key, None)
+        rows = len(data)
+        if entry is not None:
+            consumed = entry['rows']
+            resumable = (
+                0 < consumed <= rows
+                and self._row_marker(data, 0) == entry['first']
+                and self._row_marker(data, consumed - 1) == entry['last']
+            )
+            if not resumable:
+                entry = None
+
+        if entry is None:
+            entry = {'state': self.create(*key), 'rows': 0, 'first': None, 'last': None}
+
+        if rows > entry['rows']:
+            entry['state'].feed(data.iloc[entry['rows']:])
+            entry['rows'] = rows
+            entry['first'] = self._row_marker(data, 0)
+            entry['last'] = self._row_marker(data, rows - 1)
+
+        self.states[key] = entry
+        while len(self.states) > self.max_states:
+            self.states.pop(next(iter(self.states)))
+        return entry['state']
+
+
+class IncrementalStrategy:
+    """
+    Per-bar counterpart of a strategy module's should_buy_live.
+
+    Each strategy module defines a LiveStrategy subclass. Fed the bars of a frame in order,
+    on_bar returns exactly what should_buy_live(data.iloc[:i + 1], params) returns for the
+    same bar, while keeping only the state it needs, so a replay costs O(1) per bar instead
+    of recomputing the whole prefix.
+
+    Parameters:
+    - params (dict): The strategy parameters, as passed to should_buy_live.
+    """
+
+    def __init__(self, params):
+        self.params = params
+        self.bars = 0
+
+    def warmup(self, history):
+        """
+        Feed every row of a DataFrame, e.g. the history before a live session.
+
+        Returns:
+        - tuple: (actions, values) lists, what on_bar would have returned for each row.
+        """
+        actions, values = [], []
+        if self.bars == 0 and len(history):
+            # The first bar has no previous values; on_bar treats it as should_buy_live does
+            action, value = self.on_bar(history.iloc[:1].to_dict('records')[0])[:2]
+            actions.append(action)
+            values.append(value)
+            history = history.iloc[1:]
+        batch_actions, batch_values = self.on_bars(history)
+        return actions + batch_actions, values + batch_values
+
+    def on_bars(self, history):
+        """
+        Feed the rows of a DataFrame after at least one bar and return (actions, values).
+
+        Strategies override this to compute every row in one batch with the compiled
+        update_many kernels of strategies/streaming_indicators.py, ending in the same state
+        and with the same decisions as calling on_bar row by row.
+        """
+        decisions = [self.on_bar(bar) for bar in history.to_dict('records')]
+        return [decision[0] for decision in decisions], [decision[1] for decision in decisions]
+
+    def leading_rows(self, rows, min_bars):
+        """
+        Number of the next `rows` bars that arrive before `min_bars` bars have been seen, which
+        on_bar answers with ['none', 0]. Call before adding the rows to self.bars.
+        """
+        return int(min(max(math.ceil(min_bars) - 1 - self.bars, 0), rows))
+
+    def on_bar(self, bar):
+        """
+        Feed the next bar (a dict of column values) and return [action, value].
+        """
+        raise NotImplementedError
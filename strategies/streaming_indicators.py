@@ -0,0 +1,693 @@
+import math
+from collections import deque
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+from strategies.signal_utils import njit
+
+
+def _check_window(window):
+    # Same validation as Series.rolling(window=...)
+    if not pd.api.types.is_integer(window) or window < 0:
+        raise ValueError("window must be an integer 0 or greater")
+    return int(window)
+
+
+# The batch kernels below run the same per-value updates as the classes, over whole arrays,
+# starting from and returning the class state. Window lengths below 2 restart the sums on
+# every value and stay on the per-value path.
+
+@njit(cache=True)
+def _rolling_mean_kernel(buffer, start, window, count, nobs, total, neg_ct, compensation_add,
+                         compensation_remove, consecutive_same, prev_value):
+    # buffer holds the values still in the window followed by the new values from `start`
+    out = np.empty(len(buffer) - start)
+    for p in range(start, len(buffer)):
+        value = buffer[p]
+        count += 1
+        if count == 1:
+            nobs, total, neg_ct = 0, 0.0, 0
+            compensation_add, compensation_remove, consecutive_same = 0.0, 0.0, 0
+            prev_value = value
+        elif p >= window:
+            old = buffer[p - window]
+            if old == old:
+                nobs -= 1
+                y = -old - compensation_remove
+                t = total + y
+                compensation_remove = t - total - y
+                total = t
+                if math.copysign(1.0, old) < 0:
+                    neg_ct -= 1
+        if value == value:
+            nobs += 1
+            y = value - compensation_add
+            t = total + y
+            compensation_add = t - total - y
+            total = t
+            if math.copysign(1.0, value) < 0:
+                neg_ct += 1
+            if value == prev_value:
+                consecutive_same += 1
+            else:
+                consecutive_same = 1
+            prev_value = value
+
+        result = np.nan
+        if nobs >= window and nobs > 0:
+            result = total / nobs
+            if consecutive_same >= nobs:
+                result = prev_value
+            elif neg_ct == 0 and result < 0:
+                result = 0.0
+            elif neg_ct == nobs and result > 0:
+                result = 0.0
+        out[p - start] = result
+    return out, count, nobs, total, neg_ct, compensation_add, compensation_remove, consecutive_same, prev_value
+
+
+@njit(cache=True)
+def _rolling_variance_kernel(buffer, start, window, ddof, count, nobs, mean, ssqdm, compensation_add,
+                             compensation_remove, consecutive_same, prev_value):
+    out = np.empty(len(buffer) - start)
+    for p in range(start, len(buffer)):
+        value = buffer[p]
+        count += 1
+        if count == 1:
+            nobs, mean, ssqdm = 0.0, 0.0, 0.0
+            compensation_add, compensation_remove, consecutive_same = 0.0, 0.0, 0
+            prev_value = value
+        elif p >= window:
+            old = buffer[p - window]
+            if old == old:
+                nobs -= 1
+                if nobs:
+                    prev_mean = mean - compensation_remove
+                    y = old - compensation_remove
+                    t = y - mean
+                    compensation_remove = t + mean - y
+                    mean = mean - t / nobs
+                    ssqdm = ssqdm - (old - prev_mean) * (old - mean)
+                else:
+                    mean = 0.0
+                    ssqdm = 0.0
+        if value == value:
+            nobs += 1
+            if value == prev_value:
+                consecutive_same += 1
+            else:
+                consecutive_same = 1
+            prev_value = value
+            prev_mean = mean - compensation_add
+            y = value - compensation_add
+            t = y - mean
+            compensation_add = t + mean - y
+            mean = mean + t / nobs if nobs else 0.0
+            ssqdm = ssqdm + (value - prev_mean) * (value - mean)
+
+        result = np.nan
+        if nobs >= max(window, 1) and nobs > ddof:
+            if nobs == 1 or consecutive_same >= nobs:
+                result = 0.0
+            else:
+                result = ssqdm / (nobs - ddof)
+        out[p - start] = result
+    return out, count, nobs, mean, ssqdm, compensation_add, compensation_remove, consecutive_same, prev_value
+
+
+@njit(cache=True)
+def _ewm_kernel(values, alpha, old_wt_factor, started, weighted, old_wt):
+    out = np.empty(len(values))
+    for i in range(len(values)):
+        value = values[i]
+        if not started:
+            weighted = value
+            started = True
+        elif weighted == weighted:
+            old_wt *= old_wt_factor
+            if value == value:
+                if weighted != value:
+                    weighted = (old_wt * weighted + alpha * value) / (old_wt + alpha)
+                old_wt = 1.0
+        elif value == value:
+            weighted = value
+        out[i] = weighted
+    return out, weighted, old_wt
+
+
+class RollingMean:
+    """
+    Series.rolling(window).mean() computed one value at a time.
+
+    Follows pandas' own online algorithm (Kahan-compensated add/remove, the repeated-value
+    and sign corrections), so every output is bit-identical to the batch result, not just
+    close to it. Memory is O(window).
+    """
+
+    def __init__(self, window):
+        self.window = _check_window(window)
+        self.values = deque()
+        self.count = 0
+        self._reset()
+
+    def _reset(self):
+        self.nobs = 0
+        self.sum = 0.0
+        self.neg_ct = 0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.consecutive_same = 0
+        self.prev_value = self.values[0] if self.values else None
+
+    def _add(self, value):
+        if value == value:
+            self.nobs += 1
+            y = value - self.compensation_add
+            t = self.sum + y
+            self.compensation_add = t - self.sum - y
+            self.sum = t
+            if math.copysign(1.0, value) < 0:
+                self.neg_ct += 1
+            # Runs of the same value return that value exactly
+            if value == self.prev_value:
+                self.consecutive_same += 1
+            else:
+                self.consecutive_same = 1
+            self.prev_value = value
+
+    def _remove(self, value):
+        if value == value:
+            self.nobs -= 1
+            y = -value - self.compensation_remove
+            t = self.sum + y
+            self.compensation_remove = t - self.sum - y
+            self.sum = t
+            if math.copysign(1.0, value) < 0:
+                self.neg_ct -= 1
+
+    def update(self, value):
+        """
+        Add the next value and return the rolling mean ending at it (NaN until the window is full).
+        """
+        value = float(value)
+        self.values.append(value)
+        self.count += 1
+        if self.count == 1 or self.window <= 1:
+            # pandas restarts the sums when consecutive windows do not overlap
+            while len(self.values) > self.window:
+                self.values.popleft()
+            self._reset()
+            for window_value in self.values:
+                self._add(window_value)
+        else:
+            if len(self.values) > self.window:
+                self._remove(self.values.popleft())
+            self._add(value)
+
+        if self.nobs >= self.window and self.nobs > 0:
+            result = self.sum / self.nobs
+            if self.consecutive_same >= self.nobs:
+                result = self.prev_value
+            elif self.neg_ct == 0 and result < 0:
+                result = 0.0
+            elif self.neg_ct == self.nobs and result > 0:
+                result = 0.0
+            return result
+        return math.nan
+
+    def update_many(self, values):
+        """
+        Add several values at once and return their rolling means as an array, identical to
+        calling update on each value but compiled.
+        """
+        values = np.asarray(values, dtype=float)
+        if self.window <= 1:
+            return np.array([self.update(value) for value in values], dtype=float)
+        start = len(self.values)
+        buffer = np.concatenate((np.array(self.values, dtype=float), values))
+        prev_value = math.nan if self.prev_value is None else self.prev_value
+        (out, self.count, self.nobs, self.sum, self.neg_ct, self.compensation_add, self.compensation_remove,
+         self.consecutive_same, self.prev_value) = _rolling_mean_kernel(
+            buffer, start, self.window, self.count, self.nobs, self.sum, self.neg_ct, self.compensation_add,
+            self.compensation_remove, self.consecutive_same, prev_value)
+        self.values = deque(buffer[len(buffer) - min(len(buffer), self.window):].tolist())
+        return out
+
+
+class RollingVariance:
+    """
+    Series.rolling(window).var(ddof) computed one value at a time with pandas' Welford
+    update and Kahan compensation, bit-identical to the batch result. Memory is O(window).
+    """
+
+    def __init__(self, window, ddof=1):
+        self.window = _check_window(window)
+        self.ddof = ddof
+        self.values = deque()
+        self.count = 0
+        self._reset()
+
+    def _reset(self):
+        self.nobs = 0.0
+        self.mean = 0.0
+        self.ssqdm = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.consecutive_same = 0
+        self.prev_value = self.values[0] if self.values else None
+
+    def _add(self, value):
+        if value != value:
+            return
+        self.nobs += 1
+        if value == self.prev_value:
+            self.consecutive_same += 1
+        else:
+            self.consecutive_same = 1
+        self.prev_value = value
+        prev_mean = self.mean - self.compensation_add
+        y = value - self.compensation_add
+        t = y - self.mean
+        self.compensation_add = t + self.mean - y
+        self.mean = self.mean + t / self.nobs if self.nobs else 0.0
+        self.ssqdm = self.ssqdm + (value - prev_mean) * (value - self.mean)
+
+    def _remove(self, value):
+        if value == value:
+            self.nobs -= 1
+            if self.nobs:
+                prev_mean = self.mean - self.compensation_remove
+                y = value - self.compensation_remove
+                t = y - self.mean
+                self.compensation_remove = t + self.mean - y
+                self.mean = self.mean - t / self.nobs
+                self.ssqdm = self.ssqdm - (value - prev_mean) * (value - self.mean)
+            else:
+                self.mean = 0.0
+                self.ssqdm = 0.0
+
+    def update(self, value):
+        """
+        Add the next value and return the rolling variance ending at it.
+        """
+        value = float(value)
+        self.values.append(value)
+        self.count += 1
+        if self.count == 1 or self.window <= 1:
+            while len(self.values) > self.window:
+                self.values.popleft()
+            self._reset()
+            for window_value in self.values:
+                self._add(window_value)
+        else:
+            if len(self.values) > self.window:
+                self._remove(self.values.popleft())
+            self._add(value)
+
+        if self.nobs >= max(self.window, 1) and self.nobs > self.ddof:
+            if self.nobs == 1 or self.consecutive_same >= self.nobs:
+                return 0.0
+            return self.ssqdm / (self.nobs - self.ddof)
+        return math.nan
+
+    def update_many(self, values):
+        """
+        Add several values at once and return their rolling variances as an array, identical
+        to calling update on each value but compiled.
+        """
+        values = np.asarray(values, dtype=float)
+        if self.window <= 1:
+            return np.array([RollingVariance.update(self, value) for value in values], dtype=float)
+        start = len(self.values)
+        buffer = np.concatenate((np.array(self.values, dtype=float), values))
+        prev_value = math.nan if self.prev_value is None else self.prev_value
+        (out, self.count, self.nobs, self.mean, self.ssqdm, self.compensation_add, self.compensation_remove,
+         self.consecutive_same, self.prev_value) = _rolling_variance_kernel(
+            buffer, start, self.window, self.ddof, self.count, self.nobs, self.mean, self.ssqdm,
+            self.compensation_add, self.compensation_remove, self.consecutive_same, prev_value)
+        self.values = deque(buffer[len(buffer) - min(len(buffer), self.window):].tolist())
+        return out
+
+
+class RollingStd(RollingVariance):
+    """
+    Series.rolling(window).std(ddof) computed one value at a time, bit-identical to pandas.
+    """
+
+    def update(self, value):
+        variance = super().update(value)
+        if variance != variance:
+            return variance
+        return math.sqrt(variance) if variance > 0 else 0.0
+
+    def update_many(self, values):
+        variance = super().update_many(values)
+        std = np.sqrt(np.where(variance > 0, variance, 0.0))
+        std[np.isnan(variance)] = np.nan
+        return std
+
+
+class EWMMean:
+    """
+    Series.ewm(span=span, adjust=False).mean() computed one value at a time, with pandas'
+    recursion and NaN handling, bit-identical to the batch result. Memory is O(1).
+
+    Pass alpha instead of span for ewm(alpha=alpha, adjust=False), e.g. Wilder smoothing.
+    """
+
+    def __init__(self, span=None, alpha=None):
+        # pandas converts span and alpha to a center of mass first; the round trip matters
+        com = (span - 1) / 2.0 if alpha is None else (1.0 - alpha) / alpha
+        self.alpha = 1.0 / (1.0 + com)
+        self.old_wt_factor = 1.0 - self.alpha
+        self.old_wt = 1.0
+        self.weighted = None
+
+    def update(self, value):
+        """
+        Add the next value and return the EMA at it.
+        """
+        value = float(value)
+        if self.weighted is None:
+            self.weighted = value
+        elif self.weighted == self.weighted:
+            self.old_wt *= self.old_wt_factor
+            if value == value:
+                if self.weighted != value:
+                    self.weighted = (self.old_wt * self.weighted + self.alpha * value) / (self.old_wt + self.alpha)
+                self.old_wt = 1.0
+        elif value == value:
+            self.weighted = value
+        return self.weighted
+
+    def update_many(self, values):
+        """
+        Add several values at once and return the EMA at each as an array, identical to
+        calling update on each value but compiled.
+        """
+        values = np.asarray(values, dtype=float)
+        started = self.weighted is not None
+        out, weighted, self.old_wt = _ewm_kernel(
+            values, self.alpha, self.old_wt_factor, started, self.weighted if started else math.nan, self.old_wt)
+        if started or len(values):
+            self.weighted = float(weighted)
+        return out
+
+
+class _RollingExtreme:
+    """
+    Rolling max/min over a monotonic deque: O(1) amortized per value, O(window) memory.
+    Like Series.rolling(window).max()/min(), a window containing NaN gives NaN.
+    """
+
+    def __init__(self, window, keep_newer, extreme):
+        self.window = _check_window(window)
+        self.keep_newer = keep_newer
+        self.extreme = extreme
+        self.candidates = deque()  # (position, value), best value first
+        self.count = 0
+        self.last_nan = -1
+
+    def update(self, value):
+        value = float(value)
+        position = self.count
+        self.count += 1
+        if value != value:
+            self.last_nan = position
+        else:
+            # Older candidates that can no longer be the extreme are dropped
+            while self.candidates and self.keep_newer(self.candidates[-1][1], value):
+                self.candidates.pop()
+            self.candidates.append((position, value))
+        while self.candidates and self.candidates[0][0] <= position - self.window:
+            self.candidates.popleft()
+
+        if self.window == 0 or self.count < self.window or self.last_nan > position - self.window:
+            return math.nan
+        return self.candidates[0][1]
+
+    def update_many(self, values):
+        """
+        Add several values at once and return the rolling extremes as an array, identical to
+        calling update on each value. A fresh window is computed over a sliding-window view.
+        """
+        values = np.asarray(values, dtype=float)
+        if self.count > 0 or self.window == 0 or len(values) < self.window:
+            return np.array([self.update(value) for value in values], dtype=float)
+
+        out = np.full(len(values), np.nan)
+        out[self.window - 1:] = self.extreme(sliding_window_view(values, self.window), axis=1)
+        # Rebuild the deque from the last window, the only values it can still hold
+        start = len(values) - self.window
+        for position in range(start, len(values)):
+            value = values[position]
+            if value == value:
+                while self.candidates and self.keep_newer(self.candidates[-1][1], value):
+                    self.candidates.pop()
+                self.candidates.append((position, float(value)))
+        missing = np.flatnonzero(np.isnan(values))
+        self.last_nan = int(missing[-1]) if len(missing) else -1
+        self.count = len(values)
+        return out
+
+
+class RollingMax(_RollingExtreme):
+    """
+    Series.rolling(window).max() computed one value at a time (exact).
+    """
+
+    def __init__(self, window):
+        super().__init__(window, lambda older, newer: older <= newer, np.max)
+
+
+class RollingMin(_RollingExtreme):
+    """
+    Series.rolling(window).min() computed one value at a time (exact).
+    """
+
+    def __init__(self, window):
+        super().__init__(window, lambda older, newer: older >= newer, np.min)
+
+
+class StreamingRSI:
+    """
+    RSI updated one close at a time.
+
+    method='rolling' averages gains and losses over a simple rolling window, exactly like
+    RSI_Strategy.calculate_rsi. method='wilder' uses Wilder's smoothing (an EMA with
+    alpha = 1 / window) instead.
+    """
+
+    def __init__(self, window, method='rolling'):
+        if method == 'rolling':
+            self.gain, self.loss = RollingMean(window), RollingMean(window)
+        elif method == 'wilder':
+            self.gain, self.loss = EWMMean(alpha=1.0 / window), EWMMean(alpha=1.0 / window)
+        else:
+            raise ValueError(f"Unknown RSI method: {method}")
+        self.previous_close = math.nan
+
+    def update(self, close):
+        """
+        Add the next close and return the RSI at it.
+        """
+        close = float(close)
+        delta = close - self.previous_close
+        self.previous_close = close
+        # Same values as delta.where(delta > 0, 0) and -delta.where(delta < 0, 0)
+        gain = self.gain.update(delta if delta > 0 else 0.0)
+        loss = self.loss.update(-(delta if delta < 0 else 0.0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = np.float64(gain) / np.float64(loss)
+            return 100 - (100 / (1 + rs))
+
+    def update_many(self, closes):
+        """
+        Add several closes at once and return the RSI at each as an array.
+        """
+        closes = np.asarray(closes, dtype=float)
+        delta = closes - np.concatenate(([self.previous_close], closes[:-1]))
+        if len(closes):
+            self.previous_close = float(closes[-1])
+        gain = self.gain.update_many(np.where(delta > 0, delta, 0.0))
+        loss = self.loss.update_many(-np.where(delta < 0, delta, 0.0))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return 100 - (100 / (1 + gain / loss))
+
+
+class StreamingBollingerBands:
+    """
+    Bollinger Bands updated one close at a time, matching calculate_bollinger_bands.
+    """
+
+    def __init__(self, window, num_std_dev):
+        self.rolling_mean = RollingMean(window)
+        self.rolling_std = RollingStd(window)
+        self.num_std_dev = num_std_dev
+
+    def update(self, close):
+        """
+        Add the next close and return (rolling_mean, upper_band, lower_band).
+        """
+        rolling_mean = self.rolling_mean.update(close)
+        rolling_std = self.rolling_std.update(close)
+        return (rolling_mean,
+                rolling_mean + (rolling_std * self.num_std_dev),
+                rolling_mean - (rolling_std * self.num_std_dev))
+
+    def update_many(self, closes):
+        """
+        Add several closes at once and return the (rolling_mean, upper_band, lower_band) arrays.
+        """
+        rolling_mean = self.rolling_mean.update_many(closes)
+        rolling_std = self.rolling_std.update_many(closes)
+        return (rolling_mean,
+                rolling_mean + (rolling_std * self.num_std_dev),
+                rolling_mean - (rolling_std * self.num_std_dev))
+
+
+class StreamingMACD:
+    """
+    MACD and signal line updated one close at a time, matching calculate_macd.
+    """
+
+    def __init__(self, short_window=12, long_window=26, signal_window=9):
+        self.short_ema = EWMMean(short_window)
+        self.long_ema = EWMMean(long_window)
+        self.signal_ema = EWMMean(signal_window)
+
+    def update(self, close):
+        """
+        Add the next close and return (macd, signal).
+        """
+        macd = self.short_ema.update(close) - self.long_ema.update(close)
+        return macd, self.signal_ema.update(macd)
+
+    def update_many(self, closes):
+        """
+        Add several closes at once and return the (macd, signal) arrays.
+        """
+        macd = self.short_ema.update_many(closes) - self.long_ema.update_many(closes)
+        return macd, self.signal_ema.update_many(macd)
+
+
+class StreamingDonchianChannel:
+    """
+    Donchian Channel updated one bar at a time, matching calculate_donchian_channel.
+    """
+
+    def __init__(self, window):
+        self.upper = RollingMax(window)
+        self.lower = RollingMin(window)
+
+    def update(self, high, low):
+        """
+        Add the next bar and return (upper_band, lower_band).
+        """
+        return self.upper.update(high), self.lower.update(low)
+
+    def update_many(self, highs, lows):
+        """
+        Add several bars at once and return the (upper_band, lower_band) arrays.
+        """
+        return self.upper.update_many(highs), self.lower.update_many(lows)
+
+
+class StreamingIchimoku:
+    """
+    Ichimoku lines updated one bar at a time, matching calculate_ichimoku.
+    Memory is O(largest window).
+    """
+
+    def __init__(self, tenkan_window=9, kijun_window=26, senkou_span_b_window=52):
+        self.tenkan = (RollingMax(int(tenkan_window)), RollingMin(int(tenkan_window)))
+        self.kijun = (RollingMax(int(kijun_window)), RollingMin(int(kijun_window)))
+        self.senkou_b = (RollingMax(int(senkou_span_b_window)), RollingMin(int(senkou_span_b_window)))
+        # The Senkou spans are shifted forward by kijun_window bars
+        self.pending = deque([(math.nan, math.nan)] * int(kijun_window), maxlen=int(kijun_window) + 1)
+
+    def update(self, high, low):
+        """
+        Add the next bar and return (tenkan, kijun, senkou_span_a, senkou_span_b).
+        """
+        tenkan = (self.tenkan[0].update(high) + self.tenkan[1].update(low)) / 2
+        kijun = (self.kijun[0].update(high) + self.kijun[1].update(low)) / 2
+        senkou_b = (self.senkou_b[0].update(high) + self.senkou_b[1].update(low)) / 2
+        self.pending.append(((tenkan + kijun) / 2, senkou_b))
+        senkou_a, senkou_b = self.pending[0]
+        return tenkan, kijun, senkou_a, senkou_b
+
+
+def rolling_mean_series(values, window):
+    """
+    Return Series(values).rolling(window).mean() as a list, bit-identical.
+
+    Used by the live strategies that recompute over a fixed-length tail of the data.
+    """
+    rolling = RollingMean(window)
+    return [rolling.update(value) for value in values]
+
+
+def ewm_mean_series(values, span):
+    """
+    Return Series(values).ewm(span=span, adjust=False).mean() as a list, bit-identical.
+    """
+    ewm = EWMMean(span)
+    return [ewm.update(value) for value in values]
+
+
+@njit(cache=True)
+def _trailing_rolling_mean(values, length, window):
+    last = np.full(len(values), np.nan)
+    previous = np.full(len(values), np.nan)
+    for t in range(length - 1, len(values)):
+        out = _rolling_mean_kernel(values[t - length + 1:t + 1], 0, window, 0, 0, 0.0, 0, 0.0, 0.0, 0, np.nan)[0]
+        last[t] = out[-1]
+        if length > 1:
+            previous[t] = out[-2]
+    return last, previous
+
+
+@njit(cache=True)
+def _trailing_ewm_mean(values, length, alpha, old_wt_factor):
+    last = np.full(len(values), np.nan)
+    previous = np.full(len(values), np.nan)
+    for t in range(length - 1, len(values)):
+        out = _ewm_kernel(values[t - length + 1:t + 1], alpha, old_wt_factor, False, np.nan, 1.0)[0]
+        last[t] = out[-1]
+        if length > 1:
+            previous[t] = out[-2]
+    return last, previous
+
+
+def trailing_rolling_mean(values, length, window):
+    """
+    For every position t, the last two values of rolling_mean_series(values[t - length + 1:t + 1],
+    window), i.e. of a rolling mean restarted on the `length` values ending at t.
+
+    Used to warm up the live strategies that recompute over a fixed-length tail of the data.
+
+    Returns:
+    - tuple: (last, previous) arrays, NaN before the first full tail.
+    """
+    window = _check_window(window)
+    values = np.asarray(values, dtype=float)
+    if window <= 1:
+        last, previous = np.full(len(values), np.nan), np.full(len(values), np.nan)
+        for t in range(length - 1, len(values)):
+            tail = rolling_mean_series(values[t - length + 1:t + 1], window)
+            last[t] = tail[-1]
+            previous[t] = tail[-2] if length > 1 else np.nan
+        return last, previous
+    return _trailing_rolling_mean(values, int(length), window)
+
+
+def trailing_ewm_mean(values, length, span):
+    """
+    For every position t, the last two values of ewm_mean_series(values[t - length + 1:t + 1],
+    span). Same layout as trailing_rolling_mean.
+    """
+    ewm = EWMMean(span)
+    return _trailing_ewm_mean(np.asarray(values, dtype=float), int(length), ewm.alpha, ewm.old_wt_factor)
@@ -0,0 +1,100 @@
+# Check of compute_all_losses: every loss must equal its loss function called on its own, and the
+# drawdown and exposure stats must match straightforward pandas and row-loop versions.
+import functools
+import time
+
+import numpy as np
+import pandas as pd
+
+from machine_learning import loss_functions, optimize
+from strategies.import_all import strategies
+from testing_and_confirmation.test_parallel_optimize import make_data_frames
+
+
+def reference_stats(results):
+    frame = pd.DataFrame(list(results['portfolio_values_over_time']))
+    values, dates = frame['value'], frame['date_time']
+    max_drawdown = float((1 - values / values.cummax()).max())
+
+    # Walk the rows: from each peak until the value is back at it
+    longest = pd.Timedelta(0)
+    peak, peak_date, date_below = values.iloc[0], dates.iloc[0], False
+    for value, date in zip(values.iloc[1:], dates.iloc[1:]):
+        if value >= peak:
+            longest = max(longest, date - peak_date) if date_below else longest
+            peak, peak_date, date_below = value, date, False
+        else:
+            date_below = True
+    if values.iloc[-1] < peak:
+        longest = max(longest, dates.iloc[-1] - peak_date)
+
+    time_in_market = sum((trade['time_held'] for trade in results['trades_history']), pd.Timedelta(0))
+    span = dates.iloc[-1] - dates.iloc[0]
+    return {'max_drawdown': max_drawdown, 'max_drawdown_duration': longest,
+            'time_in_market': time_in_market, 'exposure': time_in_market / span if span else 0.0}
+
+
+def one_by_one(results):
+    # Every loss and stat from its own inputs, nothing shared
+    losses = {}
+    for name, loss_function in loss_functions.LOSS_FUNCTIONS.items():
+        try:
+            losses[name] = loss_function(results)
+        except loss_functions.NotEnoughDataError:
+            losses[name] = np.nan
+    losses.update(loss_functions.drawdown_stats(loss_functions.LossInputs(results)))
+    losses.update(loss_functions.exposure_stats(loss_functions.LossInputs(results)))
+    return losses
+
+
+def same(first, second):
+    return first == second or (isinstance(first, float) and np.isnan(first) and np.isnan(second))
+
+
+if __name__ == "__main__":
+    failures = 0
+    # Daily bars over several tickers, one ticker, and a ticker too short for the lagged regressions
+    cases = [(make_data_frames(n_tickers=20, n_bars=750), 'compiled'), (make_data_frames(n_tickers=1, n_bars=750), 'single'),
+             (make_data_frames(n_tickers=1, n_bars=6), 'short')]
+    for data_frames, label in cases:
+        ok = True
+        separate_seconds = together_seconds = 0.0
+        for strategy_dict in strategies:
+            strategy, params = strategy_dict['strategy'], strategy_dict['params']
+            results = [optimize.backtest_frame(strategy, params, df['ohlc']) for df in data_frames]
+            combined = optimize.compile_backtest_results_sequential(results, data_frames) if len(results) > 1 else results[0]
+
+            start = time.perf_counter()
+            expected = one_by_one(combined)
+            separate_seconds += time.perf_counter() - start
+            start = time.perf_counter()
+            all_losses = loss_functions.compute_all_losses(combined)
+            together_seconds += time.perf_counter() - start
+
+            reference = reference_stats(combined)
+            ok = ok and all_losses.keys() == expected.keys() and all(same(all_losses[key], expected[key]) for key in expected)
+            ok = ok and all(same(all_losses[key], reference[key]) for key in reference)
+            # Per trial, from one backtest of every data frame
+            per_trial = optimize.evaluate_all_losses(strategy, params, data_frames)
+            ok = ok and all(same(per_trial[key], all_losses[key]) for key in all_losses)
+        failures += not ok
+        print(f"{label:<9} {len(data_frames)} x {len(data_frames[0]['ohlc'])} bars: one by one {separate_seconds:.3f}s, "
+              f"compute_all_losses {together_seconds:.3f}s: {'OK' if ok else 'MISMATCH'}")
+
+    # Too-short results are NaN only for the losses that need more data; other errors are not swallowed
+    strategy, params = strategies[0]['strategy'], strategies[0]['params']
+    short = optimize.backtest_frame(strategy, params, make_data_frames(n_tickers=1, n_bars=6)[0]['ohlc'])
+    long = optimize.backtest_frame(strategy, params, make_data_frames(n_tickers=1, n_bars=750)[0]['ohlc'])
+    all_losses = loss_functions.compute_all_losses(short)
+    ok = np.isnan(all_losses['ridge_regression_loss_function']) and np.isnan(all_losses['elastic_net_loss_function']) \
+        and not np.isnan(all_losses['sharpe_ratio_loss_function'])
+    broken = {'ridge_bogus': functools.partial(loss_functions.ridge_regression_loss_function, objective='bogus')}
+    try:
+        loss_functions.compute_all_losses(long, losses=broken)
+        ok = False
+    except ValueError as error:
+        ok = ok and not isinstance(error, loss_functions.NotEnoughDataError)
+    failures += not ok
+    print(f"short results give NaN regressions, an unknown objective raises: {'OK' if ok else 'MISMATCH'}")
+
+    print("All losses match their loss functions." if failures == 0 else f"{failures} cases differ.")
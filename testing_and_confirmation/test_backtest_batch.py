@@ -0,0 +1,100 @@
+# Check of run_backtest_batch: every candidate column must get exactly the equity curve and summary
+# stats of run_backtest on that column alone, and losses scored from backtest summaries (optimize's
+# summary path) must equal the ones compiled from full results.
+import time
+
+import numpy as np
+import pandas as pd
+
+from machine_learning import loss_functions, optimize
+from modules import backtester
+from strategies.import_all import strategies
+from testing_and_confirmation.test_backtest_engines import DATASETS
+from testing_and_confirmation.test_parallel_optimize import make_data_frames
+
+SUMMARY_KEYS = ('total_trades', 'final_cash', 'total_amount_of_money_made', 'total_percentage_gain',
+                'average_gain_percent_per_trade', 'average_gain_dollars_per_trade', 'average_time_holding_position',
+                'longest_time_position_held', 'average_yearly_percentage_gain', 'average_monthly_percentage_gain')
+
+
+def same(first, second):
+    # Batch times are timedelta64 and run_backtest's Timedelta; amounts and counts compare as they are
+    if isinstance(first, (pd.Timedelta, np.timedelta64)) or isinstance(second, (pd.Timedelta, np.timedelta64)):
+        return pd.Timedelta(first) == pd.Timedelta(second)
+    return first == second
+
+
+def same_as_run_backtest(signals, equity_curves, summary):
+    # Candidate k of the batch against run_backtest on column k
+    ok = True
+    for k, column in enumerate(signals.columns.drop(['Date', 'Close'])):
+        expected, _ = backtester.run_backtest(signals[['Date', 'Close']].assign(action=signals[column]), engine='numpy')
+        ok = ok and np.array_equal(equity_curves[:, k], expected['portfolio_values_over_time'].value)
+        ok = ok and summary['total_trades'][k] == expected['total_trades']
+        ok = ok and all(same(summary[key][k], expected[key]) for key in SUMMARY_KEYS)
+    return ok
+
+
+if __name__ == "__main__":
+    failures = 0
+    for label, ohlc in DATASETS:
+        # Every strategy's actions as one candidate column of the same price series
+        signals = ohlc[['Date', 'Close']].copy()
+        for strategy_dict in strategies:
+            signals[strategy_dict['strategy'].__module__] = strategy_dict['strategy'](ohlc, strategy_dict['params'])['action'].to_numpy()
+        actions = signals.drop(columns=['Date', 'Close'])
+        start = time.perf_counter()
+        equity_curves, summary = backtester.run_backtest_batch(signals['Close'], signals['Date'], actions)
+        batch_seconds = time.perf_counter() - start
+        ok = same_as_run_backtest(signals, equity_curves, summary)
+        failures += not ok
+        print(f"{label:<14} {actions.shape[1]} strategies x {len(ohlc)} bars in one batch ({batch_seconds:.3f}s, "
+              f"{summary['total_trades'].sum()} trades): {'OK' if ok else 'MISMATCH'}")
+
+    # Many candidates with many trades each, and candidates with none
+    ohlc = DATASETS[-1][1]
+    rng = np.random.default_rng(0)
+    signals = ohlc[['Date', 'Close']].copy()
+    for k, p in enumerate((0.3, 0.1, 0.01, 0.0)):
+        signals[f'random {k}'] = rng.choice(['buy', 'sell', 'none'], size=len(ohlc), p=[p / 2, p / 2, 1 - p])
+    signals['open at the end'] = ['none'] * (len(ohlc) - 1) + ['buy']
+    equity_curves, summary = backtester.run_backtest_batch(signals['Close'], signals['Date'], signals.drop(columns=['Date', 'Close']))
+    ok = same_as_run_backtest(signals, equity_curves, summary)
+    failures += not ok
+    print(f"random signals, up to {summary['total_trades'].max()} trades per candidate: {'OK' if ok else 'MISMATCH'}")
+
+    # backtest_summary on signals as the strategies return them, and on shuffled ones
+    ok = True
+    for strategy_dict in strategies:
+        trading_signals = strategy_dict['strategy'](DATASETS[0][1], strategy_dict['params'])
+        expected, _ = backtester.run_backtest(trading_signals, engine='numpy')
+        for variant in (trading_signals, trading_signals.sample(frac=1, random_state=0)):
+            result = backtester.backtest_summary(variant)
+            ok = ok and result.keys() == set(SUMMARY_KEYS) and all(same(result[key], expected[key]) for key in SUMMARY_KEYS)
+    failures += not ok
+    print(f"backtest_summary for {len(strategies)} strategies: {'OK' if ok else 'MISMATCH'}")
+
+    # evaluate_strategy takes the summary path for a loss that only reads summed keys
+    loss_function = loss_functions.simple_loss_function
+    ok = optimize.summary_only(loss_function) and not optimize.summary_only(loss_functions.sharpe_ratio_loss_function)
+    for n_tickers in (1, 5):
+        data_frames = make_data_frames(n_tickers=n_tickers, n_bars=750)
+        ticker_pool = optimize.TickerPool(data_frames, n_jobs=2)
+        summary_seconds = full_seconds = 0.0
+        for strategy_dict in strategies:
+            strategy, params = strategy_dict['strategy'], strategy_dict['params']
+            start = time.perf_counter()
+            loss = optimize.evaluate_strategy(strategy, params, data_frames, loss_function)
+            summary_seconds += time.perf_counter() - start
+            start = time.perf_counter()
+            results = [optimize.backtest_frame(strategy, params, df['ohlc']) for df in data_frames]
+            expected = loss_function(optimize.compile_backtest_results_sequential(results, data_frames) if n_tickers > 1 else results[0])
+            full_seconds += time.perf_counter() - start
+            pooled = optimize.evaluate_strategy(strategy, params, data_frames, loss_function, ticker_pool)
+            ok = ok and loss == expected and loss == pooled
+        ticker_pool.close()
+        failures += not ok
+        print(f"simple_loss_function on {n_tickers} x 750 bars: summaries {summary_seconds:.3f}s, "
+              f"full results {full_seconds:.3f}s: {'OK' if ok else 'MISMATCH'}")
+
+    print("run_backtest_batch matches run_backtest." if failures == 0 else f"{failures} cases differ.")
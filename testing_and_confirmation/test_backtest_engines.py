@@ -0,0 +1,90 @@
+# Parity check of run_backtest's engines: engine='numpy' must return exactly the trades, equity curve,
+# summary stats and signals DataFrame of the row loop (engine='pandas') for every strategy.
+import time
+
+import numpy as np
+import pandas as pd
+
+from modules import backtester
+from strategies.import_all import strategies
+from testing_and_confirmation.test_strategy_parity import make_synthetic_ohlc, make_breakout_ohlc
+
+
+def kind(value):
+    # The row loop itself mixes float and np.float64 (iterrows vs iloc); both are floats
+    return float if isinstance(value, float) else type(value)
+
+
+def same_results(first, second):
+    (results_a, signals_a), (results_b, signals_b) = first, second
+    pd.testing.assert_frame_equal(results_a['portfolio_values_over_time'].to_frame(),
+                                  results_b['portfolio_values_over_time'].to_frame(), check_exact=True)
+    pd.testing.assert_frame_equal(signals_a, signals_b, check_exact=True)
+    same_trades = len(results_a['trades_history']) == len(results_b['trades_history']) and all(
+        a == b and all(kind(a[key]) is kind(b[key]) for key in a)
+        for a, b in zip(results_a['trades_history'], results_b['trades_history'])
+    )
+    summary_keys = [key for key in results_a if key not in ('trades_history', 'portfolio_values_over_time', 'trading_signals')]
+    return same_trades and results_a.keys() == results_b.keys() and all(results_a[key] == results_b[key] for key in summary_keys)
+
+
+def signal_variants(signals):
+    # As produced by the strategies, then inputs the numpy engine must still parse and sort itself
+    naive = signals.assign(Date=signals['Date'].dt.tz_localize(None))
+    yield 'sorted', signals
+    yield 'naive dates', naive
+    # Strings without offsets, since pandas cannot parse mixed DST offsets into one column
+    yield 'string dates', naive.assign(Date=naive['Date'].astype(str))
+    yield 'shuffled', signals.sample(frac=1, random_state=0)
+
+
+# Daily, breakout (for the Donchian channel) and hourly bars; ElliottWave trades on the first two
+DATASETS = [
+    ('daily', make_synthetic_ohlc(n=750, seed=1, start_index=1)),
+    ('daily breakout', make_breakout_ohlc(n=750, seed=0, start_index=1)),
+    ('hourly', make_synthetic_ohlc(n=5000, seed=0, start_index=1, freq='h')),
+]
+
+# Parabolic SAR never reverses (see ParabolicSAR_Strategy.calculate_parabolic_sar), so it never trades
+NEVER_TRADES = {'strategies.ParabolicSAR_Strategy'}
+
+
+if __name__ == "__main__":
+    failures = 0
+    trades = {strategy_dict['strategy'].__module__: 0 for strategy_dict in strategies}
+    for label, ohlc in DATASETS:
+        timings = {'pandas': 0.0, 'numpy': 0.0}
+        ok = True
+        for strategy_dict in strategies:
+            signals = strategy_dict['strategy'](ohlc, strategy_dict['params'])
+            for layout, variant in signal_variants(signals):
+                before = variant.copy()
+                start = time.perf_counter()
+                expected = backtester.run_backtest(variant, engine='pandas')
+                timings['pandas'] += time.perf_counter() - start
+                start = time.perf_counter()
+                result = backtester.run_backtest(variant, engine='numpy')
+                timings['numpy'] += time.perf_counter() - start
+                # The fast path must leave the caller's DataFrame as it was
+                ok = ok and same_results(result, expected) and variant.equals(before) and 'portfolio_value' not in variant
+            trades[strategy_dict['strategy'].__module__] += expected[0]['total_trades']
+        failures += not ok
+        print(f"{label:<14} {len(strategies)} strategies x {len(ohlc)} bars, 4 input layouts: pandas {timings['pandas']:.2f}s, "
+              f"numpy {timings['numpy']:.3f}s: {'OK' if ok else 'MISMATCH'}")
+
+    # Every strategy that can trade did, so its trades were compared
+    idle = [name for name, count in trades.items() if count == 0 and name not in NEVER_TRADES]
+    failures += bool(idle)
+    print(f"trades compared per strategy: {trades}: {'OK' if not idle else f'NO TRADES for {idle}'}")
+
+    # Random signals with many trades, no trades at all, and a position still open on the last bar
+    ohlc = make_synthetic_ohlc(n=2000, seed=2)
+    rng = np.random.default_rng(0)
+    for label, actions in (('random signals', rng.choice(['buy', 'sell', 'none'], size=2000, p=[0.05, 0.05, 0.9])),
+                           ('no signals', ['none'] * 2000), ('open at the end', ['none'] * 10 + ['buy'] + ['none'] * 1989)):
+        signals = ohlc.assign(action=actions)
+        ok = same_results(backtester.run_backtest(signals, engine='numpy'), backtester.run_backtest(signals, engine='pandas'))
+        failures += not ok
+        print(f"{label}: {'OK' if ok else 'MISMATCH'}")
+
+    print("Both engines agree." if failures == 0 else f"{failures} cases differ.")
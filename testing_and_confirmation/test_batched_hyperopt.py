@@ -0,0 +1,63 @@
+# Check of batched_tpe_search: it must propose exactly what hyperopt's fmin does with the same
+# queue length, and batches of several candidates must not depend on the number of worker processes.
+import numpy as np
+from hyperopt import fmin, tpe, Trials, STATUS_OK
+
+from machine_learning import loss_functions, optimize
+from strategies.import_all import strategies
+from testing_and_confirmation.test_parallel_optimize import make_data_frames
+
+MAX_EVALS = 40
+
+
+def fmin_search(strategy_dict, evaluator, concurrent_trials, seed):
+    strategy = strategy_dict['strategy']
+    trials = Trials()
+
+    def objective(params):
+        return {'loss': evaluator.evaluate(strategy, params), 'status': STATUS_OK, 'params': params}
+
+    argmin = fmin(objective, strategy_dict['param_space'], tpe.suggest, MAX_EVALS, trials=trials,
+                  rstate=np.random.default_rng(seed), max_queue_len=concurrent_trials, show_progressbar=False)
+    return argmin, trials
+
+
+def batched_search(strategy_dict, evaluator, concurrent_trials, seed):
+    return optimize.batched_tpe_search(strategy_dict['strategy'], strategy_dict['param_space'], evaluator,
+                                       MAX_EVALS, concurrent_trials, np.random.default_rng(seed))
+
+
+def same_trials(first, second):
+    return (first.losses() == second.losses()
+            and [trial['result']['params'] for trial in first.trials] == [trial['result']['params'] for trial in second.trials])
+
+
+if __name__ == "__main__":
+    data_frames = make_data_frames()
+    loss_function = loss_functions.sharpe_ratio_loss_function
+    serial = optimize.TrialEvaluator(data_frames, loss_function)
+    pool = optimize.TrialEvaluator(data_frames, loss_function, n_jobs=4)
+    failures = 0
+
+    for strategy_dict in strategies:
+        name = strategy_dict['strategy'].__module__.split('.')[-1]
+        matches_fmin = True
+        best = {}
+        for concurrent_trials in (1, 8):
+            fmin_argmin, fmin_trials = fmin_search(strategy_dict, serial, concurrent_trials, seed=3)
+            argmin, trials, _ = batched_search(strategy_dict, serial, concurrent_trials, seed=3)
+            matches_fmin = matches_fmin and argmin == fmin_argmin and same_trials(trials, fmin_trials)
+            best[concurrent_trials] = min(trials.losses())
+
+        pool_argmin, pool_trials, pool_batches = batched_search(strategy_dict, pool, 8, seed=3)
+        matches_serial = pool_argmin == argmin and same_trials(pool_trials, trials)
+
+        ok = matches_fmin and matches_serial
+        failures += not ok
+        suggest = sum(batch['suggest_seconds'] for batch in pool_batches)
+        evaluate = sum(batch['evaluate_seconds'] for batch in pool_batches)
+        print(f"{name:<26} 1 per batch best {best[1]:.6f}, {len(pool_batches)} batches of 8 best {best[8]:.6f} "
+              f"(suggest {suggest:.2f}s, evaluate {evaluate:.2f}s): {'OK' if ok else 'MISMATCH'}")
+
+    pool.close()
+    print("Batched TPE matches fmin and is independent of n_jobs." if failures == 0 else f"{failures} strategies differ.")
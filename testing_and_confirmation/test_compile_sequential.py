@@ -0,0 +1,103 @@
+# Check of compile_backtest_results_sequential: the array version must give exactly the curve,
+# trades and metrics of the row-by-row loop it replaced, for tz-aware and naive dates.
+import copy
+import time
+from datetime import timedelta
+
+import pandas as pd
+
+from machine_learning import optimize
+from modules.portfolio_values import PortfolioValues
+from strategies.import_all import strategies
+from testing_and_confirmation.test_parallel_optimize import make_data_frames
+
+
+def compile_sequential_reference(results):
+    # The loop version: deep copies, one dict and one pd.to_datetime per row, one shift per trade
+    first_backtest = copy.deepcopy(results[0])
+    compiled_portfolio_values = list(first_backtest['portfolio_values_over_time'])
+    compiled_trades_history = first_backtest['trades_history']
+    last_value = compiled_portfolio_values[-1]['value']
+    last_date = pd.to_datetime(compiled_portfolio_values[-1]['date_time'])
+    last_stock_value = compiled_portfolio_values[-1]['stock_value']
+
+    for current_results in results[1:]:
+        current_results = copy.deepcopy(current_results)
+        current_portfolio_values = list(current_results['portfolio_values_over_time'])
+        date_offset = last_date + timedelta(days=1) - pd.to_datetime(current_portfolio_values[0]['date_time'])
+        first_value = current_portfolio_values[0]['value']
+        scaling_factor = last_value / first_value if first_value != 0 else 1
+        first_stock_value = current_portfolio_values[0]['stock_value']
+        stock_scaling_factor = last_stock_value / first_stock_value if first_stock_value != 0 else 1
+
+        adjusted_portfolio_values = [{
+            'date_time': pd.to_datetime(entry['date_time']) + date_offset,
+            'value': entry['value'] * scaling_factor,
+            'stock_value': entry['stock_value'] * stock_scaling_factor
+        } for entry in current_portfolio_values]
+        compiled_portfolio_values.extend(adjusted_portfolio_values)
+        for trade in current_results['trades_history']:
+            adjusted_trade = trade.copy()
+            adjusted_trade['purchase_date'] += date_offset
+            adjusted_trade['sale_date'] += date_offset
+            compiled_trades_history.append(adjusted_trade)
+        last_value = adjusted_portfolio_values[-1]['value']
+        last_date = adjusted_portfolio_values[-1]['date_time']
+        last_stock_value = adjusted_portfolio_values[-1]['stock_value']
+
+    total_time_passed = compiled_portfolio_values[-1]['date_time'] - compiled_portfolio_values[0]['date_time']
+    total_years = total_time_passed / timedelta(days=365.25)
+    time_held_list = [trade['time_held'] for trade in compiled_trades_history]
+    return {
+        'portfolio_values_over_time': PortfolioValues.from_records(compiled_portfolio_values),
+        'trades_history': compiled_trades_history,
+        'total_time_passed': total_time_passed,
+        'total_years': total_years,
+        'total_percentage_gain': compiled_portfolio_values[-1]['value'] / compiled_portfolio_values[0]['value'] - 1,
+        'average_return_per_year': optimize.calculate_average_yearly_gain(compiled_portfolio_values),
+        'total_amount_of_money_made': sum(r['total_amount_of_money_made'] for r in results),
+        'total_trades': len(compiled_trades_history),
+        'average_time_holding_position': sum(time_held_list, timedelta()) / len(time_held_list) if time_held_list else timedelta(0),
+        'average_trades_per_year': len(compiled_trades_history) / total_years,
+    }
+
+
+def same_compiled(first, second):
+    pd.testing.assert_frame_equal(first['portfolio_values_over_time'].to_frame(), second['portfolio_values_over_time'].to_frame(),
+                                  check_exact=True)
+    same_trades = all(
+        a == b and all(type(a[key]) is type(b[key]) for key in a)
+        for a, b in zip(first['trades_history'], second['trades_history'])
+    ) and len(first['trades_history']) == len(second['trades_history'])
+    return same_trades and first.keys() == second.keys() and all(
+        first[key] == second[key] for key in first if key not in ('portfolio_values_over_time', 'trades_history')
+    )
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    return function(*args), time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    failures = 0
+    # Chained daily bars must stay before 2262, the last date pandas can hold
+    for n_tickers, n_bars, naive in ((3, 750, False), (3, 750, True), (50, 750, False), (200, 250, False)):
+        data_frames = make_data_frames(n_tickers=n_tickers, n_bars=n_bars)
+        if naive:
+            for df in data_frames:
+                df['ohlc'] = df['ohlc'].assign(Date=pd.to_datetime(df['ohlc']['Date']).dt.tz_localize(None))
+        reference_seconds = vectorized_seconds = 0.0
+        ok = True
+        for strategy_dict in strategies:
+            results = [optimize.backtest_frame(strategy_dict['strategy'], strategy_dict['params'], df['ohlc']) for df in data_frames]
+            expected, seconds = timed(compile_sequential_reference, results)
+            reference_seconds += seconds
+            compiled, seconds = timed(optimize.compile_backtest_results_sequential, results, data_frames)
+            vectorized_seconds += seconds
+            ok = ok and same_compiled(expected, compiled)
+        failures += not ok
+        print(f"{n_tickers:>3} tickers x {n_bars} bars{' (naive dates)' if naive else ''}: loop {reference_seconds:.2f}s, "
+              f"arrays {vectorized_seconds:.3f}s over {len(strategies)} strategies: {'OK' if ok else 'MISMATCH'}")
+
+    print("Compiled results match the loop." if failures == 0 else f"{failures} cases differ.")
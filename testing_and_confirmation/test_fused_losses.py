@@ -0,0 +1,74 @@
+# Check of the fused loss evaluation: every loss function must return exactly the same loss when
+# the optimizer compiles only the keys it declares, or scores backtest summaries, as when it reads
+# the fully compiled results.
+import functools
+import time
+
+from machine_learning import loss_functions, optimize
+from strategies.import_all import strategies
+from testing_and_confirmation.test_parallel_optimize import make_data_frames
+
+N_TICKERS = 50
+
+LOSS_FUNCTIONS = [
+    loss_functions.simple_loss_function,
+    loss_functions.sharpe_ratio_loss_function,
+    loss_functions.ridge_regression_loss_function,
+    loss_functions.elastic_net_loss_function,
+    loss_functions.gt_function,
+    functools.partial(loss_functions.gt_function, t_or_p="portfolio_value"),
+]
+
+
+def name_of(loss_function):
+    if isinstance(loss_function, functools.partial):
+        return f"{loss_function.func.__name__}({', '.join(f'{k}={v!r}' for k, v in loss_function.keywords.items())})"
+    return loss_function.__name__
+
+
+if __name__ == "__main__":
+    data_frames = make_data_frames(n_tickers=N_TICKERS, n_bars=500)
+    results = [[optimize.backtest_frame(d['strategy'], d['params'], df['ohlc']) for df in data_frames] for d in strategies]
+    failures = 0
+
+    # The keys a loss asks for are compiled exactly as in the full results
+    full = [optimize.compile_backtest_results_sequential(r, data_frames) for r in results]
+    for keys in ({'total_amount_of_money_made'}, {'portfolio_values_over_time'}, {'trades_history', 'total_trades'}):
+        ok = True
+        for r, compiled in zip(results, full):
+            partial = optimize.compile_backtest_results_sequential(r, data_frames, keys)
+            ok = ok and partial.keys() == keys and all(
+                partial[key] == compiled[key] if key != 'portfolio_values_over_time'
+                else partial[key].to_frame().equals(compiled[key].to_frame())
+                for key in keys
+            )
+        failures += not ok
+        print(f"compile keys={sorted(keys)}: {'OK' if ok else 'MISMATCH'}")
+
+    for loss_function in LOSS_FUNCTIONS:
+        keys = loss_functions.required_results(loss_function)
+        full_seconds = fused_seconds = 0.0
+        ok = True
+        for r in results:
+            start = time.perf_counter()
+            expected = loss_function(optimize.compile_backtest_results_sequential(r, data_frames))
+            full_seconds += time.perf_counter() - start
+            start = time.perf_counter()
+            loss = loss_function(optimize.compile_backtest_results_sequential(r, data_frames, keys))
+            fused_seconds += time.perf_counter() - start
+            ok = ok and loss == expected
+        failures += not ok
+        print(f"{name_of(loss_function):<48} needs {sorted(keys)}: full {full_seconds:.3f}s, fused {fused_seconds:.3f}s: "
+              f"{'OK' if ok else 'MISMATCH'}")
+
+    # Losses that only read summed totals are scored from backtest summaries, to the same bits
+    for loss_function in filter(optimize.summary_only, LOSS_FUNCTIONS):
+        ok = all(
+            optimize.evaluate_strategy(d['strategy'], d['params'], data_frames, loss_function) ==
+            loss_function(optimize.compile_backtest_results_sequential(r, data_frames))
+            for d, r in zip(strategies, results)
+        )
+        failures += not ok
+        print(f"{name_of(loss_function):<48} from backtest summaries: {'OK' if ok else 'MISMATCH'}")
+
+    print("Fused losses match the full compilation." if failures == 0 else f"{failures} checks failed.")
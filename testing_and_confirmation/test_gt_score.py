@@ -0,0 +1,158 @@
+# Check of the vectorized GT-score helpers: find_stabilized_variance, get_period_returns and every
+# mode of gt_function must give exactly what the pandas groupby versions gave.
+import functools
+import math
+import time
+
+import numpy as np
+from scipy.stats import linregress
+
+from machine_learning import loss_functions, optimize
+from strategies.import_all import strategies
+from testing_and_confirmation.test_strategy_parity import make_synthetic_ohlc
+
+
+# The groupby implementations and the GT-score as they were before vectorization
+
+def legacy_period_returns(df, column):
+    return df.groupby('period')[column].apply(
+        lambda g: (g.iloc[-1] - g.iloc[0]) / g.iloc[0] if len(g) > 1 else None
+    ).dropna()
+
+
+def legacy_find_stabilized_variance(data, min_period=20, max_period=100):
+    df = loss_functions.portfolio_frame(data)
+    df.sort_values('date_time', inplace=True)
+    total_time = (df['date_time'].max() - df['date_time'].min()).days
+    results = []
+    low = min_period
+    high = max_period
+    while low <= high:
+        num_periods = (low + high) // 2
+        period_length = total_time / num_periods
+        df['period'] = ((df['date_time'] - df['date_time'].min()).dt.days // period_length).astype(int)
+        returns = legacy_period_returns(df, 'value')
+        if len(returns) < 2:
+            low = num_periods + 1
+            continue
+        variance = np.var(returns)
+        results.append((num_periods, variance))
+        if len(results) > 3:
+            recent_variances = [v[1] for v in results[-4:]]
+            changes = [abs(recent_variances[i] - recent_variances[i - 1]) for i in range(1, len(recent_variances))]
+            if np.mean(changes) <= np.mean(recent_variances) * 0.01:
+                return num_periods
+        if len(results) > 1 and variance < results[-2][1]:
+            high = num_periods - 1
+        else:
+            low = num_periods + 1
+    return 50
+
+
+def legacy_get_period_returns(data, num_periods):
+    df = loss_functions.portfolio_frame(data)
+    df.sort_values('date_time', inplace=True)
+    total_time = (df['date_time'].max() - df['date_time'].min()).days
+    period_length = total_time / num_periods
+    df['period'] = ((df['date_time'] - df['date_time'].min()).dt.days // period_length).astype(int)
+    return legacy_period_returns(df, 'value').tolist(), legacy_period_returns(df, 'stock_value').tolist()
+
+
+def legacy_trend_r_squared(returns):
+    return linregress(range(len(returns)), returns).rvalue ** 2
+
+
+def legacy_gt_function(backtest_results, stabilize=False, t_or_p="trades"):
+    if stabilize:
+        num_periods = legacy_find_stabilized_variance(backtest_results['portfolio_values_over_time'])
+    else:
+        num_periods = 50
+    num_trades = len(backtest_results["trades_history"])
+    if num_trades <= num_periods:
+        interval = (999 - 100) / num_periods
+        return 999 - (num_trades * interval)
+    percentage_returns_by_trade = [trade["profit_loss_percent"] for trade in backtest_results["trades_history"]]
+    if t_or_p == "portfolio_value":
+        period_percentage_returns, period_percentage_returns_market = legacy_get_period_returns(
+            backtest_results['portfolio_values_over_time'], num_periods)
+    else:
+        period_percentage_returns = percentage_returns_by_trade
+        starting_market_value = backtest_results["portfolio_values_over_time"][0]["stock_value"]
+        ending_market_value = backtest_results["portfolio_values_over_time"][-1]["stock_value"]
+        period_percentage_returns_market = [(ending_market_value / starting_market_value) ** (1 / num_trades) - 1] * num_trades
+    mu = np.mean(period_percentage_returns)
+    mum = np.mean(period_percentage_returns_market)
+    r2 = legacy_trend_r_squared(percentage_returns_by_trade)
+    negative_returns = [r for r in period_percentage_returns if r < 0]
+    sigma_d = np.std(negative_returns) if negative_returns else 1e-6
+    sigma = np.std(period_percentage_returns)
+    z = (mu - mum) / (sigma / np.sqrt(num_trades))
+    if z <= 0:
+        return 100 + (100 * (1 - math.exp(-abs(z - 1))))
+    elif z <= 1:
+        return 100 * (1 - math.exp(-abs(z - 1)))
+    return -(mu * math.log(z) * r2) / sigma_d
+
+
+def same(first, second):
+    return first == second or (np.isnan(first) and np.isnan(second))
+
+
+def curves(n_tickers, n_bars, freq):
+    data_frames = [{'ohlc': make_synthetic_ohlc(n=n_bars, seed=k, start_index=1, freq=freq)} for k in range(n_tickers)]
+    for strategy_dict in strategies:
+        results = [optimize.backtest_frame(strategy_dict['strategy'], strategy_dict['params'], df['ohlc']) for df in data_frames]
+        yield strategy_dict['strategy'].__module__, optimize.compile_backtest_results_sequential(results, data_frames)
+
+
+GT_MODES = [{}, {'stabilize': True}, {'t_or_p': 'portfolio_value'}, {'stabilize': True, 't_or_p': 'portfolio_value'}]
+
+
+if __name__ == "__main__":
+    failures = 0
+    rng = np.random.default_rng(0)
+    samples = [rng.normal(0.01, 0.05, rng.integers(2, 300)) for _ in range(2000)]
+    samples += [np.full(40, 0.01), np.array([0.02, -0.01]), np.r_[rng.normal(size=10), np.nan]]
+    ok = all(same(loss_functions.trend_r_squared(r), legacy_trend_r_squared(r)) for r in samples)
+    failures += not ok
+    print(f"trend_r_squared against linregress on {len(samples)} samples: {'OK' if ok else 'MISMATCH'}")
+
+    for n_tickers, n_bars, freq in ((1, 750, 'D'), (20, 750, 'D'), (3, 3000, 'h')):
+        ok = True
+        timings = {'legacy': 0.0, 'vectorized': 0.0, 'sharpe': 0.0}
+        for name, compiled in curves(n_tickers, n_bars, freq):
+            curve = compiled['portfolio_values_over_time']
+            # Unsorted list-of-dicts input takes the sorting path
+            shuffled = [curve[i] for i in np.random.default_rng(0).permutation(len(curve))]
+            for data in (curve, shuffled):
+                ok = ok and loss_functions.find_stabilized_variance(data) == legacy_find_stabilized_variance(data)
+                for num_periods in (7, 20, 50, 101):
+                    ok = ok and loss_functions.get_period_returns(data, num_periods) == legacy_get_period_returns(data, num_periods)
+
+            for mode in GT_MODES:
+                start = time.perf_counter()
+                expected = legacy_gt_function(compiled, **mode)
+                timings['legacy'] += time.perf_counter() - start
+                start = time.perf_counter()
+                score = loss_functions.gt_function(compiled, **mode)
+                timings['vectorized'] += time.perf_counter() - start
+                ok = ok and same(score, expected)
+            start = time.perf_counter()
+            loss_functions.sharpe_ratio_loss_function(compiled)
+            timings['sharpe'] += (time.perf_counter() - start) * len(GT_MODES)
+
+        failures += not ok
+        print(f"{n_tickers:>2} tickers x {n_bars} {freq} bars: GT in 4 modes, groupby {timings['legacy']:.2f}s, "
+              f"vectorized {timings['vectorized']:.3f}s (Sharpe {timings['sharpe']:.3f}s): {'OK' if ok else 'MISMATCH'}")
+
+    # GT-score through the optimizer, as a functools.partial
+    stabilized = functools.partial(loss_functions.gt_function, stabilize=True)
+    data_frames = [{'ohlc': make_synthetic_ohlc(n=500, seed=k, start_index=1)} for k in range(3)]
+    results = optimize.optimize(strategies, data_frames, stabilized, 'random', max_evals=3, seed=1, memo=False)
+    best = optimize.compile_backtest_results_sequential(
+        [optimize.backtest_frame(results['best_strategy'], results['best_params'], df['ohlc']) for df in data_frames], data_frames)
+    ok = same(results['best_loss'], legacy_gt_function(best, stabilize=True))
+    failures += not ok
+    print(f"optimize with gt_function(stabilize=True): best {results['best_loss']:.6f}: {'OK' if ok else 'MISMATCH'}")
+
+    print("GT-score matches the groupby implementation." if failures == 0 else f"{failures} checks failed.")
@@ -0,0 +1,142 @@
+# Check of strategies/indicator_cache.py: hit/miss counters, LRU eviction within the byte budget,
+# cached indicators and strategies identical to computing them with pandas every time, and live
+# checks that bypass the cache.
+import importlib
+import time
+
+import numpy as np
+import pandas as pd
+
+from strategies import indicator_cache
+from strategies.import_all import strategies
+from strategies.RSI_Strategy import calculate_rsi
+from testing_and_confirmation.test_strategy_parity import make_synthetic_ohlc
+
+HELPERS = (
+    (indicator_cache.rolling_mean, lambda series, window: series.rolling(window=window).mean()),
+    (indicator_cache.rolling_std, lambda series, window: series.rolling(window=window).std()),
+    (indicator_cache.rolling_max, lambda series, window: series.rolling(window=window).max()),
+    (indicator_cache.rolling_min, lambda series, window: series.rolling(window=window).min()),
+    (indicator_cache.ewm_mean, lambda series, span: series.ewm(span=span, adjust=False).mean()),
+)
+
+
+def counters(cache):
+    stats = cache.stats()
+    return stats['hits'], stats['misses'], stats['evictions'], stats['entries']
+
+
+def same_series(first, second):
+    try:
+        pd.testing.assert_series_equal(first, second, check_exact=True)
+        return True
+    except AssertionError:
+        return False
+
+
+if __name__ == "__main__":
+    failures = 0
+    shared = indicator_cache.indicator_cache
+    ohlc = make_synthetic_ohlc(n=750, seed=0, start_index=1)
+    close = ohlc['Close']
+
+    # Hits and misses: the same column and window hit, whatever the index; another window misses
+    shared.clear()
+    indicator_cache.rolling_mean(close, 20)
+    indicator_cache.rolling_mean(close, 20)
+    indicator_cache.rolling_mean(close.reset_index(drop=True), 20)
+    indicator_cache.rolling_mean(close, 21)
+    indicator_cache.rolling_mean(close * 2, 20)
+    ok = counters(shared) == (2, 3, 0, 3) and shared.stats()['hit_rate'] == 0.4
+    # NumPy integers share the int entry; a float window does not, and fails as it does in pandas
+    indicator_cache.rolling_mean(close, np.int64(20))
+    ok = ok and counters(shared) == (3, 3, 0, 3)
+    try:
+        indicator_cache.rolling_max(close, 20)
+        indicator_cache.rolling_max(close, 20.0)
+        ok = False
+    except ValueError:
+        ok = ok and counters(shared) == (3, 5, 0, 4)
+    failures += not ok
+    print(f"hit/miss accounting {counters(shared)[:2]}: {'OK' if ok else 'MISMATCH'}")
+
+    # Eviction: four entries in a budget for three drop the least recently used one
+    values = np.arange(100, dtype=float)
+    size = indicator_cache.entry_bytes('a', np.array(values))
+    cache = indicator_cache.IndicatorCache(max_bytes=3 * size)
+    for key in 'abc':
+        cache.put(key, values)
+    cache.get('a', lambda: None)  # a is now the most recently used
+    cache.put('d', values)
+    ok = list(cache.entries) == ['c', 'a', 'd'] and counters(cache) == (1, 0, 1, 3) and cache.bytes == 3 * size
+    # Keys count against the budget too: a long key leaves no room for the same values twice
+    ok = ok and indicator_cache.entry_bytes(('x' * 1000,), values) > size + 1000
+    # A smaller budget evicts down to it, oldest first; an entry larger than the budget is not kept
+    cache.set_max_bytes(size + size // 4)
+    ok = ok and list(cache.entries) == ['d'] and cache.stats()['evictions'] == 3 and cache.bytes == size
+    cache.put('e', np.arange(200, dtype=float))
+    ok = ok and list(cache.entries) == ['d'] and cache.bytes == size
+    # Budget 0 disables caching: everything is evicted and every lookup computes
+    cache.set_max_bytes(0)
+    calls = []
+    for _ in range(2):
+        cache.get('f', lambda: calls.append(1) or pd.Series(values))
+    ok = ok and not cache.entries and cache.bytes == 0 and len(calls) == 2 and cache.stats()['evictions'] == 4
+    failures += not ok
+    print(f"byte-budget eviction: {'OK' if ok else 'MISMATCH'}")
+
+    # Cached values, on a miss and on a hit, are the pandas values; changing a returned Series leaves the cache as it was
+    shared.clear()
+    ok = True
+    for helper, compute in HELPERS:
+        for window in (2, 9, 20, 52):
+            expected = compute(close, window)
+            first, second = helper(close, window), helper(close, window)
+            ok = ok and same_series(first, expected) and same_series(second, expected)
+            first.iloc[:] = 0.0
+            ok = ok and same_series(helper(close, window), expected)
+    for window in (7, 14):
+        cached = [calculate_rsi(ohlc, window) for _ in range(2)]
+        shared.set_max_bytes(0)
+        uncached = calculate_rsi(ohlc, window)
+        shared.set_max_bytes(indicator_cache.DEFAULT_MAX_BYTES)
+        ok = ok and all(same_series(rsi, uncached) for rsi in cached)
+    failures += not ok
+    print(f"{len(HELPERS)} cached indicators equal pandas: {'OK' if ok else 'MISMATCH'}")
+
+    # Every strategy returns the same signals with the cache on (cold and warm) and off
+    datasets = [make_synthetic_ohlc(n=750, seed=k, start_index=1) for k in range(3)]
+    for strategy_dict in strategies:
+        # Compile the strategies' kernels before timing them
+        strategy_dict['strategy'](make_synthetic_ohlc(n=100, seed=9), strategy_dict['params'])
+    timings = {}
+    outputs = {}
+    for label, max_bytes in (('cold', indicator_cache.DEFAULT_MAX_BYTES), ('warm', indicator_cache.DEFAULT_MAX_BYTES), ('off', 0)):
+        if label == 'cold':
+            shared.clear()
+        shared.set_max_bytes(max_bytes)
+        start = time.perf_counter()
+        outputs[label] = [strategy_dict['strategy'](data, strategy_dict['params']) for data in datasets for strategy_dict in strategies]
+        timings[label] = time.perf_counter() - start
+    shared.set_max_bytes(indicator_cache.DEFAULT_MAX_BYTES)
+    ok = all(cold.equals(off) and warm.equals(off) for cold, warm, off in zip(outputs['cold'], outputs['warm'], outputs['off']))
+    failures += not ok
+    print(f"strategies with the cache cold {timings['cold']:.3f}s, warm {timings['warm']:.3f}s, off {timings['off']:.3f}s: "
+          f"{'OK' if ok else 'MISMATCH'}")
+
+    # The live checks compute on every new prefix of the history without touching the cache
+    shared.clear()
+    for strategy_dict in strategies:
+        strategy_dict['strategy'](ohlc, strategy_dict['params'])
+    before = shared.stats()
+    ok = True
+    for strategy_dict in strategies:
+        should_buy_live = importlib.import_module(strategy_dict['strategy'].__module__).should_buy_live
+        for end in range(len(ohlc) - 20, len(ohlc) + 1):
+            should_buy_live(ohlc.iloc[:end], strategy_dict['params'])
+    after = shared.stats()
+    ok = ok and all(after[key] == before[key] for key in ('hits', 'misses', 'evictions', 'entries', 'bytes'))
+    failures += not ok
+    print(f"live checks on {len(strategies)} x 21 prefixes leave the cache alone: {'OK' if ok else 'MISMATCH'}")
+
+    print("Indicator cache checks out." if failures == 0 else f"{failures} checks failed.")
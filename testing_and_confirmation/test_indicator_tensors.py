@@ -0,0 +1,105 @@
+# Check of strategies/indicator_tensors.py: every tensor row must match the pandas indicator for
+# its window (exactly, except for the rolling means), and optimize(prime_windows=...) must find
+# the same best trial as an unprimed search.
+import time
+
+import numpy as np
+
+from machine_learning import loss_functions, optimize
+from strategies import indicator_cache, indicator_tensors
+from strategies.import_all import strategies
+from testing_and_confirmation.test_parallel_optimize import make_data_frames
+from testing_and_confirmation.test_strategy_parity import make_synthetic_ohlc
+
+WINDOWS = np.arange(1, 81)
+
+
+def with_gaps(ohlc):
+    # NaNs and a flat stretch, where rolling sums and pandas' online std are most likely to differ
+    ohlc = ohlc.copy()
+    ohlc.loc[ohlc.index[100:103], ['High', 'Low', 'Close']] = np.nan
+    ohlc.loc[ohlc.index[200:300], ['High', 'Low', 'Close']] = ohlc.loc[ohlc.index[199], ['High', 'Low', 'Close']].to_numpy()
+    return ohlc
+
+
+def trending(n=100_000, seed=0):
+    # Long, steady trend with tiny noise: the window spread is a small fraction of the level,
+    # which is where variances from sums of squares lose their digits
+    ohlc = make_synthetic_ohlc(n=n, seed=seed, start_index=1, freq='h')
+    drift = np.linspace(10, 1000, n) + np.random.default_rng(seed).normal(0, 0.01, n)
+    return ohlc.assign(Open=drift, High=drift + 0.005, Low=drift - 0.005, Close=drift)
+
+
+def exact(first, second):
+    return np.array_equal(first, second, equal_nan=True)
+
+
+def close(first, second, scale):
+    # Means from cumulative sums round differently from pandas' running sums: compare to the column's spread
+    return np.array_equal(np.isnan(first), np.isnan(second)) and np.nanmax(np.abs(first - second), initial=0.0) <= 1e-6 * scale
+
+
+if __name__ == "__main__":
+    failures = 0
+    # Compile the EMA kernel before timing anything
+    indicator_tensors.precompute_indicator_tensors(make_synthetic_ohlc(n=50, seed=0), WINDOWS[:5])
+    for label, ohlc in (('daily', make_synthetic_ohlc(n=750, seed=0, start_index=1)),
+                        ('hourly', make_synthetic_ohlc(n=5000, seed=1, start_index=1, freq='h')),
+                        ('with gaps', with_gaps(make_synthetic_ohlc(n=750, seed=2, start_index=1))),
+                        ('trending', trending())):
+        start = time.perf_counter()
+        tensors = indicator_tensors.precompute_indicator_tensors(ohlc, WINDOWS)
+        tensor_seconds = time.perf_counter() - start
+        close_prices, scale = ohlc['Close'], np.nanstd(ohlc['Close'])
+        ok = True
+        start = time.perf_counter()
+        for window in WINDOWS.tolist():
+            ok = ok and close(indicator_tensors.tensor_row(tensors, 'close_mean', window), close_prices.rolling(window).mean().to_numpy(), scale)
+            ok = ok and exact(indicator_tensors.tensor_row(tensors, 'close_std', window), close_prices.rolling(window).std().to_numpy())
+            ok = ok and exact(indicator_tensors.tensor_row(tensors, 'close_ema', window),
+                              close_prices.ewm(span=window, adjust=False).mean().to_numpy())
+            ok = ok and exact(indicator_tensors.tensor_row(tensors, 'high_max', window), ohlc['High'].rolling(window).max().to_numpy())
+            ok = ok and exact(indicator_tensors.tensor_row(tensors, 'low_min', window), ohlc['Low'].rolling(window).min().to_numpy())
+        pandas_seconds = time.perf_counter() - start
+        # A flat stretch has exactly zero spread, as in pandas
+        if label == 'with gaps':
+            ok = ok and np.all(indicator_tensors.tensor_row(tensors, 'close_std', 20)[219:300] == 0)
+        failures += not ok
+        print(f"{label:<9} {len(WINDOWS)} windows x {len(ohlc)} bars: tensors {tensor_seconds:.3f}s, "
+              f"pandas {pandas_seconds:.3f}s: {'OK' if ok else 'MISMATCH'}")
+
+    # The primed entries are the pandas values the strategies would otherwise compute
+    ohlc = make_synthetic_ohlc(n=750, seed=3, start_index=1)
+    cache = indicator_cache.IndicatorCache()
+    stored = indicator_tensors.prime_indicator_cache(ohlc, WINDOWS, cache)
+    ok = stored == 3 * len(WINDOWS)
+    for name, series, expected in (('rolling_max', ohlc['High'], lambda w: ohlc['High'].rolling(w).max()),
+                                   ('rolling_min', ohlc['Low'], lambda w: ohlc['Low'].rolling(w).min()),
+                                   ('ewm_mean', ohlc['Close'], lambda w: ohlc['Close'].ewm(span=w, adjust=False).mean())):
+        for window in WINDOWS.tolist():
+            values, _ = cache.get(indicator_cache.indicator_key(name, [series], (window,)), lambda: None)
+            ok = ok and exact(values, expected(window).to_numpy())
+    ok = ok and cache.stats()['misses'] == 0
+    failures += not ok
+    print(f"prime_indicator_cache stored {stored} rows equal to pandas: {'OK' if ok else 'MISMATCH'}")
+
+    # A primed search finds what an unprimed one finds, and its trials hit the primed rows
+    data_frames = make_data_frames(n_tickers=3, n_bars=500)
+    primed_strategies = [s for s in strategies if s['strategy'].__module__ in
+                         ('strategies.EMA_Strategy', 'strategies.DonchianChannel_Strategy', 'strategies.IchimokuCloud_Strategy')]
+    results = {}
+    for prime_windows in (None, range(5, 61)):
+        indicator_cache.indicator_cache.clear()
+        start = time.perf_counter()
+        results[prime_windows] = optimize.optimize(primed_strategies, data_frames, loss_functions.sharpe_ratio_loss_function,
+                                                   'random', max_evals=20, seed=3, prime_windows=prime_windows)
+        seconds = time.perf_counter() - start
+        stats = indicator_cache.indicator_cache.stats()
+        print(f"random search, prime_windows={prime_windows}: {seconds:.2f}s, cache {stats['hits']} hits, {stats['misses']} misses")
+    unprimed, primed = results.values()
+    ok = (unprimed['best_loss'], unprimed['best_params'], unprimed['best_strategy']) == \
+        (primed['best_loss'], primed['best_params'], primed['best_strategy'])
+    failures += not ok
+    print(f"primed search returns the same best trial: {'OK' if ok else 'MISMATCH'}")
+
+    print("Indicator tensors match pandas." if failures == 0 else f"{failures} checks failed.")
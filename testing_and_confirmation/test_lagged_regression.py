@@ -0,0 +1,127 @@
+# Check of the NumPy lagged regressions: the ridge and elastic-net losses must match the sklearn
+# versions (StandardScaler + Ridge / ElasticNet on an hstack of 5 lags) up to rounding, one curve
+# at a time and in batches.
+import time
+import warnings
+
+import numpy as np
+from sklearn.exceptions import ConvergenceWarning
+from sklearn.linear_model import ElasticNet, Ridge
+from sklearn.preprocessing import StandardScaler
+
+from machine_learning import loss_functions, optimize
+from strategies.import_all import strategies
+from testing_and_confirmation.test_strategy_parity import make_synthetic_ohlc
+
+
+# The loss functions as they were, with a fresh scaler and sklearn estimator per call
+
+def legacy_lagged_regression(backtest_results, model, objective):
+    values = [d['value'] for d in backtest_results['portfolio_values_over_time']]
+    if len(values) < 2:
+        raise ValueError("Not enough data to compute returns.")
+    returns = np.diff(values) / values[:-1]
+    min_length = len(returns) - 5
+    if min_length <= 0:
+        raise ValueError("Not enough data to create lagged features.")
+    X = np.hstack([returns[i : i + min_length].reshape(-1, 1) for i in range(5)])
+    y = returns[5 : 5 + min_length]
+    X_scaled = StandardScaler().fit_transform(X)
+    model.fit(X_scaled, y)
+    y_pred = model.predict(X_scaled)
+    if objective == 'mse':
+        return np.mean((y - y_pred) ** 2)
+    elif objective == 'profit':
+        return -np.sum(np.sign(y_pred) * y)
+    raise ValueError(f"Unknown objective '{objective}'")
+
+
+MODELS = {
+    'ridge': (loss_functions.ridge_regression_loss_function, loss_functions.ridge_predictions, lambda: Ridge(alpha=1.0)),
+    'elastic_net': (loss_functions.elastic_net_loss_function, loss_functions.elastic_net_predictions,
+                    lambda: ElasticNet(alpha=0.5, l1_ratio=0.5)),
+}
+
+
+def close(first, second):
+    return np.isclose(first, second, rtol=1e-9, atol=1e-12) or (np.isnan(first) and np.isnan(second))
+
+
+def curves():
+    # Compiled daily curves over 20 tickers, single daily and hourly curves, and ones too short to fit
+    for n_tickers, n_bars, freq in ((20, 750, 'D'), (1, 750, 'D'), (1, 3000, 'h'), (1, 8, 'D')):
+        data_frames = [{'ohlc': make_synthetic_ohlc(n=n_bars, seed=k, start_index=1, freq=freq)} for k in range(n_tickers)]
+        for strategy_dict in strategies:
+            results = [optimize.backtest_frame(strategy_dict['strategy'], strategy_dict['params'], df['ohlc']) for df in data_frames]
+            yield optimize.compile_backtest_results_sequential(results, data_frames) if n_tickers > 1 else results[0]
+
+
+def autoregressive_returns(n_series, seed=0):
+    # Strongly autocorrelated returns, where small penalties leave nonzero elastic-net coefficients
+    rng = np.random.default_rng(seed)
+    series = []
+    for _ in range(n_series):
+        n, phi = rng.integers(7, 800), rng.uniform(-0.9, 0.9)
+        noise = rng.normal(0, 0.01, n)
+        returns = np.zeros(n)
+        for i in range(1, n):
+            returns[i] = phi * returns[i - 1] + noise[i]
+        series.append(returns)
+    return series
+
+
+if __name__ == "__main__":
+    warnings.simplefilter('ignore', ConvergenceWarning)
+    failures = 0
+    compiled = list(curves())
+
+    for name, (loss_function, predictions, make_model) in MODELS.items():
+        for objective in ('profit', 'mse'):
+            ok = True
+            timings = {'sklearn': 0.0, 'numpy': 0.0}
+            expected_losses = []
+            for results in compiled:
+                start = time.perf_counter()
+                try:
+                    expected = legacy_lagged_regression(results, make_model(), objective)
+                except ValueError:
+                    expected = np.nan
+                timings['sklearn'] += time.perf_counter() - start
+                start = time.perf_counter()
+                try:
+                    loss = loss_function(results, objective=objective)
+                except ValueError:
+                    loss = np.nan
+                timings['numpy'] += time.perf_counter() - start
+                ok = ok and close(loss, expected)
+                expected_losses.append(expected)
+
+            # All curves in one batch, the too-short ones as NaN
+            start = time.perf_counter()
+            batch = loss_functions.lagged_regression_losses(compiled, predictions, objective)
+            batch_seconds = time.perf_counter() - start
+            ok = ok and all(close(loss, expected) for loss, expected in zip(batch, expected_losses))
+            failures += not ok
+            print(f"{name:<11} {objective:<6} on {len(compiled)} curves: sklearn {timings['sklearn']:.3f}s, "
+                  f"numpy {timings['numpy']:.3f}s, one batch {batch_seconds:.3f}s: {'OK' if ok else 'MISMATCH'}")
+
+    # The coordinate descent where it has work to do: penalties small enough for nonzero coefficients
+    series = autoregressive_returns(300)
+    X, y, starts = loss_functions.stack_lag_windows(series)
+    X = loss_functions.standardize_lags(X, starts)
+    for alpha, l1_ratio in ((0.01, 0.2), (0.001, 0.5), (0.0001, 0.9)):
+        batch = loss_functions.elastic_net_predictions(X, y, starts, alpha=alpha, l1_ratio=l1_ratio)
+        worst = nonzero = 0
+        for b, returns in enumerate(series):
+            X_b, y_b = loss_functions.lag_windows(returns)
+            X_scaled = StandardScaler().fit_transform(X_b)
+            model = ElasticNet(alpha=alpha, l1_ratio=l1_ratio).fit(X_scaled, y_b)
+            expected = model.predict(X_scaled)
+            nonzero += np.any(model.coef_ != 0)
+            worst = max(worst, np.abs(batch[starts[b]:starts[b] + len(y_b)] - expected).max() / np.abs(expected).max())
+        ok = worst < 1e-9
+        failures += not ok
+        print(f"ElasticNet(alpha={alpha}, l1_ratio={l1_ratio}) on {len(series)} series ({nonzero} with nonzero coefficients): "
+              f"largest relative difference {worst:.1e}: {'OK' if ok else 'MISMATCH'}")
+
+    print("Lagged regressions match sklearn." if failures == 0 else f"{failures} checks failed.")
@@ -0,0 +1,48 @@
+# Per-tick latency of every strategy in the live simulation, incremental and prefix paths.
+# Writes one JSON and one CSV latency report per strategy to a new temporary directory, or to
+# the directory given as the first argument.
+import os
+import sys
+import tempfile
+
+from modules.live_sim_backtest import run_live_simulation, export_latency_report
+from testing_and_confirmation.test_live_parity import LIVE_CASES
+from testing_and_confirmation.test_strategy_parity import make_synthetic_ohlc
+
+N_BARS = 2000
+PREFIX_BARS = 500  # Recomputing every prefix is quadratic, so it gets a shorter history
+
+
+def measure(strategy_module, params, n_bars, incremental):
+    ohlc = make_synthetic_ohlc(n=n_bars, seed=0)
+    try:
+        results, _ = run_live_simulation(strategy_module.should_buy_live, ohlc, params=dict(params), incremental=incremental, measure_latency=True)
+    except Exception as error:
+        return None, repr(error)
+    return results['latency'], None
+
+
+if __name__ == "__main__":
+    # Outside the source tree unless asked for
+    if len(sys.argv) > 1:
+        output_dir = sys.argv[1]
+        os.makedirs(output_dir, exist_ok=True)
+    else:
+        output_dir = tempfile.mkdtemp(prefix='latency_')
+
+    print(f"{'strategy':<18} {'path':<12} {'bars':>5} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'bars/s':>9} {'ms/1k bars':>10}")
+    for name, strategy_module, params in LIVE_CASES:
+        for incremental, n_bars in ((True, N_BARS), (False, PREFIX_BARS)):
+            path = 'incremental' if incremental else 'prefix'
+            report, error = measure(strategy_module, params, n_bars, incremental)
+            if report is None:
+                print(f"{name:<18} {path:<12} raises {error}")
+                continue
+            summary = report['summary']
+            print(f"{name:<18} {path:<12} {summary['bars']:>5} {summary['p50_ms']:>8.3f} {summary['p95_ms']:>8.3f} {summary['p99_ms']:>8.3f} "
+                  f"{report['bars_per_second']:>9.0f} {report['growth_ms_per_1000_bars']:>10.3f}")
+            file_name = f"{name.replace(' ', '_').replace('/', '')}_{path}"
+            export_latency_report(report, os.path.join(output_dir, file_name + '.json'))
+            export_latency_report(report, os.path.join(output_dir, file_name + '.csv'))
+
+    print(f"Latency reports written to {output_dir}")
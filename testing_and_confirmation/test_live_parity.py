@@ -0,0 +1,147 @@
+# Parity check: run_live_simulation driving the incremental LiveStrategy objects against calling
+# should_buy_live on every prefix of the data, and the batch warm-up against a full replay.
+import time
+
+import pandas as pd
+
+from modules.live_sim_backtest import run_live_simulation
+from strategies import RSI_Strategy, MACD_Strategy, BollingerBands_Strategy, SMA_Strategy, EMA_Strategy
+from strategies import IchimokuCloud_Strategy, DonchianChannel_Strategy, SmallMACrossover_Strategy
+from strategies import ElliottWave_Strategy, ParabolicSAR_Strategy
+from testing_and_confirmation.test_strategy_parity import make_synthetic_ohlc, make_breakout_ohlc
+
+LIVE_CASES = [
+    ('RSI', RSI_Strategy, {'rsi_buy_threshold': 25, 'rsi_sell_threshold': 75, 'window': 14}),
+    ('MACD', MACD_Strategy, {'short_window': 12, 'long_window': 26, 'signal_window': 9, 'take_profit_stop_loss': 0, 'take_profit_pct': 0.005, 'stop_loss_pct': 0.005}),
+    ('MACD TP/SL', MACD_Strategy, {'short_window': 7, 'long_window': 30, 'signal_window': 5, 'take_profit_stop_loss': 1, 'take_profit_pct': 0.003, 'stop_loss_pct': 0.006}),
+    ('BollingerBands', BollingerBands_Strategy, {'window': 20, 'num_std_dev': 2}),
+    ('SMA', SMA_Strategy, {'short_window': 10, 'long_window': 50}),
+    ('EMA', EMA_Strategy, {'short_window': 12, 'long_window': 26, 'take_profit_stop_loss': 0, 'take_profit_pct': 0.005, 'stop_loss_pct': 0.005}),
+    ('IchimokuCloud', IchimokuCloud_Strategy, {'tenkan_window': 9, 'kijun_window': 26, 'senkou_span_b_window': 52}),
+    ('DonchianChannel', DonchianChannel_Strategy, {'window': 20}),
+    ('SmallMACrossover', SmallMACrossover_Strategy, {'short_window': 5, 'long_window': 10}),
+    ('ElliottWave', ElliottWave_Strategy, {'window': 20}),
+    ('ParabolicSAR', ParabolicSAR_Strategy, {'af_start': 0.02, 'af_step': 0.02, 'af_max': 0.2}),
+]
+
+
+def run_both(strategy_module, params, ohlc):
+    """
+    Run the live simulation both ways and return (prefix result, incremental result, prefix
+    seconds, incremental seconds). A result is the exception text if the run raised.
+    """
+    results, timings = [], []
+    for incremental in (False, True):
+        start = time.perf_counter()
+        try:
+            results.append(run_live_simulation(strategy_module.should_buy_live, ohlc, params=dict(params), incremental=incremental))
+        except Exception as error:
+            results.append(repr(error))
+        timings.append(time.perf_counter() - start)
+    return results[0], results[1], timings[0], timings[1]
+
+
+def run_warmup(strategy_module, params, ohlc, warmup_bars):
+    """
+    Run the live simulation with a batch warm-up of warmup_bars bars; the exception text if it raised.
+    """
+    try:
+        return run_live_simulation(strategy_module.should_buy_live, ohlc, params=dict(params), warmup_bars=warmup_bars)
+    except Exception as error:
+        return repr(error)
+
+
+def live_decisions(strategy_module, params, ohlc):
+    """
+    The [action, value] of every bar from should_buy_live on each prefix, from on_bar, and from
+    on_bar on the first bar followed by on_bars on the rest. A decision is the exception text
+    if the call raised.
+    """
+    def call(function, *args):
+        try:
+            return list(function(*args)[:2])
+        except Exception as error:
+            return repr(error)
+
+    data = ohlc.reset_index(drop=True)
+    prefix = [call(strategy_module.should_buy_live, data.iloc[:i + 1], dict(params)) for i in range(len(data))]
+    bars = data.to_dict('records')
+    per_bar = strategy_module.LiveStrategy(dict(params))
+    on_bar = [call(per_bar.on_bar, bar) for bar in bars]
+    batch = strategy_module.LiveStrategy(dict(params))
+    on_bars = [call(batch.on_bar, bars[0])] + [list(decision) for decision in zip(*batch.on_bars(data.iloc[1:]))]
+    return prefix, on_bar, on_bars
+
+
+def same_decision(first, second):
+    if isinstance(first, str) or isinstance(second, str):
+        return first == second
+    return first[0] == second[0] and (first[1] == second[1] or (pd.isna(first[1]) and pd.isna(second[1])))
+
+
+def assert_same_run(expected, actual):
+    if isinstance(expected, str) or isinstance(actual, str):
+        assert expected == actual, f"{expected} != {actual}"
+        return
+    pd.testing.assert_frame_equal(expected[1], actual[1], check_exact=True)
+    assert str(expected[0]['trades_history']) == str(actual[0]['trades_history'])
+
+
+# Trending data, and breakout data where price leaves the previous bars' range
+DATASETS = [
+    ('seed 0', make_synthetic_ohlc(n=400, seed=0, start_index=0)),
+    ('seed 1', make_synthetic_ohlc(n=400, seed=1, start_index=1)),
+    ('breakout', make_breakout_ohlc(n=400, seed=0, start_index=1)),
+]
+
+# should_buy_live of these can never return buy or sell, whatever the data or parameters, and
+# their LiveStrategy keeps that (see the LiveStrategy docstrings): the moving averages and the
+# channel are computed over only the last window of bars, so their previous values are NaN;
+# an Elliott wave is only detected on the bar after it; the Parabolic SAR never reverses.
+# Their runs compare the value column, and they must stay without signals.
+NEVER_SIGNAL = {'SMA', 'DonchianChannel', 'SmallMACrossover', 'ElliottWave', 'ParabolicSAR'}
+
+
+if __name__ == "__main__":
+    failures = 0
+    for name, strategy_module, params in LIVE_CASES:
+        trades = signals = 0
+        all_raise = True
+        for label, ohlc in DATASETS:
+            prefix, incremental, prefix_seconds, incremental_seconds = run_both(strategy_module, params, ohlc)
+            try:
+                assert_same_run(prefix, incremental)
+                # Switching from the batch warm-up to per-bar updates anywhere must not change the run
+                for warmup_bars in (1, 2, 60, 399, 400):
+                    assert_same_run(incremental, run_warmup(strategy_module, params, ohlc, warmup_bars))
+                # Every bar's decision, also where the simulation cannot start (RSI raises on the first bar)
+                expected, on_bar, on_bars = live_decisions(strategy_module, params, ohlc)
+                for decisions in (on_bar, on_bars):
+                    assert all(same_decision(a, b) for a, b in zip(expected, decisions)), "per-bar decisions differ"
+                bar_signals = sum(not isinstance(d, str) and d[0] != 'none' for d in expected)
+                signals += bar_signals
+                if name in NEVER_SIGNAL:
+                    values = sum(not isinstance(d, str) and d[1] != 0 and not pd.isna(d[1]) for d in expected)
+                    assert values > len(ohlc) // 2, "no values to compare"
+                    print(f"{name} ({label}): OK, never signals; {values} values match")
+                elif isinstance(prefix, str):
+                    print(f"{name} ({label}): OK, the simulation raises {prefix}; {bar_signals} buy/sell decisions match")
+                else:
+                    all_raise = False
+                    trades += prefix[0]['total_trades']
+                    print(f"{name} ({label}): OK ({prefix[0]['total_trades']} trades, {bar_signals} buy/sell decisions, "
+                          f"{prefix_seconds:.2f}s -> {incremental_seconds:.2f}s)")
+            except AssertionError as error:
+                failures += 1
+                print(f"{name} ({label}): MISMATCH\n{error}")
+
+        # Nothing passes by comparing empty runs
+        if name in NEVER_SIGNAL:
+            covered = signals == 0
+        else:
+            covered = signals > 0 and (trades > 0 or all_raise)
+        failures += not covered
+        if not covered:
+            print(f"{name}: {'signals, but it should never signal' if name in NEVER_SIGNAL else 'NO TRADES compared'}")
+
+    print("All live strategies match." if failures == 0 else f"{failures} live runs differ.")
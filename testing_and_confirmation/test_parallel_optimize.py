@@ -0,0 +1,36 @@
+# Check of optimize(n_jobs=...): with a seed, a process pool must return exactly the best
+# loss, parameters and strategy of the in-process search, for every optimization method. It checks
+# results only: the workload is too small, and the pool start-up too large, to measure a speedup.
+from machine_learning import loss_functions, optimize
+from strategies.import_all import strategies
+from testing_and_confirmation.test_strategy_parity import make_synthetic_ohlc
+
+METHODS = (('random', 6), ('hyperopt', 6), ('genetic', 2))
+
+
+def make_data_frames(n_tickers=3, n_bars=500):
+    return [{'ohlc': make_synthetic_ohlc(n=n_bars, seed=k, start_index=1)} for k in range(n_tickers)]
+
+
+def run(method, max_evals, n_jobs, data_frames, seed=7):
+    return optimize.optimize(strategies, data_frames, loss_functions.sharpe_ratio_loss_function, method,
+                             max_evals=max_evals, population_size=4, n_jobs=n_jobs, seed=seed)
+
+
+if __name__ == "__main__":
+    data_frames = make_data_frames()
+    failures = 0
+    for method, max_evals in METHODS:
+        serial = run(method, max_evals, 1, data_frames)
+        repeat = run(method, max_evals, 1, data_frames)
+        parallel = run(method, max_evals, 4, data_frames)
+        same = all(
+            (result['best_loss'], result['best_params'], result['best_strategy']) ==
+            (serial['best_loss'], serial['best_params'], serial['best_strategy'])
+            for result in (repeat, parallel)
+        )
+        failures += not same
+        print(f"{method:<9} best {serial['best_loss']:.6f} ({serial['best_strategy'].__module__}), "
+              f"same with 4 workers: {'OK' if same else 'MISMATCH'}")
+
+    print("Parallel optimization matches the serial search." if failures == 0 else f"{failures} methods differ.")
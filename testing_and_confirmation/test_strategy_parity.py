@@ -0,0 +1,333 @@
+# Golden-output parity check: the vectorized strategy() functions against the row loops they replaced.
+import numpy as np
+import pandas as pd
+
+from strategies import RSI_Strategy, BollingerBands_Strategy, DonchianChannel_Strategy, SMA_Strategy
+from strategies import SmallMACrossover_Strategy, IchimokuCloud_Strategy, EMA_Strategy, MACD_Strategy
+from strategies import ParabolicSAR_Strategy, ElliottWave_Strategy
+
+
+def make_synthetic_ohlc(n=750, seed=0, start_index=0, freq='D'):
+    """
+    Random-walk OHLC data rounded to cents, like fetch_historical_data()['ohlc'].
+
+    start_index=1 reproduces the 1-based index of fetch_historical_data, 0 the reset index
+    used by the live simulation. freq='min' gives minute bars for long histories.
+    """
+    rng = np.random.default_rng(seed)
+    close = np.round(100 * np.exp(np.cumsum(rng.normal(0, 0.015, n))), 2)
+    ohlc = pd.DataFrame({
+        'Date': pd.date_range('2018-01-01', periods=n, freq=freq, tz='America/New_York'),
+        'Open': np.round(close * (1 + rng.normal(0, 0.005, n)), 2),
+        'High': np.round(close * (1 + np.abs(rng.normal(0, 0.01, n))), 2),
+        'Low': np.round(close * (1 - np.abs(rng.normal(0, 0.01, n))), 2),
+        'Close': close
+    })
+    ohlc.index = pd.RangeIndex(start_index, start_index + n)
+    return ohlc
+
+
+def make_breakout_ohlc(n=750, seed=0, start_index=0, freq='D'):
+    """
+    make_synthetic_ohlc with High and Low spread around the Open instead of the Close.
+
+    The Donchian channel includes the current bar's High and Low, so on bars that bound their
+    Close it can never be broken; here the Close moves outside it and the strategy trades.
+    """
+    ohlc = make_synthetic_ohlc(n, seed, start_index, freq)
+    rng = np.random.default_rng(seed + 100)
+    ohlc['High'] = np.round(ohlc['Open'] * (1 + np.abs(rng.normal(0, 0.003, n))), 2)
+    ohlc['Low'] = np.round(ohlc['Open'] * (1 - np.abs(rng.normal(0, 0.003, n))), 2)
+    return ohlc
+
+
+# Row-loop implementations of strategy() as they were before vectorization
+
+def legacy_rsi(data, params):
+    data_copy = data.copy()
+    data_copy['RSI'] = RSI_Strategy.calculate_rsi(data_copy, int(params['window']))
+    data_copy['action'] = "none"
+    for i in range(1, len(data_copy)):
+        data_copy.at[i, 'action'] = RSI_Strategy.check_rsi_action(
+            current_rsi=data_copy['RSI'].iloc[i-1],
+            previous_rsi=data_copy['RSI'].iloc[i - 2],
+            rsi_buy_threshold=params.get('rsi_buy_threshold'),
+            rsi_sell_threshold=params.get('rsi_sell_threshold')
+        )
+    return data_copy
+
+
+def legacy_bollinger(data, params):
+    data_copy = data.copy()
+    data_copy['Rolling Mean'], data_copy['Upper Band'], data_copy['Lower Band'] = BollingerBands_Strategy.calculate_bollinger_bands(data_copy, int(params['window']), params['num_std_dev'])
+    data_copy['action'] = "none"
+    for i in range(2, len(data_copy)):
+        data_copy.at[i, 'action'] = BollingerBands_Strategy.check_bollinger_action(
+            current_close=data_copy['Close'].iloc[i-1],
+            upper_band=data_copy['Upper Band'].iloc[i-1],
+            lower_band=data_copy['Lower Band'].iloc[i-1],
+            previous_close=data_copy['Close'].iloc[i-2],
+            previous_upper_band=data_copy['Upper Band'].iloc[i-2],
+            previous_lower_band=data_copy['Lower Band'].iloc[i-2]
+        )
+    return data_copy
+
+
+def legacy_donchian(data, params):
+    data_copy = data.copy()
+    data_copy['Upper Band'], data_copy['Lower Band'] = DonchianChannel_Strategy.calculate_donchian_channel(data_copy, int(params['window']))
+    data_copy['action'] = "none"
+    for i in range(1, len(data_copy)):
+        data_copy.at[i, 'action'] = DonchianChannel_Strategy.check_donchian_action(
+            current_close=data_copy['Close'].iloc[i-1],
+            upper_band=data_copy['Upper Band'].iloc[i-1],
+            lower_band=data_copy['Lower Band'].iloc[i-1],
+            prev_close=data_copy['Close'].iloc[i-2],
+            prev_upper_band=data_copy['Upper Band'].iloc[i-2],
+            prev_lower_band=data_copy['Lower Band'].iloc[i-2]
+        )
+    return data_copy
+
+
+def legacy_moving_average_crossover(calculate, check, short_column, long_column):
+    def legacy_strategy(data, params):
+        data_copy = data.copy()
+        data_copy[short_column], data_copy[long_column] = calculate(data_copy, int(params['short_window']), int(params['long_window']))
+        data_copy['action'] = "none"
+        for i in range(1, len(data_copy)):
+            data_copy.at[i, 'action'] = check(
+                data_copy[short_column].iloc[i-1],
+                data_copy[long_column].iloc[i-1],
+                data_copy[short_column].iloc[i-2],
+                data_copy[long_column].iloc[i-2]
+            )
+        return data_copy
+    return legacy_strategy
+
+
+def legacy_ichimoku(data, params):
+    data_copy = IchimokuCloud_Strategy.calculate_ichimoku(data, **params)
+    data_copy['action'] = "none"
+    for i in range(1, len(data_copy)):
+        data_copy.at[i, 'action'] = IchimokuCloud_Strategy.check_ichimoku_action(
+            current_close=data_copy['Close'].iloc[i-1],
+            tenkan=data_copy['Tenkan-sen'].iloc[i-1],
+            kijun=data_copy['Kijun-sen'].iloc[i-1],
+            senkou_a=data_copy['Senkou Span A'].iloc[i-1],
+            senkou_b=data_copy['Senkou Span B'].iloc[i-1],
+            prev_close=data_copy['Close'].iloc[i-2]
+        )
+    return data_copy
+
+
+def legacy_crossover_tpsl(calculate, fast_column, slow_column):
+    def legacy_strategy(data, params):
+        tpsl_flag = params.get('take_profit_stop_loss', 0)
+        take_profit_pct = params.get('take_profit_pct', 0.005)
+        stop_loss_pct = params.get('stop_loss_pct', 0.005)
+        data_copy = data.copy()
+        data_copy[fast_column], data_copy[slow_column] = calculate(data_copy, params)
+        data_copy['action'] = 'none'
+        in_position = False
+        buy_price = None
+        for i in range(1, len(data_copy)):
+            current_fast = data_copy[fast_column].iloc[i-1]
+            current_slow = data_copy[slow_column].iloc[i-1]
+            previous_fast = data_copy[fast_column].iloc[i-2] if i >= 2 else None
+            previous_slow = data_copy[slow_column].iloc[i-2] if i >= 2 else None
+            close_price = data_copy['Close'].iloc[i]
+            if not in_position:
+                if (current_fast > current_slow and previous_fast is not None and
+                        previous_fast <= previous_slow):
+                    data_copy.at[i, 'action'] = 'buy'
+                    in_position = True
+                    buy_price = close_price
+            elif tpsl_flag == 1:
+                if close_price >= buy_price * (1 + take_profit_pct):
+                    data_copy.at[i, 'action'] = 'sell'
+                    in_position = False
+                elif close_price <= buy_price * (1 - stop_loss_pct):
+                    data_copy.at[i, 'action'] = 'sell'
+                    in_position = False
+            elif (current_fast < current_slow and previous_fast is not None and
+                    previous_fast >= previous_slow):
+                data_copy.at[i, 'action'] = 'sell'
+                in_position = False
+        return data_copy
+    return legacy_strategy
+
+
+def legacy_parabolic_sar(data, params):
+    # The old loop wrote .at[0, ...] and .at[i, ...]; rows are addressed by position here so the
+    # reference is also valid for the 1-based index, where the old code appended a stray row 0
+    af_start = params.get('af_start', 0.02)
+    af_step = params.get('af_step', 0.02)
+    af_max = params.get('af_max', 0.2)
+    sar_frame = data.copy()
+    sar_frame['SAR'] = np.nan
+    sar_frame['EP'] = np.nan
+    sar_frame['AF'] = af_start
+    sar_frame['Trend'] = 1
+    row = sar_frame.index
+    sar_frame.at[row[0], 'SAR'] = sar_frame['Low'].iloc[0]
+    sar_frame.at[row[0], 'EP'] = sar_frame['High'].iloc[0]
+    for i in range(1, len(sar_frame)):
+        prev_sar = sar_frame['SAR'].iloc[i - 1]
+        prev_ep = sar_frame['EP'].iloc[i - 1]
+        prev_af = sar_frame['AF'].iloc[i - 1]
+        prev_trend = sar_frame['Trend'].iloc[i - 1]
+        if prev_trend == 1:
+            sar = prev_sar + prev_af * (prev_ep - prev_sar)
+            sar = min(sar, sar_frame['Low'].iloc[i - 1], sar_frame['Low'].iloc[i])
+        else:
+            sar = prev_sar + prev_af * (prev_ep - prev_sar)
+            sar = max(sar, sar_frame['High'].iloc[i - 1], sar_frame['High'].iloc[i])
+        if prev_trend == 1 and sar_frame['Low'].iloc[i] < sar:
+            sar_frame.at[row[i], 'Trend'] = -1
+            sar_frame.at[row[i], 'SAR'] = prev_ep
+            sar_frame.at[row[i], 'EP'] = sar_frame['Low'].iloc[i]
+            sar_frame.at[row[i], 'AF'] = af_start
+        elif prev_trend == -1 and sar_frame['High'].iloc[i] > sar:
+            sar_frame.at[row[i], 'Trend'] = 1
+            sar_frame.at[row[i], 'SAR'] = prev_ep
+            sar_frame.at[row[i], 'EP'] = sar_frame['High'].iloc[i]
+            sar_frame.at[row[i], 'AF'] = af_start
+        else:
+            sar_frame.at[row[i], 'Trend'] = prev_trend
+            sar_frame.at[row[i], 'SAR'] = sar
+            ep = max(prev_ep, sar_frame['High'].iloc[i]) if prev_trend == 1 else min(prev_ep, sar_frame['Low'].iloc[i])
+            sar_frame.at[row[i], 'EP'] = ep
+            sar_frame.at[row[i], 'AF'] = min(prev_af + af_step, af_max) if ep != prev_ep else prev_af
+
+    data_copy = data.copy()
+    data_copy['SAR'] = sar_frame['SAR']
+    data_copy['Trend'] = sar_frame['Trend']
+    data_copy['action'] = "none"
+    for i in range(1, len(data_copy)):
+        data_copy.at[i, 'action'] = ParabolicSAR_Strategy.check_sar_action(
+            current_sar=data_copy['SAR'].iloc[i],
+            current_trend=data_copy['Trend'].iloc[i],
+            prev_sar=data_copy['SAR'].iloc[i - 1],
+            prev_trend=data_copy['Trend'].iloc[i - 1]
+        )
+    return data_copy
+
+
+def legacy_detect_elliott_wave(data, window):
+    data_copy = data.copy()
+    data_copy['Swing High'] = data['High'].rolling(window=int(window)).max()
+    data_copy['Swing Low'] = data['Low'].rolling(window=int(window)).min()
+    data_copy.dropna(inplace=True)
+    waves = []
+    for i in range(1, len(data_copy) - 1):
+        if data_copy['High'].iloc[i] > data_copy['High'].iloc[i - 1] and data_copy['High'].iloc[i] > data_copy['High'].iloc[i + 1]:
+            waves.append(('peak', i, data_copy['High'].iloc[i]))
+        elif data_copy['Low'].iloc[i] < data_copy['Low'].iloc[i - 1] and data_copy['Low'].iloc[i] < data_copy['Low'].iloc[i + 1]:
+            waves.append(('trough', i, data_copy['Low'].iloc[i]))
+    return waves
+
+
+def legacy_elliott(data, params):
+    # Prefixes of different lengths move the most recent wave, the only one that can trigger
+    data = data.iloc[:int(params['rows'])]
+    data_copy = data.copy()
+    waves = legacy_detect_elliott_wave(data_copy, int(params['window']))
+    data_copy['action'] = "none"
+    for i in range(len(data_copy)):
+        data_copy.at[i, 'action'] = ElliottWave_Strategy.check_elliott_action(waves, i, data_copy['Close'].iloc[i])
+    return data_copy.dropna()
+
+
+def elliott_prefix(data, params):
+    return ElliottWave_Strategy.strategy(data.iloc[:int(params['rows'])], params)
+
+
+def ema_lines(data, params):
+    return EMA_Strategy.calculate_ema(data, int(params['short_window']), int(params['long_window']))
+
+
+def macd_lines(data, params):
+    return MACD_Strategy.calculate_macd(data, int(params['short_window']), int(params['long_window']), int(params['signal_window']))
+
+
+PARITY_CASES = [
+    ('RSI', RSI_Strategy.strategy, legacy_rsi,
+     [{'rsi_buy_threshold': 25, 'rsi_sell_threshold': 75, 'window': 14}, {'rsi_buy_threshold': 37.2, 'rsi_sell_threshold': 61.5, 'window': 5.7}]),
+    ('BollingerBands', BollingerBands_Strategy.strategy, legacy_bollinger,
+     [{'window': 20, 'num_std_dev': 2}, {'window': 11.4, 'num_std_dev': 1.1}]),
+    ('DonchianChannel', DonchianChannel_Strategy.strategy, legacy_donchian,
+     [{'window': 20}, {'window': 10.9}]),
+    ('SMA', SMA_Strategy.strategy, legacy_moving_average_crossover(SMA_Strategy.calculate_sma, SMA_Strategy.check_sma_action, 'Short SMA', 'Long SMA'),
+     [{'short_window': 10, 'long_window': 50}, {'short_window': 5.2, 'long_window': 31.8}]),
+    ('SmallMACrossover', SmallMACrossover_Strategy.strategy, legacy_moving_average_crossover(SmallMACrossover_Strategy.calculate_small_ma, SmallMACrossover_Strategy.check_small_ma_action, 'Short MA', 'Long MA'),
+     [{'short_window': 5, 'long_window': 10}, {'short_window': 3.3, 'long_window': 8.8}]),
+    ('IchimokuCloud', IchimokuCloud_Strategy.strategy, legacy_ichimoku,
+     [{'tenkan_window': 9, 'kijun_window': 26, 'senkou_span_b_window': 52}, {'tenkan_window': 5.5, 'kijun_window': 21.2, 'senkou_span_b_window': 45.9}]),
+    ('EMA', EMA_Strategy.strategy, legacy_crossover_tpsl(ema_lines, 'Short EMA', 'Long EMA'),
+     [{'short_window': 12, 'long_window': 26, 'take_profit_stop_loss': 0, 'take_profit_pct': 0.005, 'stop_loss_pct': 0.005},
+      {'short_window': 5, 'long_window': 21, 'take_profit_stop_loss': 1, 'take_profit_pct': 0.002, 'stop_loss_pct': 0.004}]),
+    ('MACD', MACD_Strategy.strategy, legacy_crossover_tpsl(macd_lines, 'MACD', 'Signal'),
+     [{'short_window': 12, 'long_window': 26, 'signal_window': 9, 'take_profit_stop_loss': 0, 'take_profit_pct': 0.005, 'stop_loss_pct': 0.005},
+      {'short_window': 7, 'long_window': 30, 'signal_window': 5, 'take_profit_stop_loss': 1, 'take_profit_pct': 0.003, 'stop_loss_pct': 0.006}]),
+    ('ParabolicSAR', ParabolicSAR_Strategy.strategy, legacy_parabolic_sar,
+     [{'af_start': 0.02, 'af_step': 0.02, 'af_max': 0.2}, {'af_start': 0.013, 'af_step': 0.041, 'af_max': 0.27}]),
+    ('ElliottWave', elliott_prefix, legacy_elliott,
+     [{'window': 20, 'rows': 750}, {'window': 13.0, 'rows': 240}, {'window': 31, 'rows': 417}]),
+]
+
+
+def check_parity(strategy, legacy_strategy, param_sets, seeds=(0, 1, 2)):
+    """
+    Assert that strategy() returns exactly the legacy output for every parameter set,
+    seed and index base, on trending and on breakout data (where the Donchian channel
+    trades). Returns the number of buy/sell rows compared.
+    """
+    signals = 0
+    for params in param_sets:
+        for seed in seeds:
+            for start_index in (0, 1):
+                for make_ohlc in (make_synthetic_ohlc, make_breakout_ohlc):
+                    ohlc = make_ohlc(seed=seed, start_index=start_index)
+                    expected = legacy_strategy(ohlc, params)
+                    pd.testing.assert_frame_equal(strategy(ohlc, params), expected, check_exact=True)
+                    signals += int((expected['action'] != 'none').sum())
+    return signals
+
+
+def check_sar_line(param_sets, seeds=(0, 1, 2)):
+    """
+    Assert that the SAR and Trend columns equal the legacy loop's on trending and breakout
+    data, that the SAR moves, and that the trend never flips (see calculate_parabolic_sar).
+    Returns the number of SAR values compared.
+    """
+    values = 0
+    for params in param_sets:
+        for seed in seeds:
+            for start_index in (0, 1):
+                for ohlc in (make_synthetic_ohlc(seed=seed, start_index=start_index), make_breakout_ohlc(seed=seed, start_index=start_index)):
+                    expected = legacy_parabolic_sar(ohlc, params)
+                    signals = ParabolicSAR_Strategy.strategy(ohlc, params)
+                    np.testing.assert_array_equal(signals['SAR'].to_numpy(), expected['SAR'].to_numpy())
+                    np.testing.assert_array_equal(signals['Trend'].to_numpy(), expected['Trend'].to_numpy())
+                    assert (signals['Trend'] == 1).all() and signals['SAR'].nunique() > len(ohlc) // 2
+                    values += len(ohlc)
+    return values
+
+
+if __name__ == "__main__":
+    failures = 0
+    for name, strategy, legacy_strategy, param_sets in PARITY_CASES:
+        try:
+            signals = check_parity(strategy, legacy_strategy, param_sets)
+            if name == 'ParabolicSAR':
+                # It has no buy/sell rows to compare; its SAR line is what can differ
+                values = check_sar_line(param_sets)
+                print(f"{name}: OK ({values} SAR values match, the trend never flips)")
+            else:
+                assert signals > 0, f"no buy/sell rows to compare for {name}"
+                print(f"{name}: OK ({signals} buy/sell rows match)")
+        except AssertionError as error:
+            failures += 1
+            print(f"{name}: MISMATCH\n{error}")
+
+    print("All strategies match." if failures == 0 else f"{failures} strategies differ.")
@@ -0,0 +1,97 @@
+# Check of the concurrent strategy searches: the generational GA must evolve exactly like DEAP's
+# eaSimple, and the scheduler must send the most expensive strategy's trials first.
+import random
+
+import numpy as np
+from deap import algorithms, base, creator, tools
+
+from machine_learning import loss_functions, optimize
+from strategies.import_all import strategies
+from testing_and_confirmation.test_parallel_optimize import make_data_frames
+
+
+class RecordingEvaluator(optimize.TrialEvaluator):
+    """
+    In-process TrialEvaluator that records (strategy, seconds) of every trial in the order
+    the trials were started.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.started = []
+
+    def submit(self, strategy, params):
+        future = super().submit(strategy, params)
+        self.started.append((strategy.__module__, future.result()[1]))
+        return future
+
+
+def ea_simple(strategy_dict, evaluator, population_size, ngen, seed):
+    # The genetic branch of optimize() as it ran through algorithms.eaSimple
+    strategy, bounds = strategy_dict['strategy'], strategy_dict['ga_bounds']
+    param_names = list(bounds.keys())
+    toolbox = base.Toolbox()
+    for name in param_names:
+        toolbox.register(f"attr_{name}", random.uniform, *bounds[name])
+    toolbox.register("individual", tools.initCycle, creator.Individual,
+                     [getattr(toolbox, f"attr_{name}") for name in param_names], n=1)
+    toolbox.register("population", tools.initRepeat, list, toolbox.individual)
+    toolbox.register("evaluate", lambda ind: (evaluator.evaluate(strategy, dict(zip(param_names, ind))),))
+    toolbox.register("mate", lambda a, b: tools.cxTwoPoint(a, b) if len(a) > 1 and len(b) > 1 else (a, b))
+    toolbox.register("mutate", tools.mutGaussian, mu=0, sigma=1, indpb=0.2)
+    toolbox.register("select", tools.selTournament, tournsize=3)
+    stats = tools.Statistics(lambda ind: ind.fitness.values)
+    stats.register("min", np.min)
+    stats.register("avg", np.mean)
+
+    random.seed(seed)
+    population = toolbox.population(n=population_size)
+    population, logbook = algorithms.eaSimple(population, toolbox, cxpb=0.7, mutpb=0.3, ngen=ngen, stats=stats, verbose=False)
+    return dict(zip(param_names, tools.selBest(population, 1)[0])), logbook
+
+
+def genetic_steps(strategy_dict, evaluator, population_size, ngen, seed):
+    random.seed(seed)
+    search = optimize.genetic_search_steps(strategy_dict['strategy'], strategy_dict['ga_bounds'], population_size, ngen)
+    results, _ = optimize.run_searches(evaluator, [search])
+    return results[0]
+
+
+if __name__ == "__main__":
+    data_frames = make_data_frames()
+    loss_function = loss_functions.sharpe_ratio_loss_function
+    creator.create("FitnessMin", base.Fitness, weights=(-1.0,))
+    creator.create("Individual", list, fitness=creator.FitnessMin)
+    failures = 0
+
+    evaluator = optimize.TrialEvaluator(data_frames, loss_function)
+    for strategy_dict in strategies[:4]:
+        expected_params, expected_logbook = ea_simple(strategy_dict, evaluator, 6, 3, seed=11)
+        params, logbook = genetic_steps(strategy_dict, evaluator, 6, 3, seed=11)
+        ok = params == expected_params and list(logbook) == list(expected_logbook)
+        failures += not ok
+        print(f"GA {strategy_dict['strategy'].__module__:<36} {'OK' if ok else 'MISMATCH'}")
+
+    # Cost-aware scheduling: every strategy is probed once, then the slowest goes first
+    recording = RecordingEvaluator(data_frames, loss_function)
+    names = [d['strategy'].__module__ for d in strategies]
+    searches = [optimize._trial_batch([(d['strategy'], d['params'])] * 3) for d in strategies]
+    _, costs = optimize.run_searches(recording, searches, names)
+    probes = recording.started[:len(strategies)]
+    costliest_probe = max(probes, key=lambda probe: probe[1])[0]
+    ok = [name for name, _ in probes] == names and recording.started[len(strategies)][0] == costliest_probe
+    failures += not ok
+    for cost in sorted(costs, key=lambda cost: -cost['seconds_per_evaluation']):
+        print(f"{cost['strategy']:<36} {cost['evaluations']} evaluations, {cost['seconds_per_evaluation'] * 1000:7.1f} ms each")
+    print(f"Probed every strategy first, then started the costliest, {costliest_probe}: {'OK' if ok else 'MISMATCH'}")
+
+    # optimize() reports the learned costs and does not depend on n_jobs
+    for method in ('random', 'hyperopt', 'genetic'):
+        runs = [optimize.optimize(strategies, data_frames, loss_function, method, max_evals=3, population_size=4, n_jobs=n_jobs, seed=2)
+                for n_jobs in (1, 3)]
+        ok = all(runs[0][key] == runs[1][key] for key in ('best_loss', 'best_params', 'best_strategy'))
+        ok = ok and [cost['evaluations'] for cost in runs[0]['strategy_costs']] == [cost['evaluations'] for cost in runs[1]['strategy_costs']]
+        failures += not ok
+        print(f"optimize {method:<9} best {runs[0]['best_loss']:.6f} ({runs[0]['best_strategy'].__module__}): {'OK' if ok else 'MISMATCH'}")
+
+    print("Concurrent strategy searches check out." if failures == 0 else f"{failures} checks failed.")
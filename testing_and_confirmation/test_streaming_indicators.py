@@ -0,0 +1,92 @@
+# Parity check: the streaming indicators in strategies/streaming_indicators.py against the pandas
+# batch calculations used by strategy().
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from strategies import RSI_Strategy, BollingerBands_Strategy, DonchianChannel_Strategy
+from strategies import MACD_Strategy, EMA_Strategy, IchimokuCloud_Strategy
+from strategies.streaming_indicators import (
+    StreamingRSI, StreamingBollingerBands, StreamingDonchianChannel, StreamingMACD,
+    StreamingIchimoku, EWMMean
+)
+from testing_and_confirmation.test_strategy_parity import make_synthetic_ohlc
+
+
+def make_test_data(seed):
+    """
+    Synthetic OHLC data; seed 2 adds missing prices and a flat stretch.
+    """
+    ohlc = make_synthetic_ohlc(n=1500, seed=seed)
+    if seed == 2:
+        ohlc.loc[[10, 300, 301], 'High'] = np.nan
+        ohlc.loc[[50, 700], 'Close'] = np.nan
+        ohlc.loc[400:420, 'Low'] = ohlc.loc[400, 'Low']
+    return ohlc
+
+
+def stream(indicator, *columns):
+    """
+    Feed the columns to indicator.update row by row and return one array per output.
+    """
+    outputs = [indicator.update(*values) for values in zip(*columns)]
+    return np.array(outputs, dtype=float).T.reshape(-1, len(outputs))
+
+
+def stream_many(indicator, *columns, split=7):
+    """
+    Feed the first `split` rows to indicator.update, then the rest in one update_many call.
+    """
+    columns = [np.asarray(column, dtype=float) for column in columns]
+    head = stream(indicator, *(column[:split] for column in columns)) if split else None
+    rest = indicator.update_many(*(column[split:] for column in columns))
+    rest = rest if isinstance(rest, tuple) else (rest,)
+    if head is None:
+        return list(rest)
+    return [np.concatenate((head_output, rest_output)) for head_output, rest_output in zip(head, rest)]
+
+
+def wilder_rsi(data, window):
+    delta = data['Close'].diff()
+    gain = delta.where(delta > 0, 0).ewm(alpha=1 / window, adjust=False).mean()
+    loss = (-delta.where(delta < 0, 0)).ewm(alpha=1 / window, adjust=False).mean()
+    return 100 - (100 / (1 + gain / loss))
+
+
+def indicator_cases(ohlc, window):
+    """
+    Yield (name, streamed outputs, batch outputs) pairs for one window length.
+    """
+    close, high, low = ohlc['Close'], ohlc['High'], ohlc['Low']
+    for feed, suffix in ((stream, ''), (stream_many, ' (update_many)'), (partial(stream_many, split=0), ' (fresh update_many)')):
+        yield 'RSI' + suffix, feed(StreamingRSI(window), close), [RSI_Strategy.calculate_rsi(ohlc, window)]
+        yield 'Wilder RSI' + suffix, feed(StreamingRSI(window, method='wilder'), close), [wilder_rsi(ohlc, window)]
+        yield 'EMA' + suffix, feed(EWMMean(window), close), [EMA_Strategy.calculate_ema(ohlc, window, window)[0]]
+        yield 'Bollinger' + suffix, feed(StreamingBollingerBands(window, 2.2), close), BollingerBands_Strategy.calculate_bollinger_bands(ohlc, window, 2.2)
+        yield 'Donchian' + suffix, feed(StreamingDonchianChannel(window), high, low), DonchianChannel_Strategy.calculate_donchian_channel(ohlc, window)
+
+
+if __name__ == "__main__":
+    failures = 0
+    for seed in (0, 1, 2):
+        ohlc = make_test_data(seed)
+        cases = []
+        for window in (1, 3, 14, 20, 52):
+            cases.extend(indicator_cases(ohlc, window))
+        cases.append(('MACD', stream(StreamingMACD(12, 26, 9), ohlc['Close']), MACD_Strategy.calculate_macd(ohlc, 12, 26, 9)))
+        cases.append(('MACD (update_many)', stream_many(StreamingMACD(12, 26, 9), ohlc['Close']), MACD_Strategy.calculate_macd(ohlc, 12, 26, 9)))
+        for windows in ((9, 26, 52), (5, 21, 45), (3, 1, 4)):
+            batch = IchimokuCloud_Strategy.calculate_ichimoku(ohlc, *windows)
+            cases.append(('Ichimoku', stream(StreamingIchimoku(*windows), ohlc['High'], ohlc['Low']),
+                          [batch[column] for column in ('Tenkan-sen', 'Kijun-sen', 'Senkou Span A', 'Senkou Span B')]))
+
+        for name, streamed, batch in cases:
+            exact = all(np.array_equal(output, np.asarray(expected, dtype=float), equal_nan=True)
+                        for output, expected in zip(streamed, batch))
+            if not exact:
+                failures += 1
+                print(f"{name} (seed {seed}): MISMATCH")
+        print(f"seed {seed}: {len(cases)} indicator runs checked")
+
+    print("All streaming indicators match pandas exactly." if failures == 0 else f"{failures} indicator runs differ.")
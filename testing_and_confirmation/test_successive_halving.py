@@ -0,0 +1,71 @@
+# Check of successive halving: the rungs must shrink by eta, the best loss of a halved search must
+# be the exact full-data loss of its parameters, and the evaluations must cost a fraction of a full search.
+from machine_learning import loss_functions, optimize
+from strategies.import_all import strategies
+from testing_and_confirmation.test_parallel_optimize import make_data_frames
+
+N_TICKERS = 27
+MAX_EVALS = 27
+
+LOSS_FUNCTIONS = [
+    loss_functions.simple_loss_function,
+    loss_functions.sharpe_ratio_loss_function,
+    loss_functions.ridge_regression_loss_function,
+    loss_functions.elastic_net_loss_function,
+    loss_functions.gt_function,
+]
+
+
+def rung_sizes(n_trials, fidelities, eta):
+    # Drive successive_halving_steps with made-up losses and record each rung's batch
+    search = optimize.successive_halving_steps([(None, {'k': k}) for k in range(n_trials)], fidelities, eta)
+    sizes = []
+    batch = next(search)
+    try:
+        while True:
+            sizes.append(len(batch))
+            batch = search.send([(params['k'] * 7) % n_trials for _, params, _ in batch])
+    except StopIteration as stop:
+        losses = stop.value
+    return sizes, losses
+
+
+def run(data_frames, loss_function, method, **halving):
+    return optimize.optimize(strategies[:2], data_frames, loss_function, method, max_evals=MAX_EVALS if method == 'random' else 3,
+                             population_size=9, seed=4, memo=False, **halving)
+
+
+def evaluation_seconds(results):
+    return sum(cost['seconds'] for cost in results['strategy_costs'])
+
+
+if __name__ == "__main__":
+    data_frames = make_data_frames(n_tickers=N_TICKERS, n_bars=300)
+    failures = 0
+
+    fidelities = optimize.halving_fidelities(data_frames, rungs=4, eta=3)
+    sizes, losses = rung_sizes(27, fidelities, 3)
+    ok = (sizes == [27, 9, 3, 1] and [len(fidelity[1]) for fidelity in fidelities[:-1]] == [1, 3, 9]
+          and sum(loss != float('inf') for loss in losses) == 1)
+    failures += not ok
+    print(f"Rungs {sizes} on {[len(fidelity[1]) for fidelity in fidelities[:-1]] + [N_TICKERS]} tickers: {'OK' if ok else 'MISMATCH'}")
+
+    for loss_function in LOSS_FUNCTIONS:
+        name = loss_function.__name__
+        methods = [('random', {'halving_rungs': 4, 'halving_by': 'tickers'})]
+        if loss_function is loss_functions.sharpe_ratio_loss_function:
+            methods.append(('genetic', {'halving_rungs': 3, 'halving_by': 'time'}))
+        for method, halving in methods:
+            full = run(data_frames, loss_function, method)
+            halved = run(data_frames, loss_function, method, **halving)
+            # The reported loss is a full-data loss, never a lower rung's
+            exact = optimize.evaluate_strategy(halved['best_strategy'], halved['best_params'], data_frames, loss_function)
+            ok = exact == halved['best_loss']
+            if method == 'random':
+                # Same samples as the full search, so it can only find one of its losses or a worse one
+                ok = ok and halved['best_loss'] >= full['best_loss']
+            failures += not ok
+            print(f"{name:<32} {method:<8} best {halved['best_loss']:.6f} (full {full['best_loss']:.6f}), "
+                  f"{evaluation_seconds(full) / evaluation_seconds(halved):.1f}x less evaluation time: {'OK' if ok else 'MISMATCH'}")
+
+    print("Successive halving checks out." if failures == 0 else f"{failures} checks failed.")
@@ -0,0 +1,60 @@
+# Check of the per-ticker fan-out: backtesting a trial's data frames over threads or processes
+# must compile into exactly the results of the serial loop over the frames.
+import time
+
+import pandas as pd
+
+from machine_learning import loss_functions, optimize
+from strategies.import_all import strategies
+from testing_and_confirmation.test_parallel_optimize import make_data_frames
+
+N_TICKERS = 50
+
+
+def same_compiled(first, second):
+    pd.testing.assert_frame_equal(first['portfolio_values_over_time'].to_frame(), second['portfolio_values_over_time'].to_frame())
+    return all(first[key] == second[key] for key in first if key != 'portfolio_values_over_time')
+
+
+def compiled_results(strategy, params, data_frames, ticker_pool=None):
+    start = time.perf_counter()
+    if ticker_pool is None:
+        results = [optimize.backtest_frame(strategy, params, df['ohlc']) for df in data_frames]
+    else:
+        results = ticker_pool.backtest(strategy, params)
+    compiled = optimize.compile_backtest_results_sequential(results, data_frames)
+    return compiled, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    data_frames = make_data_frames(n_tickers=N_TICKERS, n_bars=750)
+    pools = {backend: optimize.TickerPool(data_frames, 4, backend) for backend in ('thread', 'process')}
+    failures = 0
+
+    for strategy_dict in strategies:
+        strategy, params = strategy_dict['strategy'], strategy_dict['params']
+        name = strategy.__module__.split('.')[-1]
+        serial, serial_seconds = compiled_results(strategy, params, data_frames)
+        timings = [f"serial {serial_seconds:.2f}s"]
+        ok = True
+        for backend, pool in pools.items():
+            fanned_out, seconds = compiled_results(strategy, params, data_frames, pool)
+            ok = ok and same_compiled(serial, fanned_out)
+            timings.append(f"{backend} {seconds:.2f}s")
+        failures += not ok
+        print(f"{name:<26} {', '.join(timings)}: {'OK' if ok else 'MISMATCH'}")
+
+    for pool in pools.values():
+        pool.close()
+
+    # The same search with and without the fan-out
+    loss_function = loss_functions.sharpe_ratio_loss_function
+    serial = optimize.optimize(strategies, data_frames[:10], loss_function, 'random', max_evals=3, seed=5)
+    for n_jobs, ticker_backend in ((1, 'thread'), (1, 'process'), (2, 'thread')):
+        fanned_out = optimize.optimize(strategies, data_frames[:10], loss_function, 'random', max_evals=3, seed=5,
+                                       n_jobs=n_jobs, ticker_jobs=4, ticker_backend=ticker_backend)
+        ok = all(fanned_out[key] == serial[key] for key in ('best_loss', 'best_params', 'best_strategy'))
+        failures += not ok
+        print(f"optimize n_jobs={n_jobs} ticker_jobs=4 {ticker_backend}: {'OK' if ok else 'MISMATCH'}")
+
+    print("Per-ticker fan-out matches the serial loop." if failures == 0 else f"{failures} checks differ.")
@@ -0,0 +1,121 @@
+# Check of the trial memo: parameter sets with the same canonical key must give the same signals,
+# memoized searches must return what unmemoized ones do, and a rerun on an SQLite store is free.
+import importlib
+import os
+import random
+import sys
+import tempfile
+import time
+
+from machine_learning import loss_functions, optimize
+from strategies.import_all import strategies
+from testing_and_confirmation.test_parallel_optimize import make_data_frames
+
+SAMPLES = 150
+
+
+def sample_params(strategy_dict, rng):
+    params = {name: rng.uniform(low, high) for name, (low, high) in strategy_dict['ga_bounds'].items()}
+    # Mix in whole numbers and hyperopt's 0/1 choices as well as GA floats
+    for name in list(params)[:1]:
+        params[name] = float(round(params[name])) if rng.random() < 0.5 else params[name]
+    if 'take_profit_stop_loss' in params and rng.random() < 0.5:
+        params['take_profit_stop_loss'] = rng.choice([0, 1])
+    return params
+
+
+def check_canonical_keys(strategy_dict, ohlc, rng):
+    # Every parameter set sharing a key must produce exactly the same actions
+    strategy = strategy_dict['strategy']
+    groups = {}
+    for _ in range(SAMPLES):
+        params = sample_params(strategy_dict, rng)
+        groups.setdefault(optimize.canonical_trial_params(strategy, params), []).append(params)
+    shared = [members for members in groups.values() if len(members) > 1]
+    for members in shared:
+        expected = list(strategy(ohlc, members[0])['action'])
+        if any(list(strategy(ohlc, params)['action']) != expected for params in members[1:]):
+            return False, len(groups), len(shared)
+    return True, len(groups), len(shared)
+
+
+def run(data_frames, memo, method='random', seed=3):
+    start = time.perf_counter()
+    results = optimize.optimize(strategies, data_frames, loss_functions.sharpe_ratio_loss_function, method,
+                                max_evals=8, population_size=6, seed=seed, memo=memo)
+    return results, time.perf_counter() - start
+
+
+def same_best(first, second):
+    return all(first[key] == second[key] for key in ('best_loss', 'best_params', 'best_strategy'))
+
+
+if __name__ == "__main__":
+    data_frames = make_data_frames()
+    rng = random.Random(0)
+    failures = 0
+
+    for strategy_dict in strategies:
+        ok, keys, shared = check_canonical_keys(strategy_dict, data_frames[0]['ohlc'], rng)
+        failures += not ok
+        print(f"{strategy_dict['strategy'].__module__:<36} {SAMPLES} samples -> {keys} backtests, {shared} shared: {'OK' if ok else 'MISMATCH'}")
+
+    for method in ('random', 'hyperopt', 'genetic'):
+        plain, plain_seconds = run(data_frames, False, method)
+        memoized, memo_seconds = run(data_frames, None, method)
+        ok = same_best(plain, memoized)
+        failures += not ok
+        stats = memoized['memo']
+        print(f"{method:<9} {stats['hits']} of {stats['hits'] + stats['misses']} trials memoized, "
+              f"{plain_seconds:.2f}s -> {memo_seconds:.2f}s: {'OK' if ok else 'MISMATCH'}")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'trial_memo.sqlite')
+        first, first_seconds = run(data_frames, optimize.TrialMemo(path=path), 'hyperopt')
+        # A new memo on the same file, as a rerun of main.py would open it
+        rerun_memo = optimize.TrialMemo(path=path)
+        rerun, rerun_seconds = run(data_frames, rerun_memo, 'hyperopt')
+        rerun_memo.close()
+        ok = same_best(first, rerun) and rerun['memo']['misses'] == 0
+        failures += not ok
+        print(f"SQLite rerun: {rerun['memo']['disk_hits']} losses read from disk, {first_seconds:.2f}s -> {rerun_seconds:.2f}s: {'OK' if ok else 'MISMATCH'}")
+
+        # Other data must not reuse the stored losses
+        other, _ = run(make_data_frames(n_tickers=2), optimize.TrialMemo(path=path), 'hyperopt')
+        ok = other['memo']['disk_hits'] == 0
+        failures += not ok
+        print(f"SQLite on other data: {other['memo']['disk_hits']} losses read from disk: {'OK' if ok else 'MISMATCH'}")
+
+    # Editing the strategy's source must not reuse the losses its old version stored
+    with tempfile.TemporaryDirectory() as directory:
+        package = os.path.join(directory, 'memo_probe')
+        os.mkdir(package)
+        open(os.path.join(package, '__init__.py'), 'w').close()
+        source = "from strategies.RSI_Strategy import strategy as rsi_strategy\n\ndef strategy(data, params):\n    return rsi_strategy(data, params)\n"
+        with open(os.path.join(package, 'probe_strategy.py'), 'w') as source_file:
+            source_file.write(source)
+        sys.path.insert(0, directory)
+        probe = importlib.import_module('memo_probe.probe_strategy')
+        probe_strategies = [{**strategies[0], 'strategy': probe.strategy}]
+        path = os.path.join(directory, 'trial_memo.sqlite')
+
+        def probe_run():
+            memo = optimize.TrialMemo(path=path)
+            results = optimize.optimize(probe_strategies, data_frames, loss_functions.sharpe_ratio_loss_function, 'random',
+                                        max_evals=6, seed=3, memo=memo)
+            memo.close()
+            return results['memo']
+
+        probe_run()
+        unchanged = probe_run()
+        with open(os.path.join(package, 'probe_strategy.py'), 'a') as source_file:
+            source_file.write("# edited\n")
+        optimize._code_fingerprint.cache_clear()
+        edited = probe_run()
+        sys.path.remove(directory)
+        ok = unchanged['misses'] == 0 and unchanged['disk_hits'] > 0 and edited['disk_hits'] == 0
+        failures += not ok
+        print(f"SQLite after editing the strategy: {unchanged['disk_hits']} losses read before, {edited['disk_hits']} after: "
+              f"{'OK' if ok else 'MISMATCH'}")
+
+    print("Trial memo checks out." if failures == 0 else f"{failures} checks failed.")